@@ -1,49 +1,133 @@
-from flask import Flask, render_template, request, redirect, url_for, session, Response
+"""
+Achievement Management System
+Flask application factory and route handlers
+"""
+from flask import Flask, Request, current_app, render_template, request, redirect, url_for, session, Response, stream_with_context, abort
 from flask_wtf.csrf import CSRFProtect
 import sqlite3
 import os
+import posixpath
 import secrets
-import csv
 import io
-from werkzeug.utils import secure_filename
+import hashlib
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.http import is_resource_modified
+from werkzeug.utils import secure_filename, send_file as werkzeug_send_file
 import datetime
 
-app = Flask(__name__)
-app.secret_key = os.environ.get("SECRET_KEY", secrets.token_hex(16))
-csrf = CSRFProtect(app)
+import cache
+import db
+import metrics
+import tracing
+import config
+import queries
+import storage
+from db import get_db
 
-# ✅ Portable DB path (works on Windows/Linux/Vercel)
-DB_PATH = os.path.join(os.path.dirname(__file__), "ams.db")
+# Modules only some requests need (the CSV imports and export, password
+# hashing, the write-behind writer, Pillow and PyMuPDF) are imported where
+# they are used, so workers, tests and CLI invocations start faster.
+# create_app() does load thumbnails and commands, to configure the worker
+# and register the CLI group, but both defer their own heavy imports.
 
-# Define upload folder path for certificates
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "uploads")
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Endpoints taking CSV files rather than certificates
+IMPORT_ENDPOINTS = {"import-achievements", "import-students"}
 
+# Rows per page on /all-achievements
+ACHIEVEMENTS_PAGE_SIZE = 50
+
+# Compress /export-csv on the fly for clients that send Accept-Encoding: gzip
+EXPORT_GZIP = True
+
+# Stored names never change content (sha256 or timestamped), so clients may keep them
+CERTIFICATE_MAX_AGE = 365 * 24 * 3600
+
+# Part of every listing/export ETag: bump when their output format changes,
+# so clients drop copies rendered by the old code
+LISTING_ETAG_FORMAT = 2
+
+
+class UploadRequest(Request):
+    """Spools uploaded files straight into the upload folder, hashing and sniffing as they arrive."""
+
+    @property
+    def max_content_length(self):
+        # Resolved per request, so the CSRF check's form parse already sees it
+        if self.endpoint in IMPORT_ENDPOINTS:
+            return current_app.config["IMPORT_MAX_CONTENT_LENGTH"]
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not filename or self.endpoint in IMPORT_ENDPOINTS:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return storage.HashingSpool(current_app.config["UPLOAD_FOLDER"], secure_filename(filename), check_type=True)
+
+
+# (rule, options, view) for every route below, added to each app by create_app()
+_routes = []
 
-def ensure_achievements_schema(connection):
-    """
-    ✅ Safe, non-destructive SQLite migration:
-    - Adds teacher_id if missing
-    - Adds created_at if missing
-    - Backfills created_at for old rows
-    """
-    cursor = connection.cursor()
-    cursor.execute("PRAGMA table_info(achievements)")
-    columns = cursor.fetchall()
-    column_names = [c[1] for c in columns]
 
-    if "teacher_id" not in column_names:
-        print("Adding teacher_id column to achievements table...")
-        cursor.execute("ALTER TABLE achievements ADD COLUMN teacher_id TEXT DEFAULT 'unknown'")
-        print("teacher_id column added successfully")
+def route(rule, **options):
+    """Like Flask.route, but records the view for create_app() to register."""
+    def decorator(view):
+        _routes.append((rule, options, view))
+        return view
+    return decorator
 
-    if "created_at" not in column_names:
-        print("Adding created_at column to achievements table...")
-        cursor.execute("ALTER TABLE achievements ADD COLUMN created_at TEXT")
-        cursor.execute("UPDATE achievements SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
-        print("created_at column added and backfilled successfully")
 
-    connection.commit()
+def create_app(config_object=None):
+    """
+    Build the application from a config class (or object), by default the
+    one named by AMS_CONFIG in config.CONFIGS.
+
+    Nothing here touches the database or the filesystem: run init_db(app)
+    or `flask ams migrate` once per deployment before serving requests.
+    """
+    if config_object is None:
+        config_object = config.CONFIGS[os.environ.get("AMS_CONFIG", "default")]
+    if hasattr(config_object, "validate"):
+        config_object.validate()
+
+    app = Flask(__name__)
+    app.request_class = UploadRequest
+    app.config.from_object(config_object)
+    if not app.config.get("SECRET_KEY"):
+        app.config["SECRET_KEY"] = secrets.token_hex(16)
+
+    CSRFProtect(app)
+    db.init_app(app)
+    metrics.init_app(app)
+    tracing.init_app(app)
+    if app.config.get("ORPHAN_GC_INTERVAL"):
+        import orphans
+        orphans.init_app(app)
+    import thumbnails
+    thumbnails.init_app(app)
+    from commands import ams_cli
+    app.cli.add_command(ams_cli)
+
+    for rule, options, view in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+    app.template_global()(certificate_url)
+    app.register_error_handler(RequestEntityTooLarge, rejected_upload)
+    app.register_error_handler(UnsupportedMediaType, rejected_upload)
+    app.before_request(block_static_uploads)
+    return app
+
+
+def init_db(app):
+    """Apply any pending schema migrations (see migrations.py); the explicit start-up step."""
+    import migrations
+    migrations.migrate(app.config["DB_PATH"])
+
+
+def __getattr__(name):
+    # `app.app` (e.g. `gunicorn app:app`) is the default app, built on first use
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Define a function to check allowed file extensions
@@ -52,139 +136,133 @@ def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-# Initialize database on startup
-def init_db():
-    if not os.path.exists(DB_PATH):
-        connection = sqlite3.connect(DB_PATH)
-        cursor = connection.cursor()
+def certificate_url(achievement, variant=None):
+    """URL for an achievement's certificate or one of its thumbnails.VARIANTS."""
+    if variant:
+        return url_for("certificate-variant", achievement_id=achievement["id"], variant=variant)
+    return url_for("certificate", achievement_id=achievement["id"])
 
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS student (
-            student_name TEXT NOT NULL,
-            student_id TEXT PRIMARY KEY,
-            email TEXT UNIQUE NOT NULL,
-            phone_number TEXT,
-            password TEXT NOT NULL,
-            student_gender TEXT,
-            student_dept TEXT
-        )
-        """)
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS teacher (
-            teacher_name TEXT NOT NULL,
-            teacher_id TEXT PRIMARY KEY,
-            email TEXT UNIQUE NOT NULL,
-            phone_number TEXT,
-            password TEXT NOT NULL,
-            teacher_gender TEXT,
-            teacher_dept TEXT
-        )
-        """)
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS achievements (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            teacher_id TEXT NOT NULL,
-            student_id TEXT NOT NULL,
-            achievement_type TEXT NOT NULL,
-            event_name TEXT NOT NULL,
-            achievement_date DATE NOT NULL,
-            organizer TEXT NOT NULL,
-            position TEXT NOT NULL,
-            achievement_description TEXT,
-            certificate_path TEXT,
-
-            symposium_theme TEXT,
-            programming_language TEXT,
-            coding_platform TEXT,
-            paper_title TEXT,
-            journal_name TEXT,
-            conference_level TEXT,
-            conference_role TEXT,
-            team_size INTEGER,
-            project_title TEXT,
-            database_type TEXT,
-            difficulty_level TEXT,
-            other_description TEXT,
-
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (student_id) REFERENCES student(student_id),
-            FOREIGN KEY (teacher_id) REFERENCES teacher(teacher_id)
-        )
-        """)
 
-        connection.commit()
-        connection.close()
-        print(f"Created database at {DB_PATH}")
+def rejected_upload(e):
+    if request.endpoint != "submit_achievements":
+        return e
+    if isinstance(e, RequestEntityTooLarge):
+        limit = current_app.config["MAX_CONTENT_LENGTH"] // (1024 * 1024)
+        message = f"Certificate is too large. The limit is {limit} MB."
     else:
-        connection = sqlite3.connect(DB_PATH)
-        cursor = connection.cursor()
+        message = e.description
+    return render_template("submit_achievements.html", error=message), e.code
 
-        # Ensure achievements table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='achievements'")
-        if not cursor.fetchone():
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS achievements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                teacher_id TEXT NOT NULL,
-                student_id TEXT NOT NULL,
-                achievement_type TEXT NOT NULL,
-                event_name TEXT NOT NULL,
-                achievement_date DATE NOT NULL,
-                organizer TEXT NOT NULL,
-                position TEXT NOT NULL,
-                achievement_description TEXT,
-                certificate_path TEXT,
-
-                symposium_theme TEXT,
-                programming_language TEXT,
-                coding_platform TEXT,
-                paper_title TEXT,
-                journal_name TEXT,
-                conference_level TEXT,
-                conference_role TEXT,
-                team_size INTEGER,
-                project_title TEXT,
-                database_type TEXT,
-                difficulty_level TEXT,
-                other_description TEXT,
-
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (student_id) REFERENCES student(student_id),
-                FOREIGN KEY (teacher_id) REFERENCES teacher(teacher_id)
-            )
-            """)
-            connection.commit()
-            print("Created achievements table")
 
-        # ✅ IMPORTANT: fix old DBs missing columns (created_at issue)
-        ensure_achievements_schema(connection)
+def block_static_uploads():
+    if request.endpoint != "static":
+        return
+    # Normalised first, so ./uploads/... and css/../uploads/... are caught too
+    filename = posixpath.normpath((request.view_args or {}).get("filename", "")).lstrip("/")
+    if filename == storage.PATH_PREFIX or filename.startswith(storage.PATH_PREFIX + "/"):
+        abort(404)
+
+
+def parse_date(value):
+    """Return value if it is a YYYY-MM-DD date, else None."""
+    try:
+        datetime.datetime.strptime(value or "", "%Y-%m-%d")
+    except ValueError:
+        return None
+    return value
+
 
-        connection.close()
-        print(f"Database already exists at {DB_PATH}")
+def parse_cursor(value):
+    """Parse a "<achievement_date>:<id>" keyset cursor, or return None."""
+    date, _, row_id = (value or "").rpartition(":")
+    if not parse_date(date) or not row_id.isdigit():
+        return None
+    return date, int(row_id)
 
 
-# Call initialization function
-init_db()
+def format_cursor(row):
+    return f"{row['achievement_date']}:{row['id']}"
 
 
-@app.route("/")
+def listing_validators(teacher_id, *variant):
+    """
+    Strong ETag and Last-Modified for one representation (variant) of the
+    teacher's achievements, from queries.TEACHER_VERSION: one covering-index
+    read and one primary-key lookup of the teacher's cache version (which
+    also moves when a student is renamed or a certificate preview lands)
+    instead of the listing or export query. Last-Modified is the newest
+    created_at, which neither a delete nor a new preview moves; clients
+    sending If-None-Match as well, as browsers do, are judged by the ETag alone.
+    """
+    version = get_db(current_app.config["DB_PATH"]).execute(queries.TEACHER_VERSION, (teacher_id,)).fetchone()
+    key = repr((LISTING_ETAG_FORMAT, teacher_id, tuple(version)) + variant)
+    etag = hashlib.sha256(key.encode()).hexdigest()[:32]
+    last_modified = None
+    if version["last_modified"]:
+        last_modified = datetime.datetime.strptime(version["last_modified"], "%Y-%m-%d %H:%M:%S").replace(
+            tzinfo=datetime.timezone.utc
+        )
+    return etag, last_modified
+
+
+def with_validators(response, etag, last_modified):
+    """Attach the validators; private, and revalidated on every use."""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag, last_modified):
+    """A 304 response if the client's If-None-Match/If-Modified-Since still match, else None."""
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+@route("/")
 def home():
     return render_template("home.html")
 
 
-@app.route("/student", methods=["GET", "POST"])
+def check_login(connection, login_sql, rehash_sql, account_id, password):
+    """
+    Look the account up by primary key and verify password against its
+    stored hash. Unknown ids are checked against a dummy hash, so they take
+    as long as a wrong password. A correct password stored in plaintext or
+    with parameters other than PASSWORD_HASH_METHOD is rehashed on the spot.
+    Returns the account row, or None.
+    """
+    import passwords
+    method = current_app.config["PASSWORD_HASH_METHOD"]
+    account = connection.execute(login_sql, (account_id,)).fetchone()
+    if account is None:
+        passwords.verify(passwords.dummy_hash(method), password or "")
+        return None
+    if not passwords.verify(account["password"], password):
+        return None
+
+    if passwords.needs_rehash(account["password"], method):
+        try:
+            connection.execute(rehash_sql, (passwords.hash_password(password, method), account_id, account["password"]))
+            connection.commit()
+        except sqlite3.Error:
+            # The login itself is fine; the next one will try again
+            connection.rollback()
+            current_app.logger.warning("password rehash for %s failed", account_id, exc_info=True)
+    return account
+
+
+@route("/student", methods=["GET", "POST"])
 def student():
     if request.method == "POST":
         student_id = request.form.get("sname")
         password = request.form.get("password")
 
-        connection = sqlite3.connect(DB_PATH)
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM student WHERE student_id = ? AND password = ?", (student_id, password))
-        student_data = cursor.fetchone()
-        connection.close()
+        connection = get_db(current_app.config["DB_PATH"])
+        student_data = check_login(connection, queries.STUDENT_LOGIN, queries.STUDENT_REHASH, student_id, password)
 
         if student_data:
             session["logged_in"] = True
@@ -198,17 +276,14 @@ def student():
     return render_template("student.html")
 
 
-@app.route("/teacher", methods=["GET", "POST"])
+@route("/teacher", methods=["GET", "POST"])
 def teacher():
     if request.method == "POST":
         teacher_id = request.form.get("tname")
         password = request.form.get("password")
 
-        connection = sqlite3.connect(DB_PATH)
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM teacher WHERE teacher_id = ? AND password = ?", (teacher_id, password))
-        teacher_data = cursor.fetchone()
-        connection.close()
+        connection = get_db(current_app.config["DB_PATH"])
+        teacher_data = check_login(connection, queries.TEACHER_LOGIN, queries.TEACHER_REHASH, teacher_id, password)
 
         if teacher_data:
             session["logged_in"] = True
@@ -222,7 +297,7 @@ def teacher():
     return render_template("teacher.html")
 
 
-@app.route("/student-new", methods=["GET", "POST"])
+@route("/student-new", methods=["GET", "POST"])
 def student_new():
     if request.method == "POST":
         student_name = request.form.get("student_name")
@@ -233,37 +308,26 @@ def student_new():
         student_gender = request.form.get("student_gender")
         student_dept = request.form.get("student_dept")
 
-        connection = sqlite3.connect(DB_PATH)
+        connection = get_db(current_app.config["DB_PATH"])
         cursor = connection.cursor()
 
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS student (
-            student_name TEXT NOT NULL,
-            student_id TEXT PRIMARY KEY,
-            email TEXT UNIQUE NOT NULL,
-            phone_number TEXT,
-            password TEXT NOT NULL,
-            student_gender TEXT,
-            student_dept TEXT
-        )
-        """)
-
         try:
-            cursor.execute("""
-                INSERT INTO student (student_name, student_id, email, phone_number, password, student_gender, student_dept)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (student_name, student_id, email, phone_number, password, student_gender, student_dept))
+            if password:
+                import passwords
+                password = passwords.hash_password(password, current_app.config["PASSWORD_HASH_METHOD"])
+            cursor.execute(queries.INSERT_STUDENT, (
+                student_name, student_id, email, phone_number, password, student_gender, student_dept
+            ))
             connection.commit()
             return redirect(url_for("student"))
         except sqlite3.Error as e:
+            connection.rollback()
             return render_template("student_new_2.html", error=f"Database error: {e}")
-        finally:
-            connection.close()
 
     return render_template("student_new_2.html")
 
 
-@app.route("/teacher-new", endpoint="teacher-new", methods=["GET", "POST"])
+@route("/teacher-new", endpoint="teacher-new", methods=["GET", "POST"])
 def teacher_new():
     if request.method == "POST":
         teacher_name = request.form.get("teacher_name")
@@ -274,42 +338,31 @@ def teacher_new():
         teacher_gender = request.form.get("teacher_gender")
         teacher_dept = request.form.get("teacher_dept")
 
-        connection = sqlite3.connect(DB_PATH)
+        connection = get_db(current_app.config["DB_PATH"])
         cursor = connection.cursor()
 
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS teacher (
-            teacher_name TEXT NOT NULL,
-            teacher_id TEXT PRIMARY KEY,
-            email TEXT UNIQUE NOT NULL,
-            phone_number TEXT,
-            password TEXT NOT NULL,
-            teacher_gender TEXT,
-            teacher_dept TEXT
-        )
-        """)
-
         try:
-            cursor.execute("""
-                INSERT INTO teacher (teacher_name, teacher_id, email, phone_number, password, teacher_gender, teacher_dept)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (teacher_name, teacher_id, email, phone_number, password, teacher_gender, teacher_dept))
+            if password:
+                import passwords
+                password = passwords.hash_password(password, current_app.config["PASSWORD_HASH_METHOD"])
+            cursor.execute(queries.INSERT_TEACHER, (
+                teacher_name, teacher_id, email, phone_number, password, teacher_gender, teacher_dept
+            ))
             connection.commit()
             return redirect(url_for("teacher"))
         except sqlite3.Error as e:
+            connection.rollback()
             return render_template("teacher_new_2.html", error=f"Database error: {e}")
-        finally:
-            connection.close()
 
     return render_template("teacher_new_2.html")
 
 
-@app.route("/teacher-achievements", endpoint="teacher-achievements")
+@route("/teacher-achievements", endpoint="teacher-achievements")
 def teacher_achievements():
     return render_template("teacher_achievements_2.html")
 
 
-@app.route("/submit_achievements", endpoint="submit_achievements", methods=["GET", "POST"])
+@route("/submit_achievements", endpoint="submit_achievements", methods=["GET", "POST"])
 def submit_achievements():
     if not session.get("logged_in") or not session.get("teacher_id"):
         return redirect(url_for("teacher"))
@@ -343,63 +396,151 @@ def submit_achievements():
             other_description = request.form.get("other_description")
 
             # Handle certificate file upload
-            certificate_path = None
+            upload = None
             if "certificate" in request.files:
                 file = request.files["certificate"]
                 if file and file.filename != "":
                     if not allowed_file(file.filename):
                         return render_template("submit_achievements.html",
                                                error="Invalid file type. Please upload PDF, PNG, JPG, or JPEG files.")
-                    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-                    secure_name = f"{timestamp}_{secure_filename(file.filename)}"
-                    file_path = os.path.join(UPLOAD_FOLDER, secure_name)
-                    file.save(file_path)
-                    certificate_path = f"uploads/{secure_name}"
+                    # UploadRequest has already spooled, hashed and type-checked it
+                    upload = file.stream
 
-            with sqlite3.connect(DB_PATH) as connection:
+            with get_db(current_app.config["DB_PATH"]) as connection:
                 cursor = connection.cursor()
 
-                # ✅ Ensure schema is correct before inserting (fixes old DB)
-                ensure_achievements_schema(connection)
-
                 # Validate student exists
-                cursor.execute("SELECT student_id, student_name FROM student WHERE student_id = ?", (student_id,))
+                cursor.execute(queries.STUDENT_BY_ID, (student_id,))
                 student_data = cursor.fetchone()
                 if not student_data:
                     return render_template("submit_achievements.html", error="Student ID does not exist in the system.")
 
                 student_name = student_data[1]
 
-                # ✅ Insert with created_at so dashboard ordering never breaks
-                cursor.execute("""
-                INSERT INTO achievements (
-                    student_id, teacher_id, achievement_type, event_name, achievement_date,
-                    organizer, position, achievement_description, certificate_path,
-                    symposium_theme, programming_language, coding_platform, paper_title,
-                    journal_name, conference_level, conference_role, team_size,
-                    project_title, database_type, difficulty_level, other_description,
-                    created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, (
-                    student_id, teacher_id, achievement_type, event_name, achievement_date,
-                    organizer, position, achievement_description, certificate_path,
-                    symposium_theme, programming_language, coding_platform, paper_title,
-                    journal_name, conference_level, conference_role, team_size,
-                    project_title, database_type, difficulty_level, other_description
-                ))
-
-                connection.commit()
+                # Only now move the spooled file into the store, under its SHA-256 so
+                # resubmitting the same file reuses it (at the path it was first
+                # registered under, whatever this upload's extension); a rejected
+                # submission's spool is deleted when the request closes
+                certificate = None
+                if upload:
+                    certificate = upload.commit(
+                        current_app.config["UPLOAD_FOLDER"], current_app.config["UPLOAD_SHARD_DEPTH"],
+                        storage.known_path(cursor, upload.sha256),
+                    )
+
+                def insert_achievement(cursor):
+                    nonlocal certificate
+                    if certificate:
+                        certificate = storage.register(cursor, certificate)
+                    values = (
+                        student_id, teacher_id, achievement_type, event_name, achievement_date,
+                        organizer, position, achievement_description, certificate.path if certificate else None,
+                        symposium_theme, programming_language, coding_platform, paper_title,
+                        journal_name, conference_level, conference_role, team_size,
+                        project_title, database_type, difficulty_level, other_description
+                    )
+                    cursor.execute(queries.INSERT_ACHIEVEMENT, values)
+                    return cursor.lastrowid
+
+                pending = False
+                if current_app.config["WRITE_BEHIND"]:
+                    # Joins the writer thread's next group commit; returns once it is durable
+                    import writer
+                    write_behind = writer.get_writer(
+                        current_app.config["DB_PATH"], current_app.config["WRITE_BEHIND_MAX_BATCH"], current_app.config["WRITE_BEHIND_MAX_WAIT_MS"] / 1000
+                    )
+                    future = write_behind.submit(insert_achievement)
+                    try:
+                        future.result(timeout=current_app.config["WRITE_BEHIND_TIMEOUT"])
+                    except TimeoutError:
+                        # Only report a failure the job can no longer turn into a
+                        # success, or a retry would record the achievement twice
+                        if future.cancel():
+                            return render_template(
+                                "submit_achievements.html",
+                                error="The server is busy and the achievement was not saved. Please submit it again.",
+                            )
+                        pending = True
+                else:
+                    insert_achievement(cursor)
+                    connection.commit()
+
+            cache.invalidate("dashboard", teacher_id)
+
+            if certificate:
+                import thumbnails
+                thumbnails.worker.submit(current_app.config["DB_PATH"], current_app.config["UPLOAD_FOLDER"], certificate.path)
 
             success_message = f"Achievement of {student_name} has been successfully registered!!"
+            if pending:
+                success_message = (f"Achievement of {student_name} was accepted and is still being saved; "
+                                   "please do not submit it again.")
             return render_template("submit_achievements.html", success=success_message)
 
+        except HTTPException:
+            raise
         except Exception as e:
             return render_template("submit_achievements.html", error=f"An error occurred: {e}")
 
     return redirect(url_for("teacher-dashboard", success="Achievement submitted successfully!"))
 
 
-@app.route("/student-achievements", endpoint="student-achievements")
+def render_import(result=None, error=None):
+    """The shared upload form and report page of both CSV imports."""
+    import importer
+    if request.endpoint == "import-students":
+        labels = {"title": "Import Students", "noun": "student", "columns": importer.STUDENT_COLUMNS}
+    else:
+        labels = {"title": "Import Achievements", "noun": "achievement", "columns": importer.IMPORT_COLUMNS}
+    return render_template("import_csv.html", result=result, error=error, **labels)
+
+
+def uploaded_csv():
+    """The uploaded csv_file as text lines, parsed straight off its spool, or None."""
+    file = request.files.get("csv_file")
+    if not file or file.filename == "":
+        return None
+    return io.TextIOWrapper(file.stream, encoding="utf-8-sig", newline="")
+
+
+@route("/import-achievements", endpoint="import-achievements", methods=["GET", "POST"])
+def import_achievements():
+    if not session.get("logged_in") or not session.get("teacher_id"):
+        return redirect(url_for("teacher"))
+
+    if request.method == "GET":
+        return render_import()
+    lines = uploaded_csv()
+    if lines is None:
+        return render_import(error="Please choose a CSV file to import.")
+
+    import importer
+    result = importer.import_achievements(get_db(current_app.config["DB_PATH"]), lines, session.get("teacher_id"))
+    if result["imported"]:
+        cache.invalidate("dashboard", session.get("teacher_id"))
+    return render_import(result)
+
+
+@route("/import-students", endpoint="import-students", methods=["GET", "POST"])
+def import_students():
+    if not session.get("logged_in") or not session.get("teacher_id"):
+        return redirect(url_for("teacher"))
+
+    if request.method == "GET":
+        return render_import()
+    lines = uploaded_csv()
+    if lines is None:
+        return render_import(error="Please choose a CSV file to import.")
+
+    import importer
+    result = importer.import_students(
+        get_db(current_app.config["DB_PATH"]), lines, method=current_app.config["PASSWORD_HASH_METHOD"],
+        processes=current_app.config["PASSWORD_HASH_PROCESSES"],
+    )
+    return render_import(result)
+
+
+@route("/student-achievements", endpoint="student-achievements")
 def student_achievements():
     if not session.get("logged_in"):
         return redirect(url_for("student"))
@@ -412,7 +553,7 @@ def student_achievements():
     return render_template("student_achievements_1.html", student=student_data)
 
 
-@app.route("/student-dashboard", endpoint="student-dashboard")
+@route("/student-dashboard", endpoint="student-dashboard")
 def student_dashboard():
     if not session.get("logged_in"):
         return redirect(url_for("student"))
@@ -425,7 +566,7 @@ def student_dashboard():
     return render_template("student_dashboard.html", student=student_data)
 
 
-@app.route("/teacher-dashboard", endpoint="teacher-dashboard")
+@route("/teacher-dashboard", endpoint="teacher-dashboard")
 def teacher_dashboard():
     if not session.get("logged_in"):
         return redirect(url_for("teacher"))
@@ -437,79 +578,118 @@ def teacher_dashboard():
         "dept": session.get("teacher_dept"),
     }
 
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
-    cursor = connection.cursor()
+    dashboard_cache = cache.get_cache("dashboard")
+    payload = None
+    if dashboard_cache:
+        # Read first: a write landing meanwhile leaves the new entry stale, never wrong
+        version = cache.teacher_version(get_db(current_app.config["DB_PATH"]), teacher_id)
+        payload = dashboard_cache.get(teacher_id, version)
+    if payload is None:
+        payload = dashboard_payload(teacher_id)
+        if dashboard_cache:
+            dashboard_cache.set(teacher_id, payload, version)
 
-    # ✅ Ensure schema exists so query never crashes
-    ensure_achievements_schema(connection)
+    return render_template(
+        "teacher_dashboard.html",
+        teacher=teacher_data,
+        stats=payload["stats"],
+        recent_entries=payload["recent_entries"],
+    )
 
-    cursor.execute("SELECT COUNT(*) FROM achievements WHERE teacher_id = ?", (teacher_id,))
-    total_achievements = cursor.fetchone()[0]
 
-    cursor.execute("SELECT COUNT(DISTINCT student_id) FROM achievements WHERE teacher_id = ?", (teacher_id,))
-    students_managed = cursor.fetchone()[0]
+def dashboard_payload(teacher_id):
+    """The teacher's dashboard counters and five latest entries, as plain (cacheable) data."""
+    cursor = get_db(current_app.config["DB_PATH"]).cursor()
 
     one_week_ago = (datetime.datetime.now() - datetime.timedelta(days=7)).strftime("%Y-%m-%d")
-    cursor.execute("SELECT COUNT(*) FROM achievements WHERE teacher_id = ? AND achievement_date >= ?",
-                   (teacher_id, one_week_ago))
-    this_week_count = cursor.fetchone()[0]
-
-    cursor.execute("""
-        SELECT a.id, a.student_id, s.student_name, a.achievement_type,
-               a.event_name, a.achievement_date
-        FROM achievements a
-        JOIN student s ON a.student_id = s.student_id
-        WHERE a.teacher_id = ?
-        ORDER BY a.created_at DESC
-        LIMIT 5
-    """, (teacher_id,))
-    recent_entries = cursor.fetchall()
-
-    connection.close()
+    cursor.execute(queries.DASHBOARD_STATS, (one_week_ago, teacher_id))
+    counters = cursor.fetchone()
+
+    cursor.execute(queries.DASHBOARD_RECENT, (teacher_id,))
+    recent_entries = [dict(row) for row in cursor.fetchall()]
 
     stats = {
-        "total_achievements": total_achievements,
-        "students_managed": students_managed,
-        "this_week": this_week_count,
+        "total_achievements": counters["total_achievements"] if counters else 0,
+        "students_managed": counters["students_managed"] if counters else 0,
+        "this_week": counters["this_week"] if counters else 0,
     }
-
-    return render_template(
-        "teacher_dashboard.html",
-        teacher=teacher_data,
-        stats=stats,
-        recent_entries=recent_entries,
-    )
+    return {"stats": stats, "recent_entries": recent_entries}
 
 
-@app.route("/all-achievements", endpoint="all-achievements")
+@route("/all-achievements", endpoint="all-achievements")
 def all_achievements():
     if not session.get("logged_in"):
         return redirect(url_for("teacher"))
 
     teacher_id = session.get("teacher_id")
 
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
-    cursor = connection.cursor()
+    filters = {
+        "achievement_type": request.args.get("type") or None,
+        "date_from": parse_date(request.args.get("from")),
+        "date_to": parse_date(request.args.get("to")),
+    }
+    after = parse_cursor(request.args.get("after"))
+    before = None if after else parse_cursor(request.args.get("before"))
 
-    cursor.execute("""
-        SELECT a.id, a.student_id, s.student_name, a.achievement_type,
-               a.event_name, a.achievement_date, a.position, a.organizer,
-               a.certificate_path
-        FROM achievements a
-        JOIN student s ON a.student_id = s.student_id
-        WHERE a.teacher_id = ?
-        ORDER BY a.achievement_date DESC
-    """, (teacher_id,))
+    etag, last_modified = listing_validators(teacher_id, "all-achievements", request.query_string)
+    response = not_modified(etag, last_modified)
+    if response:
+        return response
 
-    achievements = cursor.fetchall()
-    connection.close()
+    connection = get_db(current_app.config["DB_PATH"])
+    cursor = connection.cursor()
 
-    return render_template("all_achievements.html", achievements=achievements)
+    # Fetch one extra row to learn whether another page exists
+    sql, params = queries.achievements_page(
+        teacher_id, after=after, before=before, limit=ACHIEVEMENTS_PAGE_SIZE + 1, **filters
+    )
+    cursor.execute(sql, params)
+    achievements = cursor.fetchall()
 
+    has_more = len(achievements) > ACHIEVEMENTS_PAGE_SIZE
+    achievements = achievements[:ACHIEVEMENTS_PAGE_SIZE]
+    if before:
+        achievements.reverse()
 
-@app.route("/export-csv", endpoint="export-csv")
+    # Shown next to the results, so it counts what the filters match
+    if any(filters.values()):
+        cursor.execute(*queries.achievements_count(teacher_id, **filters))
+    else:
+        cursor.execute(queries.TEACHER_TOTAL, (teacher_id,))
+    total = cursor.fetchone()
+
+    # "next" = older rows, "prev" = newer rows
+    next_cursor = prev_cursor = None
+    if achievements:
+        if before:
+            # Paging back always leaves the page we came from as older rows
+            next_cursor = format_cursor(achievements[-1])
+            if has_more:
+                prev_cursor = format_cursor(achievements[0])
+        else:
+            if has_more:
+                next_cursor = format_cursor(achievements[-1])
+            if after:
+                prev_cursor = format_cursor(achievements[0])
+
+    response = current_app.make_response(render_template(
+        "all_achievements.html",
+        achievements=achievements,
+        total_count=total[0] if total else 0,
+        filters={
+            "type": filters["achievement_type"] or "",
+            "from": filters["date_from"] or "",
+            "to": filters["date_to"] or "",
+        },
+        page_args={key: value for key, value in request.args.items()
+                   if key in ("type", "from", "to") and value},
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+    ))
+    return with_validators(response, etag, last_modified)
+
+
+@route("/export-csv", endpoint="export-csv")
 def export_csv():
     if not session.get("logged_in"):
         return redirect(url_for("teacher"))
@@ -517,60 +697,94 @@ def export_csv():
     teacher_id = session.get("teacher_id")
     teacher_name = session.get("teacher_name", teacher_id)
 
-    connection = sqlite3.connect(DB_PATH)
-    connection.row_factory = sqlite3.Row
+    # gzip and identity bodies differ, so each gets its own strong ETag
+    gzipped = EXPORT_GZIP and "gzip" in request.accept_encodings
+    etag, last_modified = listing_validators(teacher_id, "export-csv", gzipped)
+    response = not_modified(etag, last_modified)
+    if response:
+        response.vary.add("Accept-Encoding")
+        return response
+
+    connection = get_db(current_app.config["DB_PATH"])
     cursor = connection.cursor()
 
-    cursor.execute("""
-        SELECT a.id, s.student_name, a.student_id, a.achievement_type,
-               a.event_name, a.achievement_date, a.organizer,
-               a.position, a.achievement_description, a.created_at
-        FROM achievements a
-        JOIN student s ON a.student_id = s.student_id
-        WHERE a.teacher_id = ?
-        ORDER BY a.achievement_date DESC
-    """, (teacher_id,))
+    cursor.execute(queries.EXPORT_CSV, (teacher_id,))
 
-    achievements = cursor.fetchall()
-    connection.close()
-
-    # Build CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # Write header row
-    writer.writerow([
-        "#", "Student Name", "Student ID", "Achievement Type",
-        "Event Name", "Date", "Organizer", "Position",
-        "Description", "Recorded At"
-    ])
-
-    # Write data rows
-    for idx, row in enumerate(achievements, start=1):
-        writer.writerow([
-            idx,
-            row["student_name"],
-            row["student_id"],
-            row["achievement_type"],
-            row["event_name"],
-            row["achievement_date"],
-            row["organizer"],
-            row["position"],
-            row["achievement_description"] or "",
-            row["created_at"]
-        ])
-
-    output.seek(0)
-    filename = f"achievements_{teacher_id}.csv"
-
-    return Response(
-        output.getvalue(),
-        mimetype="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    # Stream rows straight from the cursor instead of building the file in memory
+    import export
+    body = export.iter_achievement_csv(cursor)
+    headers = {
+        "Content-Disposition": f"attachment; filename=achievements_{teacher_id}.csv",
+        "Vary": "Accept-Encoding",
+    }
+    if gzipped:
+        body = export.gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+
+    response = Response(stream_with_context(body), mimetype="text/csv", headers=headers)
+    return with_validators(response, etag, last_modified)
+
+
+@route("/certificates/<int:achievement_id>", endpoint="certificate")
+@route("/certificates/<int:achievement_id>/<any(thumb, preview):variant>", endpoint="certificate-variant")
+def certificate(achievement_id, variant=None):
+    if not session.get("logged_in"):
+        return redirect(url_for("home"))
+
+    connection = get_db(current_app.config["DB_PATH"])
+    row = connection.execute(queries.CERTIFICATE_FOR_ACHIEVEMENT, (achievement_id,)).fetchone()
+
+    # Someone else's achievement looks exactly like a missing one
+    owner = row and (
+        (session.get("teacher_id") and row["teacher_id"] == session.get("teacher_id"))
+        or (session.get("student_id") and row["student_id"] == session.get("student_id"))
+    )
+    if not owner or not row["certificate_path"]:
+        abort(404)
+
+    certificate_path = row["certificate_path"]
+    download_name = row["original_filename"] or os.path.basename(certificate_path)
+    # Content-addressed blobs get their hash as a strong ETag
+    etag = row["sha256"] or True
+    if variant:
+        if not row["sha256"]:
+            abort(404)
+        import thumbnails
+        certificate_path = thumbnails.variant_path(certificate_path, variant)
+        download_name = f"{os.path.splitext(download_name)[0]}.{variant}.webp"
+        etag = f"{row['sha256']}.{variant}"
+
+    path = storage.local_path(current_app.config["UPLOAD_FOLDER"], certificate_path)
+    if not os.path.isfile(path):
+        abort(404)
+
+    # The proxy modes send headers only; the proxy serves the bytes and ranges
+    mode = current_app.config["CERTIFICATE_SENDFILE"]
+    response = werkzeug_send_file(
+        path, request.environ, download_name=download_name, etag=etag,
+        conditional=mode is None, use_x_sendfile=mode is not None,
+        response_class=current_app.response_class,
     )
+    if mode is not None:
+        if mode == "x-accel-redirect":
+            relative = certificate_path.split("/", 1)[1]
+            response.headers["X-Accel-Redirect"] = current_app.config["CERTIFICATE_ACCEL_PREFIX"] + relative
+            del response.headers["X-Sendfile"]
+        response = response.make_conditional(request.environ)
+        if response.status_code == 304:
+            response.headers.pop("X-Accel-Redirect", None)
+            response.headers.pop("X-Sendfile", None)
+
+    response.cache_control.no_cache = None
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    response.cache_control.max_age = CERTIFICATE_MAX_AGE
+    return response
 
 
 if __name__ == "__main__":
-    init_db()
+    app = create_app(config.DevelopmentConfig)
+    init_db(app)
     app.run(debug=True)
 
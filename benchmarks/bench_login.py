@@ -0,0 +1,195 @@
+"""
+Login Benchmarks
+Latency and throughput of /teacher logins at a given password hash cost,
+for sizing workers ahead of morning login bursts
+
+Usage:
+    python benchmarks/bench_login.py
+    python benchmarks/bench_login.py --methods scrypt scrypt:16384:8:1 pbkdf2:sha256:600000
+    python benchmarks/bench_login.py --threads 4 --burst 3000 --window 300 --output login.json
+    python benchmarks/bench_login.py --memory
+
+For every method the accounts of a throwaway database are hashed with it,
+then logins are timed one at a time (latency percentiles for a correct
+password, a wrong one and an unknown account) and from --threads clients
+at once (throughput). hashlib releases the GIL while it hashes, so the
+threaded figure scales with cores the way extra workers would. With
+--burst and --window the script also prints how many cores it takes to
+absorb that many logins within that many seconds. --memory keeps the
+accounts in an in-memory database, leaving only the hashing to time.
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_routes import percentile  # noqa: E402
+
+BENCH_PASSWORD = "password"
+
+
+def build_database(db_path, accounts, method):
+    import db
+    import migrations
+    import passwords
+
+    migrations.migrate(db_path, log=None)
+    # Every account shares one hash: verification costs the same either way
+    password_hash = passwords.hash_password(BENCH_PASSWORD, method)
+    connection = db.open_connection(db_path)
+    with connection:
+        connection.executemany(
+            "INSERT INTO teacher (teacher_name, teacher_id, email, password) VALUES (?, ?, ?, ?)",
+            [(f"Bench {n}", f"BENCH-T{n:05d}", f"bench{n}@bench.example", password_hash)
+             for n in range(accounts)],
+        )
+    connection.close()
+
+
+def _login(client, teacher_id, password, expect_success):
+    response = client.post("/teacher", data={"tname": teacher_id, "password": password})
+    if (response.status_code == 302) != expect_success:
+        raise RuntimeError(f"login for {teacher_id} returned {response.status_code}")
+
+
+def _summary(timings, elapsed):
+    timings.sort()
+    return {
+        "requests": len(timings),
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p90_ms": round(percentile(timings, 0.90), 3),
+        "p99_ms": round(percentile(timings, 0.99), 3),
+        "max_ms": round(timings[-1], 3),
+        "throughput_rps": round(len(timings) / elapsed, 1),
+    }
+
+
+def bench_sequential(app, accounts, requests, password, expect_success, unknown=False):
+    client = app.test_client()
+    timings = []
+    started = time.perf_counter()
+    for n in range(requests):
+        teacher_id = f"NOBODY-{n}" if unknown else f"BENCH-T{n % accounts:05d}"
+        t0 = time.perf_counter()
+        _login(client, teacher_id, password, expect_success)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return _summary(timings, time.perf_counter() - started)
+
+
+def bench_concurrent(app, accounts, requests, threads):
+    timings = []
+    lock = threading.Lock()
+
+    def worker(offset):
+        client = app.test_client()
+        local = []
+        for n in range(offset, requests, threads):
+            t0 = time.perf_counter()
+            _login(client, f"BENCH-T{n % accounts:05d}", BENCH_PASSWORD, True)
+            local.append((time.perf_counter() - t0) * 1000)
+        with lock:
+            timings.extend(local)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(k,)) for k in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return _summary(timings, time.perf_counter() - started)
+
+
+def bench_method(app_module, workdir, method, args):
+    import db
+
+    if args.memory:
+        db_path = db.memory_uri(f"ams-bench-login-{method}")
+    else:
+        db_path = os.path.join(workdir, f"login-{len(os.listdir(workdir))}.db")
+    build_database(db_path, args.accounts, method)
+    app = app_module.create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, DB_PATH=db_path, PASSWORD_HASH_METHOD=method)
+
+    for _ in range(args.warmup):
+        _login(app.test_client(), "BENCH-T00000", BENCH_PASSWORD, True)
+
+    result = {
+        "login": bench_sequential(app, args.accounts, args.requests, BENCH_PASSWORD, True),
+        "wrong_password": bench_sequential(app, args.accounts, args.requests, "not-the-password", False),
+        "unknown_account": bench_sequential(app, args.accounts, args.requests, BENCH_PASSWORD, False, unknown=True),
+    }
+    if args.threads > 1:
+        result["concurrent"] = bench_concurrent(app, args.accounts, args.requests * args.threads, args.threads)
+        result["concurrent"]["threads"] = args.threads
+
+    # One core serves 1000 / p50 logins a second
+    per_core = 1000 / result["login"]["p50_ms"]
+    result["logins_per_core_per_s"] = round(per_core, 1)
+    if args.burst:
+        result["cores_for_burst"] = math.ceil(args.burst / (per_core * args.window))
+    db.drop_database(db_path)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--methods", nargs="+", default=None,
+                        help="werkzeug hash methods to compare (default: passwords.DEFAULT_METHOD).")
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=50, help="Timed logins per scenario.")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1,
+                        help="Concurrent clients for the throughput run (1 = skip it).")
+    parser.add_argument("--burst", type=int, default=0, help="Logins expected in one morning burst.")
+    parser.add_argument("--window", type=float, default=300, help="Seconds the burst is spread over.")
+    parser.add_argument("--memory", action="store_true", help="Keep the accounts in an in-memory database.")
+    parser.add_argument("--output", help="Write results JSON here.")
+    args = parser.parse_args(argv)
+
+    import app as app_module
+    import passwords
+
+    workdir = tempfile.mkdtemp(prefix="ams-bench-login-")
+    results = {}
+    try:
+        for method in args.methods or [passwords.DEFAULT_METHOD]:
+            r = results[method] = bench_method(app_module, workdir, method, args)
+            print(f"{method}")
+            for scenario in ("login", "wrong_password", "unknown_account", "concurrent"):
+                if scenario in r:
+                    s = r[scenario]
+                    print(f"  {scenario:16} p50 {s['p50_ms']:8.2f} ms  p90 {s['p90_ms']:8.2f} ms  "
+                          f"p99 {s['p99_ms']:8.2f} ms  {s['throughput_rps']:7.1f} logins/s")
+            line = f"  {r['logins_per_core_per_s']} logins/s per core"
+            if args.burst:
+                line += f"; {r['cores_for_burst']} core(s) for {args.burst:,} logins in {args.window:g} s"
+            print(line)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        report = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "methods": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Route Benchmarks
+Latency percentiles and throughput for the busiest routes, measured with
+the Flask test client against a seeded database
+
+Usage:
+    python benchmarks/bench_routes.py run --output results.json
+    python benchmarks/bench_routes.py run --baseline baseline.json --threshold 0.2
+    python benchmarks/bench_routes.py compare baseline.json results.json
+    python benchmarks/bench_routes.py run --memory
+
+`run` seeds a throwaway database (see seed.py), times every route in
+ROUTES and writes the results as JSON. `compare` (or `run --baseline`)
+exits with status 1 when any route's p50/p90 latency is more than
+--threshold (a fraction, 0.2 = 20%) slower than the stored baseline.
+--memory keeps the database in memory (see db.memory_uri) to time the
+app without disk I/O; compare such runs only with each other.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_TEACHER = "SEED-T00001"
+BENCH_STUDENT = "SEED-S0000001"
+COMPARED_METRICS = ("p50_ms", "p90_ms")
+
+
+def _teacher_session(client):
+    with client.session_transaction() as sess:
+        sess["logged_in"] = True
+        sess["teacher_id"] = BENCH_TEACHER
+        sess["teacher_name"] = "Bench Teacher"
+        sess["teacher_dept"] = "CSE"
+
+
+def _student_session(client):
+    with client.session_transaction() as sess:
+        sess["logged_in"] = True
+        sess["student_id"] = BENCH_STUDENT
+        sess["student_name"] = "Bench Student"
+        sess["student_dept"] = "CSE"
+
+
+SUBMISSION = {
+    "student_id": BENCH_STUDENT,
+    "achievement_type": "hackathon",
+    "event_name": "Bench Hackathon",
+    "achievement_date": "2025-04-12",
+    "organizer": "Bench University",
+    "position": "First Place",
+    "team_size": "4",
+    "project_title": "Benchmarks",
+}
+
+# name -> (session setup, method, path, form data)
+ROUTES = {
+    "/teacher": (None, "POST", "/teacher", {"tname": BENCH_TEACHER, "password": "password"}),
+    "/teacher-dashboard": (_teacher_session, "GET", "/teacher-dashboard", None),
+    "/all-achievements": (_teacher_session, "GET", "/all-achievements", None),
+    "/export-csv": (_teacher_session, "GET", "/export-csv", None),
+    "/submit_achievements": (_teacher_session, "POST", "/submit_achievements", SUBMISSION),
+    "/student-dashboard": (_student_session, "GET", "/student-dashboard", None),
+}
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+    return samples[index]
+
+
+def build_database(db_path, students, teachers, achievements, seed_value):
+    import db
+    import migrations
+    import seed
+
+    migrations.migrate(db_path, log=None)
+    connection = db.open_connection(db_path)
+    seed.seed_database(connection, students=students, teachers=teachers,
+                       achievements=achievements, seed=seed_value)
+    connection.close()
+
+
+def bench_route(client, name, requests, warmup):
+    setup, method, path, data = ROUTES[name]
+    if setup:
+        setup(client)
+
+    def call():
+        response = client.open(path, method=method, data=data)
+        # Drain streamed bodies so /export-csv is timed end to end
+        body = response.get_data()
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name} returned {response.status_code}")
+        return len(body)
+
+    for _ in range(warmup):
+        call()
+
+    timings = []
+    bytes_out = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        bytes_out += call()
+        timings.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        "requests": requests,
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p90_ms": round(percentile(timings, 0.90), 3),
+        "p99_ms": round(percentile(timings, 0.99), 3),
+        "max_ms": round(timings[-1], 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "bytes_per_request": bytes_out // requests,
+    }
+
+
+def run(args):
+    import app as app_module
+    import db
+
+    workdir = tempfile.mkdtemp(prefix="ams-bench-")
+    db_path = db.memory_uri("ams-bench") if args.memory else os.path.join(workdir, "bench.db")
+    try:
+        print(f"Seeding {args.achievements:,} achievements into {db_path} ...")
+        build_database(db_path, args.students, args.teachers, args.achievements, args.seed)
+
+        app = app_module.create_app()
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, DB_PATH=db_path)
+        client = app.test_client()
+
+        results = {}
+        for name in args.routes or list(ROUTES):
+            results[name] = bench_route(client, name, args.requests, args.warmup)
+            r = results[name]
+            print(f"{name:24} p50 {r['p50_ms']:9.2f} ms  p90 {r['p90_ms']:9.2f} ms  "
+                  f"p99 {r['p99_ms']:9.2f} ms  {r['throughput_rps']:8.1f} req/s")
+    finally:
+        db.drop_database(db_path)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": {
+            "students": args.students,
+            "teachers": args.teachers,
+            "achievements": args.achievements,
+            "seed": args.seed,
+        },
+        "routes": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            return compare_reports(json.load(f), report, args.threshold)
+    return 0
+
+
+def compare_reports(baseline, current, threshold):
+    """Print a per-route comparison; return 1 if any route regressed beyond threshold."""
+    regressions = []
+    for name, now in current["routes"].items():
+        before = baseline.get("routes", {}).get(name)
+        if not before:
+            print(f"{name:24} (no baseline)")
+            continue
+        for metric in COMPARED_METRICS:
+            change = (now[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            flag = "REGRESSION" if change > threshold else ""
+            print(f"{name:24} {metric:7} {before[metric]:9.2f} -> {now[metric]:9.2f} ms "
+                  f"({change:+.1%}) {flag}")
+            if flag:
+                regressions.append((name, metric, change))
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {threshold:.0%}")
+        return 1
+    print(f"No regressions beyond {threshold:.0%}")
+    return 0
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.results) as f:
+        current = json.load(f)
+    return compare_reports(baseline, current, args.threshold)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Seed a database and benchmark the routes.")
+    run_parser.add_argument("--students", type=int, default=2000)
+    run_parser.add_argument("--teachers", type=int, default=50)
+    run_parser.add_argument("--achievements", type=int, default=100000)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--requests", type=int, default=200, help="Timed requests per route.")
+    run_parser.add_argument("--warmup", type=int, default=10, help="Untimed requests per route.")
+    run_parser.add_argument("--routes", nargs="+", choices=list(ROUTES), help="Only these routes.")
+    run_parser.add_argument("--output", help="Write results JSON here.")
+    run_parser.add_argument("--baseline", help="Compare against this results JSON.")
+    run_parser.add_argument("--threshold", type=float, default=0.2)
+    run_parser.add_argument("--keep", action="store_true", help="Keep the seeded database afterwards.")
+    run_parser.add_argument("--memory", action="store_true", help="Seed an in-memory database instead of a file.")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Compare two results files.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("--threshold", type=float, default=0.2)
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Startup Benchmarks
+Cold start cost of a worker: importing app, building it with create_app()
+and serving the first request, each measured in a fresh interpreter
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --collect --output startup.json
+
+Every run starts a new Python process, so module caches never carry over
+between samples. The first request goes to / through the test
+client against a throwaway migrated database. --collect also times
+`pytest --collect-only`, the floor of every test run.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_routes import percentile  # noqa: E402
+
+# Runs in the child; prints one JSON line of phase timings in ms
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app as app_module
+t1 = time.perf_counter()
+app = app_module.create_app()
+app.config.update(TESTING=True, DB_PATH=sys.argv[1])
+t2 = time.perf_counter()
+status = app.test_client().get("/").status_code
+t3 = time.perf_counter()
+assert status == 200, status
+print(json.dumps({"import": (t1 - t0) * 1000, "create_app": (t2 - t1) * 1000,
+                  "first_request": (t3 - t2) * 1000, "total": (t3 - t0) * 1000}))
+"""
+
+PHASES = ("import", "create_app", "first_request", "total")
+
+
+def probe(db_path):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, db_path], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def time_collection():
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "pytest", "--collect-only", "-q"], cwd=ROOT, check=True, capture_output=True
+    )
+    return (time.perf_counter() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters to sample.")
+    parser.add_argument("--collect", action="store_true", help="Also time pytest test collection.")
+    parser.add_argument("--output", help="Write results JSON here.")
+    args = parser.parse_args(argv)
+
+    import migrations
+
+    with tempfile.TemporaryDirectory(prefix="ams-bench-startup-") as workdir:
+        db_path = os.path.join(workdir, "startup.db")
+        migrations.migrate(db_path, log=None)
+        probe(db_path)  # warm the OS file cache and __pycache__
+        samples = [probe(db_path) for _ in range(args.runs)]
+
+    results = {}
+    for phase in PHASES:
+        timings = sorted(s[phase] for s in samples)
+        results[phase] = {
+            "p50_ms": round(percentile(timings, 0.50), 1),
+            "p90_ms": round(percentile(timings, 0.90), 1),
+            "min_ms": round(timings[0], 1),
+        }
+        print(f"{phase:14} p50 {results[phase]['p50_ms']:7.1f} ms  p90 {results[phase]['p90_ms']:7.1f} ms  "
+              f"min {results[phase]['min_ms']:7.1f} ms")
+    if args.collect:
+        results["pytest_collect_ms"] = round(time_collection(), 1)
+        print(f"{'pytest collect':14} {results['pytest_collect_ms']:7.1f} ms")
+
+    if args.output:
+        report = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+            "phases": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
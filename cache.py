@@ -0,0 +1,294 @@
+"""
+Cache Module
+TTL caches for per-teacher page data, kept in-process or in a SQLite file shared by all workers
+"""
+import collections
+import json
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+import metrics
+
+# Expired rows are swept from a shared store once every this many writes
+PURGE_EVERY = 256
+
+# A change counter per teacher: triggers bump it in the same transaction
+# as every write to what that teacher's cached data is built from, so any
+# process can tell with one primary-key read whether what it cached for
+# the teacher is still current. Only the columns cached pages show count:
+# a password rehash, another teacher's submission or a certificate move
+# leaves the entry alone. A teacher without a row is at version 0.
+TEACHER_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS teacher_data_version (
+    teacher_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+# achievements columns the dashboard shows or orders by
+VERSIONED_ACHIEVEMENT_COLUMNS = (
+    "teacher_id", "student_id", "achievement_type", "event_name", "achievement_date", "created_at",
+)
+
+
+def _bump(teacher_ids):
+    """Trigger statement bumping every teacher selected by teacher_ids (a SELECT ... WHERE ...)."""
+    return f"""
+        INSERT INTO teacher_data_version (teacher_id, version)
+        {teacher_ids}
+        ON CONFLICT (teacher_id) DO UPDATE SET version = version + 1;
+    """
+
+
+TEACHER_VERSION_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS achievements_teacher_version_insert
+    AFTER INSERT ON achievements
+    BEGIN
+        {_bump("SELECT NEW.teacher_id, 1 WHERE NEW.teacher_id IS NOT NULL")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS achievements_teacher_version_delete
+    AFTER DELETE ON achievements
+    BEGIN
+        {_bump("SELECT OLD.teacher_id, 1 WHERE OLD.teacher_id IS NOT NULL")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS achievements_teacher_version_update
+    AFTER UPDATE OF {", ".join(VERSIONED_ACHIEVEMENT_COLUMNS)} ON achievements
+    BEGIN
+        {_bump("SELECT OLD.teacher_id, 1 WHERE OLD.teacher_id IS NOT NULL")}
+        {_bump("SELECT NEW.teacher_id, 1 WHERE NEW.teacher_id IS NOT NULL AND NEW.teacher_id IS NOT OLD.teacher_id")}
+    END
+    """,
+    # Recent entries show the student's name, for every teacher who recorded them
+    f"""
+    CREATE TRIGGER IF NOT EXISTS student_teacher_version_update
+    AFTER UPDATE OF student_id, student_name ON student
+    BEGIN
+        {_bump("SELECT teacher_id, 1 FROM teacher_students WHERE student_id = OLD.student_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS student_teacher_version_delete
+    AFTER DELETE ON student
+    BEGIN
+        {_bump("SELECT teacher_id, 1 FROM teacher_students WHERE student_id = OLD.student_id")}
+    END
+    """,
+]
+
+# Listings show a preview once it exists, so a certificate's preview state
+# counts for every teacher with an achievement pointing at it
+THUMBNAIL_VERSION_TRIGGER = f"""
+    CREATE TRIGGER IF NOT EXISTS certificates_teacher_version_thumbnail
+    AFTER UPDATE OF has_thumbnail ON certificates
+    WHEN OLD.has_thumbnail IS NOT NEW.has_thumbnail
+    BEGIN
+        {_bump("SELECT DISTINCT teacher_id, 1 FROM achievements WHERE certificate_path = NEW.path AND teacher_id IS NOT NULL")}
+    END
+"""
+
+# For bulk loads that run without the triggers; parameter: teacher_id
+BUMP_TEACHER_VERSION = """
+    INSERT INTO teacher_data_version (teacher_id, version) VALUES (?, 1)
+    ON CONFLICT (teacher_id) DO UPDATE SET version = version + 1
+"""
+
+TEACHER_VERSION = "SELECT version FROM teacher_data_version WHERE teacher_id = ?"
+
+
+def teacher_version(connection, teacher_id):
+    """The teacher's change counter; it differs from an earlier reading iff their cached data changed since."""
+    row = connection.execute(TEACHER_VERSION, (teacher_id,)).fetchone()
+    return row[0] if row else 0
+
+
+class _Cache:
+    """Counters shared by both backends; _count() is called with _lock held."""
+
+    def __init__(self, name, ttl):
+        self.name = name
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "invalidations": 0}
+
+    def _count(self, event, result=None):
+        self._stats[event] += 1
+        if result:
+            metrics.registry.inc("ams_cache_requests_total", (("cache", self.name), ("result", result)))
+
+
+class LRUCache(_Cache):
+    """
+    An in-process cache of up to max_entries values, each kept for ttl
+    seconds. Values are shared with callers, so they must not be mutated.
+    Every worker process has its own copy. Entries stored with a version
+    (see teacher_version()) are only returned while the caller presents the
+    same one, which keeps the copies coherent with writes made elsewhere.
+    """
+
+    def __init__(self, name, ttl, max_entries=1024):
+        super().__init__(name, ttl)
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+
+    def get(self, key, version=None):
+        """The value cached for key at version, or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now and entry[1] == version:
+                self._entries.move_to_end(key)
+                self._count("hits", "hit")
+                return entry[2]
+            if entry is not None:
+                del self._entries[key]
+            self._count("misses", "miss")
+        return None
+
+    def set(self, key, value, version=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._count("sets")
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._count("invalidations")
+        metrics.registry.inc("ams_cache_invalidations_total", (("cache", self.name),))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Snapshot of counters: hits, misses, sets, invalidations, entries."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["entries"] = len(self._entries)
+        return snapshot
+
+
+class SQLiteCache(_Cache):
+    """
+    A cache kept in a SQLite file that every worker process on the host
+    opens, so an invalidation in one worker is seen by all of them.
+    Values are stored as JSON; each thread keeps its own connection.
+    """
+
+    def __init__(self, name, ttl, path):
+        super().__init__(name, ttl)
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("PRAGMA busy_timeout = 5000")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    cache TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    version INTEGER,
+                    expires REAL NOT NULL,
+                    PRIMARY KEY (cache, key)
+                ) WITHOUT ROWID
+            """)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key, version=None):
+        row = self._connection().execute(
+            "SELECT value FROM cache_entries WHERE cache = ? AND key = ? AND version IS ? AND expires > ?",
+            (self.name, str(key), version, time.time()),
+        ).fetchone()
+        with self._lock:
+            self._count("hits" if row else "misses", "hit" if row else "miss")
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, version=None):
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache_entries (cache, key, value, version, expires) VALUES (?, ?, ?, ?, ?)",
+            (self.name, str(key), json.dumps(value), version, time.time() + self.ttl),
+        )
+        with self._lock:
+            self._count("sets")
+            purge = self._stats["sets"] % PURGE_EVERY == 0
+        if purge:
+            connection.execute("DELETE FROM cache_entries WHERE expires <= ?", (time.time(),))
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM cache_entries WHERE cache = ? AND key = ?", (self.name, str(key)))
+        with self._lock:
+            self._count("invalidations")
+        metrics.registry.inc("ams_cache_invalidations_total", (("cache", self.name),))
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache_entries WHERE cache = ?", (self.name,))
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot["entries"] = self._connection().execute(
+            "SELECT count(*) FROM cache_entries WHERE cache = ? AND expires > ?", (self.name, time.time())
+        ).fetchone()[0]
+        return snapshot
+
+
+BACKENDS = {"memory": LRUCache, "sqlite": SQLiteCache}
+
+
+def _build(app, name):
+    prefix = name.upper() + "_CACHE"
+    backend = app.config.get(prefix)
+    if not backend:
+        return None
+    if backend not in BACKENDS:
+        raise ValueError(f"{prefix} must be one of {', '.join(BACKENDS)} or empty, not {backend!r}")
+    ttl = app.config.get(prefix + "_TTL", 30)
+    if backend == "sqlite":
+        return SQLiteCache(name, ttl, app.config["CACHE_PATH"])
+    return LRUCache(name, ttl, app.config.get(prefix + "_SIZE", 1024))
+
+
+def get_cache(name):
+    """
+    The current app's cache called name, configured by <NAME>_CACHE
+    ("memory", "sqlite" or empty for none), <NAME>_CACHE_TTL (seconds)
+    and, in memory, <NAME>_CACHE_SIZE (entries). None when disabled.
+    """
+    caches = current_app.extensions.setdefault("ams_caches", {})
+    if name not in caches:
+        caches[name] = _build(current_app, name)
+    return caches[name]
+
+
+def invalidate(name, key):
+    """Drop key from the current app's cache called name, if that cache is enabled."""
+    cache = get_cache(name)
+    if cache is not None:
+        cache.delete(key)
+
+
+def reset(app):
+    """
+    Empty and forget every cache app has built, so the next lookup builds
+    them again from app.config (used when the database is swapped, e.g. in tests).
+    """
+    for cache in app.extensions.pop("ams_caches", {}).values():
+        if cache is not None:
+            cache.clear()
@@ -0,0 +1,254 @@
+"""
+CLI Commands Module
+Maintenance commands registered under `flask ams ...`
+"""
+import os
+import random
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+import cache
+import storage
+from db import get_db
+
+# The modules behind each command are imported in its body: this module is
+# loaded by every create_app(), and most of them (multiprocessing pools,
+# seed data, upload GC) are never needed to serve a request.
+ams_cli = AppGroup("ams", help="Achievement Management System maintenance commands.")
+
+
+def _upload_folder():
+    return current_app.config.get("UPLOAD_FOLDER", os.path.join(current_app.static_folder, "uploads"))
+
+
+def _shard_depth():
+    return current_app.config.get("UPLOAD_SHARD_DEPTH", storage.DEFAULT_SHARD_DEPTH)
+
+
+@ams_cli.command("migrate")
+def migrate_command():
+    """Apply pending schema migrations."""
+    import migrations
+    db_path = current_app.config["DB_PATH"]
+    applied = migrations.migrate(db_path, log=click.echo)
+    if not applied:
+        click.echo(f"Database at {db_path} is already at version {migrations.LATEST_VERSION}")
+
+
+@ams_cli.command("rebuild-stats")
+def rebuild_stats_command():
+    """Recompute teacher dashboard statistics from the achievements table."""
+    import stats
+    connection = get_db(current_app.config["DB_PATH"])
+    with connection:
+        stats.rebuild_teacher_stats(connection.cursor())
+    click.echo("Teacher statistics rebuilt")
+
+
+@ams_cli.command("check-stats")
+def check_stats_command():
+    """Compare teacher statistics with live aggregates; exits 1 on drift."""
+    import stats
+    connection = get_db(current_app.config["DB_PATH"])
+    problems = stats.check_teacher_stats(connection)
+    for problem in problems:
+        click.echo(problem, err=True)
+    if problems:
+        raise SystemExit(1)
+    click.echo("Teacher statistics are consistent")
+
+
+@ams_cli.command("seed")
+@click.option("--students", default=1000, show_default=True, help="Students to create.")
+@click.option("--teachers", default=50, show_default=True, help="Teachers to create.")
+@click.option("--achievements", default=100000, show_default=True, help="Achievements to create.")
+@click.option("--seed", "random_seed", default=0, show_default=True, help="Random seed for reproducible data.")
+@click.option("--end-date", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Latest achievement_date to generate (default: today).")
+@click.option("--certificates", default=0, show_default=True,
+              help="Placeholder certificate files to write and attach to ~30% of achievements.")
+@click.option("--batch-size", default=10000, show_default=True, help="Rows per executemany() batch.")
+def seed_command(students, teachers, achievements, random_seed, end_date, certificates, batch_size):
+    """Load synthetic students, teachers and achievements for load testing."""
+    import seed
+    connection = get_db(current_app.config["DB_PATH"])
+    blobs = []
+    if certificates:
+        cursor = connection.cursor()
+        blobs = seed.write_placeholder_certificates(
+            _upload_folder(), certificates, random.Random(random_seed), shard_depth=_shard_depth(), cursor=cursor
+        )
+        with connection:
+            blobs = [storage.register(cursor, blob) for blob in blobs]
+
+    counts = seed.seed_database(
+        connection,
+        students=students,
+        teachers=teachers,
+        achievements=achievements,
+        seed=random_seed,
+        end_date=end_date.date() if end_date else None,
+        certificate_paths=[blob.path for blob in blobs],
+        batch_size=batch_size,
+        log=click.echo,
+    )
+    click.echo(
+        f"Seeded {counts['students']} students, {counts['teachers']} teachers, "
+        f"{counts['achievements']} achievements and {len(blobs)} certificate files"
+    )
+
+
+@ams_cli.command("dedupe-uploads")
+@click.option("--dry-run", is_flag=True, help="Only report what would be collapsed.")
+@click.option("--verbose", "-v", is_flag=True, help="List every file and its blob.")
+def dedupe_uploads_command(dry_run, verbose):
+    """Move legacy uploads to content-addressed storage, collapsing duplicates."""
+    connection = get_db(current_app.config["DB_PATH"])
+    result = storage.dedupe_uploads(
+        connection, _upload_folder(), shard_depth=_shard_depth(), dry_run=dry_run,
+        log=click.echo if verbose else None,
+    )
+    prefix = "Would collapse" if dry_run else "Collapsed"
+    click.echo(
+        f"{prefix} {result['files']} files into {result['blobs']} blobs "
+        f"({result['duplicates']} duplicates, {result['bytes_reclaimed']:,} bytes reclaimed, "
+        f"{result['rows_updated']} achievements repointed)"
+    )
+
+
+@ams_cli.command("reshard-uploads")
+@click.option("--depth", type=int, default=None,
+              help="Directory levels to fan out to (default: UPLOAD_SHARD_DEPTH).")
+@click.option("--batch-size", default=500, show_default=True, help="Files moved per transaction.")
+@click.option("--dry-run", is_flag=True, help="Only count the files that would move.")
+def reshard_uploads_command(depth, batch_size, dry_run):
+    """Move stored certificates to the configured directory layout (run offline)."""
+    depth = _shard_depth() if depth is None else depth
+    connection = get_db(current_app.config["DB_PATH"])
+    result = storage.reshard_uploads(
+        connection, _upload_folder(), depth, batch_size=batch_size, dry_run=dry_run, log=click.echo
+    )
+    prefix = "Would move" if dry_run else "Moved"
+    click.echo(f"{prefix} {result['files']} files to depth {depth} "
+               f"({result['rows_updated']} achievements repointed)")
+
+
+@ams_cli.command("thumbnails")
+@click.option("--all", "regenerate", is_flag=True, help="Rebuild previews that already exist.")
+def thumbnails_command(regenerate):
+    """Generate missing certificate thumbnails and previews."""
+    import thumbnails
+    if not thumbnails.load_imaging():
+        click.echo("Pillow is not installed; no previews can be generated", err=True)
+        raise SystemExit(1)
+    db_path = current_app.config["DB_PATH"]
+    connection = get_db(db_path)
+    where = "" if regenerate else "WHERE has_thumbnail = 0"
+    paths = [row[0] for row in connection.execute(f"SELECT path FROM certificates {where} ORDER BY path")]
+    done = skipped = failed = 0
+    for path in paths:
+        if not thumbnails.can_render(path):
+            skipped += 1
+            continue
+        try:
+            if regenerate:
+                thumbnails.render_variants(_upload_folder(), path)
+            if thumbnails.generate(db_path, _upload_folder(), path):
+                done += 1
+            else:
+                failed += 1
+                click.echo(f"{path}: cannot be rendered", err=True)
+        except Exception as e:
+            failed += 1
+            click.echo(f"{path}: {e}", err=True)
+    click.echo(f"Generated previews for {done} certificates ({skipped} unsupported, {failed} failed)")
+
+
+@ams_cli.command("gc-uploads")
+@click.option("--grace-hours", type=float, default=None,
+              help="Leave orphans younger than this alone (uploads still being submitted; default: 24).")
+@click.option("--quarantine-days", type=float, default=None,
+              help="Keep quarantined files this long before deleting them (default: 7).")
+@click.option("--dry-run", is_flag=True, help="Only list what would be quarantined.")
+def gc_uploads_command(grace_hours, quarantine_days, dry_run):
+    """Quarantine, then delete, certificate files no achievement refers to."""
+    import orphans
+    grace_seconds = orphans.DEFAULT_GRACE_SECONDS if grace_hours is None else grace_hours * 3600
+    quarantine_seconds = orphans.DEFAULT_QUARANTINE_SECONDS if quarantine_days is None else quarantine_days * 86400
+    connection = get_db(current_app.config["DB_PATH"])
+    result = orphans.collect_orphans(
+        connection, _upload_folder(), grace_seconds=grace_seconds,
+        quarantine_seconds=quarantine_seconds, dry_run=dry_run, log=click.echo,
+    )
+    click.echo(
+        f"{result['scanned_orphans']} orphans found, {result['quarantined']} quarantined "
+        f"({result['quarantined_bytes']:,} bytes), {result['restored']} restored, "
+        f"{result['deleted']} deleted ({result['reclaimed_bytes']:,} bytes reclaimed)"
+    )
+
+
+@ams_cli.command("import-achievements")
+@click.argument("csv_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--teacher", "teacher_id", required=True, help="teacher_id the achievements are recorded under.")
+@click.option("--chunk-rows", type=int, default=None,
+              help="Rows validated and inserted per transaction (default: 5000).")
+def import_achievements_command(csv_file, teacher_id, chunk_rows):
+    """Bulk-import achievements from a CSV file; exits 1 if any row was rejected."""
+    import importer
+    chunk_rows = importer.IMPORT_CHUNK_ROWS if chunk_rows is None else chunk_rows
+    connection = get_db(current_app.config["DB_PATH"])
+    if not connection.execute("SELECT 1 FROM teacher WHERE teacher_id = ?", (teacher_id,)).fetchone():
+        raise click.BadParameter(f"no teacher {teacher_id!r}", param_hint="--teacher")
+    with open(csv_file, encoding="utf-8-sig", newline="") as lines:
+        result = importer.import_achievements(connection, lines, teacher_id, chunk_rows=chunk_rows, log=click.echo)
+    if result["imported"]:
+        # Only reaches the web workers when they share the "sqlite" cache store
+        cache.invalidate("dashboard", teacher_id)
+    for line, message in result["errors"]:
+        click.echo(f"line {line}: {message}", err=True)
+    click.echo(f"Imported {result['imported']} of {result['rows']} rows ({result['rejected']} rejected)")
+    if result["errors"]:
+        raise SystemExit(1)
+
+
+@ams_cli.command("import-students")
+@click.argument("csv_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--hash-method", default=None,
+              help="werkzeug password hash method (default: PASSWORD_HASH_METHOD).")
+@click.option("--processes", type=int, default=None, help="Hashing worker processes (default: one per CPU).")
+@click.option("--chunk-rows", type=int, default=None,
+              help="Rows checked, hashed and inserted per transaction (default: 1000).")
+def import_students_command(csv_file, hash_method, processes, chunk_rows):
+    """Register students from a roster CSV file; exits 1 if any row was rejected."""
+    import importer
+    import passwords
+    chunk_rows = importer.STUDENT_CHUNK_ROWS if chunk_rows is None else chunk_rows
+    connection = get_db(current_app.config["DB_PATH"])
+    method = hash_method or current_app.config.get("PASSWORD_HASH_METHOD", passwords.DEFAULT_METHOD)
+    with open(csv_file, encoding="utf-8-sig", newline="") as lines:
+        result = importer.import_students(
+            connection, lines, method=method, processes=processes, chunk_rows=chunk_rows, log=click.echo
+        )
+    for line, message in result["errors"]:
+        click.echo(f"line {line}: {message}", err=True)
+    click.echo(f"Registered {result['imported']} of {result['rows']} students ({result['rejected']} rejected)")
+    if result["errors"]:
+        raise SystemExit(1)
+
+
+@ams_cli.command("hash-passwords")
+@click.option("--hash-method", default=None,
+              help="werkzeug password hash method (default: PASSWORD_HASH_METHOD).")
+@click.option("--processes", type=int, default=None, help="Hashing worker processes (default: one per CPU).")
+@click.option("--chunk-rows", default=1000, show_default=True, help="Accounts read and updated per transaction.")
+def hash_passwords_command(hash_method, processes, chunk_rows):
+    """Replace plaintext student and teacher passwords with hashes."""
+    import passwords
+    connection = get_db(current_app.config["DB_PATH"])
+    method = hash_method or current_app.config.get("PASSWORD_HASH_METHOD", passwords.DEFAULT_METHOD)
+    counts = passwords.migrate_plaintext(
+        connection, method=method, processes=processes, chunk_rows=chunk_rows, log=click.echo
+    )
+    click.echo(f"Hashed {counts['student']} student and {counts['teacher']} teacher passwords")
@@ -1,45 +1,112 @@
-import os
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-class Config:
-    # Security
-    # SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key")
-
-    # Database
-    DB_PATH = os.environ.get(
-        "DB_PATH",
-        os.path.join(BASE_DIR, "ams.db")
-    )
-
-    # Uploads
-    UPLOAD_FOLDER = os.environ.get(
-        "UPLOAD_FOLDER",
-        os.path.join(BASE_DIR, "static", "uploads")
-    )
-
-    # File upload rules
-    ALLOWED_EXTENSIONS = {"pdf", "png", "jpg", "jpeg"}
-
-    # Max upload size (5 MB)
-    MAX_CONTENT_LENGTH = 5 * 1024 * 1024
-
-
-
-
-class DevelopmentConfig(Config):
-    DEBUG = True
-    SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key")
-
-
-class ProductionConfig(Config):
-    DEBUG = False
-    SECRET_KEY = os.environ.get("SECRET_KEY")
-
-    @classmethod
-    def validate(cls):
-        if not cls.SECRET_KEY:
-            raise RuntimeError(
-                "SECRET_KEY environment variable must be set in production"
-            )
-
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+class Config:
+    """Settings shared by every environment; each can be overridden from the environment."""
+
+    # Security
+    SECRET_KEY = os.environ.get("SECRET_KEY")
+
+    # Database: a file, or a shared in-memory database for throwaway runs
+    # ("file:<name>?mode=memory&cache=shared", see db.memory_uri)
+    DB_PATH = os.environ.get(
+        "DB_PATH",
+        os.path.join(BASE_DIR, "ams.db")
+    )
+
+    # Uploads
+    UPLOAD_FOLDER = os.environ.get(
+        "UPLOAD_FOLDER",
+        os.path.join(BASE_DIR, "static", "uploads")
+    )
+
+    # File upload rules
+    ALLOWED_EXTENSIONS = {"pdf", "png", "jpg", "jpeg"}
+
+    # Max upload size (5 MB); larger requests get a 413 before the body is read
+    MAX_CONTENT_LENGTH = 5 * 1024 * 1024
+
+    # CSV files for the bulk imports are streamed, not kept, so they may be larger
+    IMPORT_MAX_CONTENT_LENGTH = _env_int("IMPORT_MAX_CONTENT_LENGTH", 64 * 1024 * 1024)
+
+    # Fan-out of new uploads: 2 -> uploads/ab/cd/<name>, 0 -> flat. Existing
+    # files are moved with `flask ams reshard-uploads`
+    UPLOAD_SHARD_DEPTH = _env_int("UPLOAD_SHARD_DEPTH", 2)
+
+    # Scheme and cost for new password hashes (see passwords.DEFAULT_METHOD);
+    # accounts hashed differently are rehashed at their next login. Roster
+    # imports hash across PASSWORD_HASH_PROCESSES workers (None = one per CPU)
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+    PASSWORD_HASH_PROCESSES = _env_int("PASSWORD_HASH_PROCESSES", 0) or None
+
+    # Opt-in slow query log: statements slower than this many ms are logged with
+    # their query plan; the top statements are listed at /admin/slow-queries
+    SLOW_QUERY_MS = os.environ.get("SLOW_QUERY_MS")
+    ADMIN_TEACHER_IDS = [t for t in os.environ.get("ADMIN_TEACHER_IDS", "").split(",") if t]
+
+    # Certificates are only served through /certificates/<id>, never as static files.
+    # CERTIFICATE_SENDFILE hands the transfer to the front proxy: "x-accel-redirect"
+    # (nginx, internal location CERTIFICATE_ACCEL_PREFIX aliased to UPLOAD_FOLDER)
+    # or "x-sendfile" (Apache/lighttpd); unset streams the file from Flask.
+    CERTIFICATE_SENDFILE = os.environ.get("CERTIFICATE_SENDFILE") or None
+    CERTIFICATE_ACCEL_PREFIX = os.environ.get("CERTIFICATE_ACCEL_PREFIX", "/protected-uploads/")
+
+    # Optional write-behind: achievement inserts are queued to one writer thread
+    # that group-commits up to MAX_BATCH of them per MAX_WAIT_MS window
+    WRITE_BEHIND = _env_flag("WRITE_BEHIND")
+    WRITE_BEHIND_MAX_BATCH = _env_int("WRITE_BEHIND_MAX_BATCH", 64)
+    WRITE_BEHIND_MAX_WAIT_MS = float(os.environ.get("WRITE_BEHIND_MAX_WAIT_MS") or 5)
+    WRITE_BEHIND_TIMEOUT = 30
+
+    # Optional background sweep of upload files no achievement points to; see orphans.py
+    ORPHAN_GC_INTERVAL = os.environ.get("ORPHAN_GC_INTERVAL")
+
+    # Threads generating certificate thumbnails/previews in the background (0 = off)
+    THUMBNAIL_WORKERS = _env_int("THUMBNAIL_WORKERS", 2)
+
+    # Teacher dashboard data is cached per teacher for DASHBOARD_CACHE_TTL
+    # seconds, dropped when that teacher's achievements change and ignored
+    # once the teacher's version in the database moves on (see cache.py), so
+    # workers stay coherent. "memory" keeps it per worker process; "sqlite" shares
+    # one store in CACHE_PATH across the workers of a host; empty turns it off.
+    DASHBOARD_CACHE = os.environ.get("DASHBOARD_CACHE", "memory")
+    DASHBOARD_CACHE_TTL = _env_int("DASHBOARD_CACHE_TTL", 30)
+    DASHBOARD_CACHE_SIZE = _env_int("DASHBOARD_CACHE_SIZE", 1024)
+    CACHE_PATH = os.environ.get("CACHE_PATH", os.path.join(BASE_DIR, "instance", "cache.db"))
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key")
+
+
+class ProductionConfig(Config):
+    DEBUG = False
+    SECRET_KEY = os.environ.get("SECRET_KEY")
+
+    @classmethod
+    def validate(cls):
+        if not cls.SECRET_KEY:
+            raise RuntimeError(
+                "SECRET_KEY environment variable must be set in production"
+            )
+
+
+# Picked by create_app() from AMS_CONFIG when no config is passed; "default"
+# keeps a per-process random SECRET_KEY unless one is set
+CONFIGS = {
+    "default": Config,
+    "development": DevelopmentConfig,
+    "production": ProductionConfig,
+}
@@ -0,0 +1,299 @@
+"""
+Database Connection Module
+Pooled SQLite connections shared across requests
+"""
+import queue
+import sqlite3
+import threading
+import time
+
+from flask import g
+
+# PRAGMAs applied once to every new connection.
+# journal_mode is persisted in the database file; the rest are per-connection.
+PRAGMA_PROFILE = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),        # negative = KiB, so ~16 MB of page cache
+    ("mmap_size", 134217728),      # 128 MB memory-mapped I/O
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),        # milliseconds
+)
+
+
+# Callables hook(cursor, sql, seconds, executed) notified after every timed
+# cursor call. executed is True for execute()/executemany() and False for the
+# fetch calls that follow, so listeners can count statements and still see
+# fetch time.
+statement_hooks = []
+
+
+def _notify(cursor, sql, seconds, executed):
+    for hook in statement_hooks:
+        hook(cursor, sql, seconds, executed)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports the time spent in execute and fetch calls to statement_hooks."""
+
+    _sql = None
+
+    def execute(self, sql, parameters=()):
+        self._sql = sql
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _notify(self, sql, time.perf_counter() - started, True)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._sql = sql
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _notify(self, sql, time.perf_counter() - started, True)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _notify(self, self._sql, time.perf_counter() - started, False)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            _notify(self, self._sql, time.perf_counter() - started, False)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _notify(self, self._sql, time.perf_counter() - started, False)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Connection whose cursors are InstrumentedCursors.
+    Connection.execute() builds its cursor in C without calling cursor(),
+    so the shortcut methods are routed through cursor() explicitly.
+    """
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def memory_uri(name):
+    """
+    URI of a named in-memory database shared by every connection in this
+    process. Usable anywhere a DB_PATH is, e.g. for tests and throwaway
+    benchmark runs; it lasts until drop_database() or process exit.
+    """
+    return f"file:{name}?mode=memory&cache=shared"
+
+
+def is_memory(db_path):
+    return db_path.startswith("file:") and "mode=memory" in db_path
+
+
+# One connection held open per in-memory database: SQLite frees a memory
+# database as soon as its last connection closes, which pools and
+# short-lived connections (migrations, clones) would otherwise cause
+_anchors = {}
+_anchors_lock = threading.Lock()
+
+
+def open_connection(db_path, **kwargs):
+    """sqlite3.connect() that also accepts "file:" URIs and keeps memory databases alive."""
+    if is_memory(db_path) and db_path not in _anchors:
+        with _anchors_lock:
+            if db_path not in _anchors:
+                _anchors[db_path] = sqlite3.connect(db_path, uri=True, check_same_thread=False)
+    return sqlite3.connect(db_path, uri=db_path.startswith("file:"), **kwargs)
+
+
+def connect(db_path):
+    """A new instrumented connection with PRAGMA_PROFILE applied, usable from any thread."""
+    connection = open_connection(db_path, check_same_thread=False, factory=InstrumentedConnection)
+    connection.row_factory = sqlite3.Row
+    for name, value in PRAGMA_PROFILE:
+        connection.execute(f"PRAGMA {name} = {value}")
+    return connection
+
+
+class ConnectionPool:
+    """
+    A small LIFO pool of SQLite connections for one database file.
+
+    Connections are handed to one request at a time and returned on
+    teardown, so a worker thread keeps reusing the same warm connection
+    (and its page cache) instead of reconnecting on every request.
+    """
+
+    def __init__(self, db_path, max_size=8, timeout=10.0):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._stats = {"opens": 0, "hits": 0, "waits": 0, "wait_time": 0.0, "closed": 0}
+
+    def _open(self):
+        return connect(self.db_path)
+
+    def acquire(self):
+        """Return an idle connection, opening a new one if the pool has room."""
+        try:
+            connection = self._idle.get_nowait()
+            with self._lock:
+                self._stats["hits"] += 1
+            return connection
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._size < self.max_size
+            if can_open:
+                self._size += 1
+                self._stats["opens"] += 1
+
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+
+        # Pool exhausted: wait for another request to give a connection back
+        started = time.perf_counter()
+        try:
+            connection = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Timed out after {self.timeout}s waiting for a database connection"
+            )
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._stats["hits"] += 1
+            self._stats["waits"] += 1
+            self._stats["wait_time"] += waited
+        return connection
+
+    def release(self, connection):
+        """Give a connection back, discarding any transaction left open."""
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            self._discard(connection)
+            return
+        self._idle.put(connection)
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        finally:
+            with self._lock:
+                self._size -= 1
+                self._stats["closed"] += 1
+
+    def close_all(self):
+        """Close every idle connection (used on shutdown and in tests)."""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(connection)
+
+    def stats(self):
+        """Snapshot of pool counters: opens, hits, waits, wait_time, size, idle."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["size"] = self._size
+        snapshot["idle"] = self._idle.qsize()
+        return snapshot
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, max_size=8):
+    """Return the process-wide pool for db_path, creating it on first use."""
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = _pools[db_path] = ConnectionPool(db_path, max_size=max_size)
+    return pool
+
+
+def clone_database(source_path, target_path):
+    """
+    Copy the database at source_path into target_path (a file or a
+    memory_uri()) with SQLite's online backup API. Copying a migrated
+    template is much cheaper than migrating a new database.
+    """
+    source = open_connection(source_path)
+    target = open_connection(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return target_path
+
+
+def drop_database(db_path):
+    """Close the pool for db_path and, for a memory database, free it."""
+    with _pools_lock:
+        pool = _pools.pop(db_path, None)
+    if pool is not None:
+        pool.close_all()
+    with _anchors_lock:
+        anchor = _anchors.pop(db_path, None)
+    if anchor is not None:
+        anchor.close()
+
+
+def pool_stats():
+    """Stats for every pool in this process, keyed by database path."""
+    return {path: pool.stats() for path, pool in list(_pools.items())}
+
+
+def get_db(db_path):
+    """
+    Return the connection bound to the current app context.
+    The first call in a request checks one out of the pool.
+    """
+    if "db" not in g:
+        pool = get_pool(db_path)
+        g.db_pool = pool
+        g.db = pool.acquire()
+    return g.db
+
+
+def close_db(exception=None):
+    """Teardown hook: hand the request's connection back to its pool."""
+    connection = g.pop("db", None)
+    pool = g.pop("db_pool", None)
+    if connection is not None and pool is not None:
+        pool.release(connection)
+
+
+def init_app(app):
+    app.teardown_appcontext(close_db)
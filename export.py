@@ -0,0 +1,66 @@
+"""
+CSV Export Module
+Streams achievement exports in constant memory
+"""
+import csv
+import io
+import zlib
+
+# Rows pulled from SQLite per fetchmany() call and written per yielded chunk
+EXPORT_CHUNK_ROWS = 500
+
+CSV_HEADER = [
+    "#", "Student Name", "Student ID", "Achievement Type",
+    "Event Name", "Date", "Organizer", "Position",
+    "Description", "Recorded At"
+]
+
+
+def iter_achievement_csv(cursor, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Yield the CSV export for an already-executed queries.EXPORT_CSV cursor,
+    one chunk of encoded rows at a time. Only chunk_rows rows are held in
+    memory at once, however large the result set is.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain():
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+        return data
+
+    writer.writerow(CSV_HEADER)
+    yield drain()
+
+    idx = 0
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        for row in rows:
+            idx += 1
+            writer.writerow([
+                idx,
+                row["student_name"],
+                row["student_id"],
+                row["achievement_type"],
+                row["event_name"],
+                row["achievement_date"],
+                row["organizer"],
+                row["position"],
+                row["achievement_description"] or "",
+                row["created_at"]
+            ])
+        yield drain()
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress an iterable of byte chunks into a single gzip stream on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,276 @@
+"""
+Bulk Import Module
+Streams achievement and student roster CSV files into the database in chunked transactions
+"""
+import csv
+import datetime
+import functools
+import json
+import sqlite3
+
+import passwords
+import queries
+
+# Rows validated and inserted per transaction
+IMPORT_CHUNK_ROWS = 5000
+# Smaller for rosters: every row carries a password to hash first
+STUDENT_CHUNK_ROWS = 1000
+# Only the first errors are kept for the report; the rest are just counted
+MAX_REPORTED_ERRORS = 1000
+
+REQUIRED_COLUMNS = (
+    "student_id", "achievement_type", "event_name", "achievement_date", "organizer", "position",
+)
+# Type-specific columns as filled in by the submit form
+OPTIONAL_COLUMNS = (
+    "achievement_description", "symposium_theme", "programming_language", "coding_platform",
+    "paper_title", "journal_name", "conference_level", "conference_role", "team_size",
+    "project_title", "database_type", "difficulty_level", "other_description",
+)
+IMPORT_COLUMNS = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+
+ACHIEVEMENT_TYPES = {"symposium", "coding", "paper", "conference", "hackathon", "sql", "other"}
+
+STUDENT_REQUIRED_COLUMNS = ("student_name", "student_id", "email", "password")
+STUDENT_COLUMNS = STUDENT_REQUIRED_COLUMNS + ("phone_number", "student_gender", "student_dept")
+
+
+@functools.lru_cache(maxsize=4096)
+def _valid_date(value):
+    # Event files repeat a handful of dates; validate each one once
+    try:
+        datetime.datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return False
+    return True
+
+
+def _fields(row, positions, required):
+    """
+    Map one csv.reader row to {column: stripped value or None} using the
+    header positions, raising ValueError if it is malformed or lacks a
+    required value.
+    """
+    if len(row) > len(positions):
+        raise ValueError("more fields than header columns")
+    fields = {}
+    for column, index in positions.items():
+        value = row[index].strip() if index < len(row) else ""
+        fields[column] = value or None
+    missing = [column for column in required if not fields[column]]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    return fields
+
+
+def _parse_row(row, positions, teacher_id):
+    """Validate one achievement row; return its queries.INSERT_ACHIEVEMENT values or raise ValueError."""
+    fields = _fields(row, positions, REQUIRED_COLUMNS)
+    if fields["achievement_type"] not in ACHIEVEMENT_TYPES:
+        raise ValueError(f"unknown achievement_type {fields['achievement_type']!r}")
+    if not _valid_date(fields["achievement_date"]):
+        raise ValueError(f"achievement_date {fields['achievement_date']!r} is not YYYY-MM-DD")
+    team_size = fields.get("team_size")
+    if team_size is not None:
+        if not team_size.isdigit() or int(team_size) < 1:
+            raise ValueError(f"team_size {team_size!r} is not a positive integer")
+        team_size = int(team_size)
+
+    get = fields.get
+    return (
+        fields["student_id"], teacher_id, fields["achievement_type"], fields["event_name"],
+        fields["achievement_date"], fields["organizer"], fields["position"],
+        get("achievement_description"), None,
+        get("symposium_theme"), get("programming_language"), get("coding_platform"),
+        get("paper_title"), get("journal_name"), get("conference_level"),
+        get("conference_role"), team_size, get("project_title"), get("database_type"),
+        get("difficulty_level"), get("other_description"),
+    )
+
+
+def _reject(result, line, message):
+    result["rejected"] += 1
+    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+        result["errors"].append((line, message))
+
+
+def _insert_chunk(connection, pending, result):
+    """Check the chunk's student_ids in one query, then insert the known ones in one transaction."""
+    student_ids = sorted({values[0] for _, values in pending})
+    known = {row[0] for row in connection.execute(queries.STUDENTS_IN, (json.dumps(student_ids),))}
+
+    rows = []
+    for line, values in pending:
+        if values[0] in known:
+            rows.append((line, values))
+        else:
+            _reject(result, line, f"student_id {values[0]!r} does not exist")
+
+    _insert_rows(connection, queries.INSERT_ACHIEVEMENT, rows, result)
+
+
+def _insert_rows(connection, sql, rows, result):
+    """executemany() the (line, values) pairs in rows as one transaction."""
+    try:
+        with connection:
+            connection.executemany(sql, [values for _, values in rows])
+        result["imported"] += len(rows)
+    except sqlite3.Error:
+        # Rare (rows are validated first): redo the chunk row by row to find the culprits
+        with connection:
+            for line, values in rows:
+                try:
+                    connection.execute(sql, values)
+                    result["imported"] += 1
+                except sqlite3.Error as e:
+                    _reject(result, line, f"database error: {e}")
+
+
+def _read_header(reader, required, allowed, result):
+    """Return {column: index} for the header row, or None after recording why it is unusable."""
+    header = [name.strip() for name in next(reader, [])]
+    missing = [column for column in required if column not in header]
+    unknown = [name for name in header if name not in allowed]
+    repeated = sorted({name for name in header if header.count(name) > 1})
+    if missing or unknown or repeated:
+        problems = []
+        if missing:
+            problems.append(f"missing columns: {', '.join(missing)}")
+        if unknown:
+            problems.append(f"unknown columns: {', '.join(unknown)}")
+        if repeated:
+            problems.append(f"repeated columns: {', '.join(repeated)}")
+        result["errors"].append((1, "; ".join(problems)))
+        return None
+    return {name: index for index, name in enumerate(header)}
+
+
+def import_achievements(connection, lines, teacher_id, chunk_rows=IMPORT_CHUNK_ROWS, log=None):
+    """
+    Import achievements for teacher_id from CSV text lines (a file opened
+    with newline="", or any iterable of lines).
+
+    The header names columns from IMPORT_COLUMNS, in any order. Rows are
+    parsed as they stream in and written chunk_rows at a time: one
+    set-based student lookup, then one executemany() in its own
+    transaction. Memory stays bounded by the chunk size whatever the file
+    size, and a bad row is reported without failing the rest of the file.
+
+    Returns a dict with rows, imported, rejected and errors, a list of
+    (line number, message) capped at MAX_REPORTED_ERRORS.
+    """
+    result = {"rows": 0, "imported": 0, "rejected": 0, "errors": []}
+    reader = csv.reader(lines)
+
+    positions = _read_header(reader, REQUIRED_COLUMNS, IMPORT_COLUMNS, result)
+    if positions is None:
+        return result
+
+    pending = []
+    try:
+        for row in reader:
+            if not row:
+                continue  # blank line
+            result["rows"] += 1
+            try:
+                pending.append((reader.line_num, _parse_row(row, positions, teacher_id)))
+            except ValueError as e:
+                _reject(result, reader.line_num, str(e))
+            if len(pending) >= chunk_rows:
+                _insert_chunk(connection, pending, result)
+                pending = []
+                if log:
+                    log(f"  {result['rows']:,} rows read, {result['imported']:,} imported")
+    except (csv.Error, UnicodeDecodeError) as e:
+        # The rest of the file cannot be parsed; keep what was read so far
+        result["errors"].append((reader.line_num + 1, f"unreadable CSV, stopped here: {e}"))
+    if pending:
+        _insert_chunk(connection, pending, result)
+    return result
+
+
+def _insert_students(connection, pending, hash_pool, result):
+    """
+    Drop rows whose student_id or email is already registered -- two
+    set-based lookups for the whole chunk -- then hash the remaining
+    passwords in hash_pool and insert them in one transaction.
+    """
+    taken_ids = {row[0] for row in connection.execute(
+        queries.STUDENTS_IN, (json.dumps([fields["student_id"] for _, fields in pending]),)
+    )}
+    taken_emails = {row[0] for row in connection.execute(
+        queries.EMAILS_IN, (json.dumps([fields["email"] for _, fields in pending]),)
+    )}
+
+    accepted = []
+    for line, fields in pending:
+        if fields["student_id"] in taken_ids:
+            _reject(result, line, f"student_id {fields['student_id']!r} is already registered")
+        elif fields["email"] in taken_emails:
+            _reject(result, line, f"email {fields['email']!r} is already registered")
+        else:
+            accepted.append((line, fields))
+
+    # Only rows that will be inserted are worth the hashing time
+    hashes = hash_pool.hash_many([fields["password"] for _, fields in accepted])
+    rows = [
+        (line, (fields["student_name"], fields["student_id"], fields["email"], fields["phone_number"],
+                password_hash, fields["student_gender"], fields["student_dept"]))
+        for (line, fields), password_hash in zip(accepted, hashes)
+    ]
+    _insert_rows(connection, queries.INSERT_STUDENT, rows, result)
+
+
+def import_students(connection, lines, method=passwords.DEFAULT_METHOD, processes=None,
+                    chunk_rows=STUDENT_CHUNK_ROWS, log=None):
+    """
+    Register students from a roster CSV (header from STUDENT_COLUMNS, any
+    order), streaming it chunk_rows at a time like import_achievements().
+
+    A student_id or email seen earlier in the file, or already in the
+    student table, is rejected before any hashing is done. Passwords are
+    hashed with method across a passwords.HashPool of processes workers
+    (default: one per CPU) and stored hashed.
+
+    Returns the same report dict as import_achievements().
+    """
+    result = {"rows": 0, "imported": 0, "rejected": 0, "errors": []}
+    reader = csv.reader(lines)
+    positions = _read_header(reader, STUDENT_REQUIRED_COLUMNS, STUDENT_COLUMNS, result)
+    if positions is None:
+        return result
+
+    seen_ids, seen_emails = set(), set()
+    pending = []
+    with passwords.HashPool(method, processes) as hash_pool:
+        try:
+            for row in reader:
+                if not row:
+                    continue  # blank line
+                result["rows"] += 1
+                try:
+                    fields = _fields(row, positions, STUDENT_REQUIRED_COLUMNS)
+                    for column in STUDENT_COLUMNS:
+                        fields.setdefault(column, None)
+                    if "@" not in fields["email"]:
+                        raise ValueError(f"email {fields['email']!r} is not an email address")
+                    if fields["student_id"] in seen_ids:
+                        raise ValueError(f"student_id {fields['student_id']!r} appears earlier in the file")
+                    if fields["email"] in seen_emails:
+                        raise ValueError(f"email {fields['email']!r} appears earlier in the file")
+                except ValueError as e:
+                    _reject(result, reader.line_num, str(e))
+                    continue
+                seen_ids.add(fields["student_id"])
+                seen_emails.add(fields["email"])
+                pending.append((reader.line_num, fields))
+                if len(pending) >= chunk_rows:
+                    _insert_students(connection, pending, hash_pool, result)
+                    pending = []
+                    if log:
+                        log(f"  {result['rows']:,} rows read, {result['imported']:,} imported")
+        except (csv.Error, UnicodeDecodeError) as e:
+            result["errors"].append((reader.line_num + 1, f"unreadable CSV, stopped here: {e}"))
+        if pending:
+            _insert_students(connection, pending, hash_pool, result)
+    return result
@@ -0,0 +1,245 @@
+"""
+Metrics Module
+Per-route latency, status, SQL and upload metrics in Prometheus text format
+"""
+import threading
+import time
+import weakref
+
+from flask import Response, g, has_app_context, request
+
+import db
+
+# Histogram upper bounds: seconds for timings, plain counts for statements
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+QUEUE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# name -> (type, help text, buckets for histograms)
+METRICS = {
+    "ams_requests_total": ("counter", "Requests by endpoint, method and status.", None),
+    "ams_request_duration_seconds": ("histogram", "Request latency including streamed bodies.", LATENCY_BUCKETS),
+    "ams_sql_statements_total": ("counter", "SQL statements executed, by endpoint.", None),
+    "ams_sql_seconds_total": ("counter", "Time spent in SQLite execute and fetch calls, by endpoint.", None),
+    "ams_request_sql_statements": ("histogram", "SQL statements per request.", COUNT_BUCKETS),
+    "ams_request_sql_seconds": ("histogram", "SQLite time per request.", LATENCY_BUCKETS),
+    "ams_upload_bytes_total": ("counter", "Request body bytes received on uploads, by endpoint.", None),
+    "ams_write_jobs_total": ("counter", "Write-behind jobs applied, by status.", None),
+    "ams_write_batch_size": ("histogram", "Jobs per write-behind group commit.", COUNT_BUCKETS),
+    "ams_write_queue_depth": ("histogram", "Jobs still queued when a group commit starts.", QUEUE_BUCKETS),
+    "ams_write_commit_seconds": ("histogram", "Time to apply and commit one write-behind batch.", LATENCY_BUCKETS),
+    "ams_cache_requests_total": ("counter", "Cache lookups, by cache and result (hit or miss).", None),
+    "ams_cache_invalidations_total": ("counter", "Cache entries dropped after a write, by cache.", None),
+}
+
+
+class _ShardOwner:
+    """Kept only in a thread's locals: collected when the thread exits, which retires its shard."""
+
+    __slots__ = ("__weakref__",)
+
+
+def _merge(counters, histograms, shard):
+    for key, value in list(shard["counters"].items()):
+        counters[key] = counters.get(key, 0) + value
+    for key, values in list(shard["histograms"].items()):
+        merged = histograms.setdefault(key, [0] * len(values))
+        for i, value in enumerate(values):
+            merged[i] += value
+
+
+class ShardedMetrics:
+    """
+    Counters and histograms sharded per thread.
+
+    Each worker thread writes only to its own shard, so recording a sample
+    never takes a lock; the lock is held only when a thread registers its
+    shard for the first time, when /metrics merges the shards, and when a
+    thread exits and its shard is folded into the retired totals. Short-lived
+    threads therefore leave no shard behind.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = {}
+        self._retired = {"counters": {}, "histograms": {}}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            owner = self._local.owner = _ShardOwner()
+            shard = self._local.shard = {"counters": {}, "histograms": {}}
+            with self._lock:
+                self._shards[id(owner)] = shard
+            weakref.finalize(owner, self._retire, id(owner))
+        return shard
+
+    def _retire(self, key):
+        with self._lock:
+            shard = self._shards.pop(key, None)
+            if shard is not None:
+                _merge(self._retired["counters"], self._retired["histograms"], shard)
+
+    def shard_count(self):
+        """Live per-thread shards (one per thread that has recorded since it started)."""
+        with self._lock:
+            return len(self._shards)
+
+    def inc(self, name, labels, amount=1):
+        counters = self._shard()["counters"]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        histograms = self._shard()["histograms"]
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            # [per-bucket counts..., +Inf count, sum]
+            histogram = histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                histogram[i] += 1
+                break
+        else:
+            histogram[len(buckets)] += 1
+        histogram[-1] += value
+
+    def snapshot(self):
+        """Merge every shard into ({counter key: value}, {histogram key: list})."""
+        counters = {}
+        histograms = {}
+        with self._lock:
+            shards = list(self._shards.values())
+            _merge(counters, histograms, self._retired)
+        for shard in shards:
+            _merge(counters, histograms, shard)
+        return counters, histograms
+
+    def reset(self):
+        with self._lock:
+            for shard in list(self._shards.values()) + [self._retired]:
+                shard["counters"].clear()
+                shard["histograms"].clear()
+
+
+registry = ShardedMetrics()
+
+
+def _record_statement(cursor, sql, seconds, executed):
+    if not has_app_context():
+        return
+    sql_stats = g.get("sql_stats")
+    if sql_stats is None:
+        return
+    if executed:
+        sql_stats[0] += 1
+    sql_stats[1] += seconds
+
+
+def _endpoint_label():
+    # The rule, not the raw path, keeps label cardinality bounded
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def _start_timer():
+    g.request_started = time.perf_counter()
+    g.sql_stats = [0, 0.0]
+
+
+def _record_request(response):
+    started = g.get("request_started")
+    if started is None:
+        return response
+    endpoint = _endpoint_label()
+    method = request.method
+    status = str(response.status_code)
+    sql_stats = g.sql_stats
+
+    if request.content_length and request.mimetype == "multipart/form-data":
+        registry.inc("ams_upload_bytes_total", (("endpoint", endpoint),), request.content_length)
+
+    def finish():
+        # Runs once the body has been sent, so streamed exports are timed in full
+        elapsed = time.perf_counter() - started
+        labels = (("endpoint", endpoint), ("method", method))
+        registry.inc("ams_requests_total", labels + (("status", status),))
+        registry.observe("ams_request_duration_seconds", labels, elapsed)
+        endpoint_label = (("endpoint", endpoint),)
+        registry.inc("ams_sql_statements_total", endpoint_label, sql_stats[0])
+        registry.inc("ams_sql_seconds_total", endpoint_label, sql_stats[1])
+        registry.observe("ams_request_sql_statements", endpoint_label, sql_stats[0])
+        registry.observe("ams_request_sql_seconds", endpoint_label, sql_stats[1])
+
+    response.call_on_close(finish)
+    return response
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Render every metric in the Prometheus text exposition format."""
+    counters, histograms = registry.snapshot()
+    lines = []
+
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+        else:
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, values):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                cumulative += values[len(buckets)]
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(values[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+    for name, help_text, key in (
+        ("ams_db_pool_opens_total", "Connections opened by the pool.", "opens"),
+        ("ams_db_pool_hits_total", "Requests served by a pooled connection.", "hits"),
+        ("ams_db_pool_waits_total", "Checkouts that had to wait for a free connection.", "waits"),
+        ("ams_db_pool_wait_seconds_total", "Time spent waiting for a free connection.", "wait_time"),
+        ("ams_db_pool_size", "Connections currently owned by the pool.", "size"),
+    ):
+        kind = "gauge" if key == "size" else "counter"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for path, pool in sorted(db.pool_stats().items()):
+            lines.append(f"{name}{_format_labels([('database', path)])} {_format_number(pool[key])}")
+
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view():
+    return Response(render(), mimetype="text/plain", headers={"Content-Type": "text/plain; version=0.0.4"})
+
+
+def init_app(app):
+    if _record_statement not in db.statement_hooks:
+        db.statement_hooks.append(_record_statement)
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -0,0 +1,226 @@
+"""
+Schema Migration Module
+Numbered migrations tracked with PRAGMA user_version
+"""
+import cache
+import db
+import stats
+import storage
+
+STUDENT_TABLE = """
+CREATE TABLE IF NOT EXISTS student (
+    student_name TEXT NOT NULL,
+    student_id TEXT PRIMARY KEY,
+    email TEXT UNIQUE NOT NULL,
+    phone_number TEXT,
+    password TEXT NOT NULL,
+    student_gender TEXT,
+    student_dept TEXT
+)
+"""
+
+TEACHER_TABLE = """
+CREATE TABLE IF NOT EXISTS teacher (
+    teacher_name TEXT NOT NULL,
+    teacher_id TEXT PRIMARY KEY,
+    email TEXT UNIQUE NOT NULL,
+    phone_number TEXT,
+    password TEXT NOT NULL,
+    teacher_gender TEXT,
+    teacher_dept TEXT
+)
+"""
+
+ACHIEVEMENTS_TABLE = """
+CREATE TABLE IF NOT EXISTS achievements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    teacher_id TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    achievement_type TEXT NOT NULL,
+    event_name TEXT NOT NULL,
+    achievement_date DATE NOT NULL,
+    organizer TEXT NOT NULL,
+    position TEXT NOT NULL,
+    achievement_description TEXT,
+    certificate_path TEXT,
+
+    symposium_theme TEXT,
+    programming_language TEXT,
+    coding_platform TEXT,
+    paper_title TEXT,
+    journal_name TEXT,
+    conference_level TEXT,
+    conference_role TEXT,
+    team_size INTEGER,
+    project_title TEXT,
+    database_type TEXT,
+    difficulty_level TEXT,
+    other_description TEXT,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (student_id) REFERENCES student(student_id),
+    FOREIGN KEY (teacher_id) REFERENCES teacher(teacher_id)
+)
+"""
+
+
+def _create_base_tables(cursor):
+    cursor.execute(STUDENT_TABLE)
+    cursor.execute(TEACHER_TABLE)
+    cursor.execute(ACHIEVEMENTS_TABLE)
+
+
+def _add_achievement_audit_columns(cursor):
+    """
+    Databases created before teacher_id/created_at existed:
+    - Adds teacher_id if missing
+    - Adds created_at if missing
+    - Backfills created_at for old rows
+    """
+    cursor.execute("PRAGMA table_info(achievements)")
+    column_names = [c[1] for c in cursor.fetchall()]
+
+    if "teacher_id" not in column_names:
+        cursor.execute("ALTER TABLE achievements ADD COLUMN teacher_id TEXT DEFAULT 'unknown'")
+
+    if "created_at" not in column_names:
+        cursor.execute("ALTER TABLE achievements ADD COLUMN created_at TEXT")
+        cursor.execute("UPDATE achievements SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+
+def _add_achievement_indexes(cursor):
+    # Every teacher-facing query filters on teacher_id first; the second
+    # column matches how each one narrows or orders the rows.
+    # (teacher_id, achievement_date): dashboard this-week range, listing/export order
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_achievements_teacher_date "
+        "ON achievements(teacher_id, achievement_date)"
+    )
+    # (teacher_id, student_id): covering index for COUNT(DISTINCT student_id)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_achievements_teacher_student "
+        "ON achievements(teacher_id, student_id)"
+    )
+    # (teacher_id, created_at): dashboard "recent entries" ORDER BY ... LIMIT 5
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_achievements_teacher_created "
+        "ON achievements(teacher_id, created_at)"
+    )
+
+
+def _add_type_filter_index(cursor):
+    # /all-achievements filtered by type, newest first
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_achievements_teacher_type_date "
+        "ON achievements(teacher_id, achievement_type, achievement_date)"
+    )
+
+
+def _add_teacher_stats(cursor):
+    for statement in stats.SUMMARY_TABLES + stats.TRIGGERS:
+        cursor.execute(statement)
+    stats.rebuild_teacher_stats(cursor)
+
+
+def _add_certificates(cursor):
+    cursor.execute("PRAGMA table_info(achievements)")
+    if "certificate_path" not in [c[1] for c in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE achievements ADD COLUMN certificate_path TEXT")
+    cursor.execute(storage.CERTIFICATES_TABLE)
+    cursor.execute(storage.CERTIFICATE_PATH_INDEX)
+    for statement in storage.TRIGGERS:
+        cursor.execute(statement)
+
+
+def _add_certificate_thumbnail_flag(cursor):
+    cursor.execute("ALTER TABLE certificates ADD COLUMN has_thumbnail INTEGER NOT NULL DEFAULT 0")
+
+
+# The database-wide counter of migration 8, replaced by per-teacher versions in 9
+_DATA_VERSION_EVENTS = [
+    (table, event) for table in ("achievements", "student", "teacher") for event in ("INSERT", "UPDATE", "DELETE")
+]
+
+
+def _add_data_version(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+    for table, event in _DATA_VERSION_EVENTS:
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_data_version_{event.lower()}
+            AFTER {event} ON {table}
+            BEGIN
+                UPDATE data_version SET version = version + 1 WHERE id = 1;
+            END
+        """)
+
+
+def _add_teacher_data_version(cursor):
+    for table, event in _DATA_VERSION_EVENTS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_data_version_{event.lower()}")
+    cursor.execute("DROP TABLE IF EXISTS data_version")
+    cursor.execute(cache.TEACHER_VERSION_TABLE)
+    for statement in cache.TEACHER_VERSION_TRIGGERS:
+        cursor.execute(statement)
+
+
+
+def _add_thumbnail_version_trigger(cursor):
+    cursor.execute(cache.THUMBNAIL_VERSION_TRIGGER)
+
+# (version, description, function(cursor)) -- append only, never renumber
+MIGRATIONS = [
+    (1, "create student, teacher and achievements tables", _create_base_tables),
+    (2, "add teacher_id and created_at to achievements", _add_achievement_audit_columns),
+    (3, "add teacher-scoped indexes on achievements", _add_achievement_indexes),
+    (4, "add trigger-maintained teacher statistics", _add_teacher_stats),
+    (5, "add type filter index for the achievements listing", _add_type_filter_index),
+    (6, "add content-addressed certificates table", _add_certificates),
+    (7, "track generated certificate previews", _add_certificate_thumbnail_flag),
+    (8, "add trigger-maintained data_version change counter", _add_data_version),
+    (9, "replace data_version with per-teacher change counters", _add_teacher_data_version),
+    (10, "count certificate preview changes in teacher versions", _add_thumbnail_version_trigger),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(connection):
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(db_path, log=print):
+    """
+    Bring the database at db_path up to LATEST_VERSION.
+    Each migration runs in its own transaction together with the
+    user_version bump, so a failed step leaves the previous version intact.
+    Returns the list of versions that were applied.
+    """
+    connection = db.open_connection(db_path, isolation_level=None)
+    applied = []
+    try:
+        for version, description, step in MIGRATIONS:
+            # IMMEDIATE takes the write lock up front, so two workers starting
+            # together cannot both apply the same step
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                if get_version(connection) >= version:
+                    connection.execute("ROLLBACK")
+                    continue
+                step(connection.cursor())
+                connection.execute(f"PRAGMA user_version = {version}")
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            applied.append(version)
+            if log:
+                log(f"Applied migration {version}: {description}")
+    finally:
+        connection.close()
+    return applied
@@ -0,0 +1,196 @@
+"""
+Orphaned Certificate Module
+Finds upload files no achievement points to, quarantines them, then reclaims them
+"""
+import logging
+import os
+import re
+import threading
+import time
+
+import db
+import storage
+import thumbnails
+
+logger = logging.getLogger("ams.orphans")
+
+# Orphans are moved here (keeping their relative path) before being deleted
+QUARANTINE_DIR = ".quarantine"
+
+DEFAULT_GRACE_SECONDS = 24 * 3600
+DEFAULT_QUARANTINE_SECONDS = 7 * 24 * 3600
+
+# Byte order of certificate_path, read straight off idx_achievements_certificate_path
+REFERENCED_PATHS = """
+    SELECT DISTINCT certificate_path FROM achievements
+    WHERE certificate_path IS NOT NULL
+    ORDER BY certificate_path
+"""
+
+IS_REFERENCED = "SELECT 1 FROM achievements WHERE certificate_path = ? LIMIT 1"
+
+_DERIVED = re.compile(r"^([0-9a-f]{64})\.(%s)\.webp$" % "|".join(thumbnails.VARIANTS))
+
+
+def iter_store(folder, prefix=storage.PATH_PREFIX + "/"):
+    """
+    Yield (certificate_path, DirEntry) for every file below folder, sorted
+    the way SQLite sorts certificate_path. Only one directory listing is held
+    at a time. Preview files whose original is in the same directory are
+    skipped: they live and die with it.
+    """
+    with os.scandir(folder) as it:
+        # "name/" so a directory sorts exactly where its children's paths do
+        entries = sorted(it, key=lambda e: e.name + "/" if e.is_dir(follow_symlinks=False) else e.name)
+    originals = {e.name.split(".", 1)[0] for e in entries
+                 if not e.is_dir(follow_symlinks=False) and not _DERIVED.match(e.name)}
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name != QUARANTINE_DIR:
+                yield from iter_store(entry.path, f"{prefix}{entry.name}/")
+            continue
+        derived = _DERIVED.match(entry.name)
+        if derived and derived.group(1) in originals:
+            continue
+        yield f"{prefix}{entry.name}", entry
+
+
+def find_orphans(connection, upload_folder):
+    """
+    Yield (certificate_path, DirEntry) for stored files no achievement references.
+
+    Both sides arrive sorted -- the directory walk and an index-ordered
+    cursor over achievements.certificate_path -- so this is a single merge
+    pass in constant memory, however large the store or the table.
+    """
+    referenced = (row[0] for row in connection.execute(REFERENCED_PATHS))
+    current = next(referenced, None)
+    for path, entry in iter_store(upload_folder):
+        while current is not None and current < path:
+            current = next(referenced, None)
+        if current != path:
+            yield path, entry
+
+
+def _move(source, target, now):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(source, target)
+    # The quarantine clock starts now, not at the upload time
+    os.utime(target, (now, now))
+
+
+def collect_orphans(connection, upload_folder, grace_seconds=DEFAULT_GRACE_SECONDS,
+                    quarantine_seconds=DEFAULT_QUARANTINE_SECONDS, dry_run=False, now=None, log=None):
+    """
+    One garbage-collection pass over upload_folder.
+
+    1. Orphans last modified more than grace_seconds ago -- old enough that
+       no submission can still be about to reference them -- are moved into
+       QUARANTINE_DIR together with their previews.
+    2. Quarantined files that are referenced again are moved back; the rest,
+       once quarantined for quarantine_seconds, are deleted along with any
+       unreferenced certificates row.
+
+    Returns a dict of file counts and byte totals.
+    """
+    now = time.time() if now is None else now
+    quarantine = os.path.join(upload_folder, QUARANTINE_DIR)
+    result = {"scanned_orphans": 0, "quarantined": 0, "quarantined_bytes": 0,
+              "restored": 0, "deleted": 0, "reclaimed_bytes": 0}
+
+    for path, entry in find_orphans(connection, upload_folder):
+        result["scanned_orphans"] += 1
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > now - grace_seconds:
+            continue
+        result["quarantined"] += 1
+        result["quarantined_bytes"] += stat.st_size
+        if log:
+            log(f"  quarantine {path} ({stat.st_size:,} bytes)")
+        if dry_run:
+            continue
+        _move(entry.path, storage.local_path(quarantine, path), now)
+        for variant in thumbnails.VARIANTS:
+            derived = storage.local_path(upload_folder, thumbnails.variant_path(path, variant))
+            if os.path.exists(derived):
+                _move(derived, storage.local_path(quarantine, thumbnails.variant_path(path, variant)), now)
+
+    if dry_run or not os.path.isdir(quarantine):
+        return result
+
+    for path, entry in list(iter_store(quarantine)):
+        if connection.execute(IS_REFERENCED, (path,)).fetchone():
+            target = storage.local_path(upload_folder, path)
+            if os.path.exists(target):
+                os.unlink(entry.path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(entry.path, target)
+            result["restored"] += 1
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > now - quarantine_seconds:
+            continue
+        for variant in thumbnails.VARIANTS:
+            derived = storage.local_path(quarantine, thumbnails.variant_path(path, variant))
+            if os.path.exists(derived):
+                result["reclaimed_bytes"] += os.path.getsize(derived)
+                os.unlink(derived)
+        os.unlink(entry.path)
+        result["deleted"] += 1
+        result["reclaimed_bytes"] += stat.st_size
+        with connection:
+            connection.execute("DELETE FROM certificates WHERE path = ? AND refcount <= 0", (path,))
+        if log:
+            log(f"  deleted {path} ({stat.st_size:,} bytes)")
+
+    # Drop directories emptied by the moves above
+    for directory, _, _ in os.walk(quarantine, topdown=False):
+        if directory != quarantine and not os.listdir(directory):
+            os.rmdir(directory)
+    return result
+
+
+class PeriodicCollector(threading.Thread):
+    """
+    Daemon thread running collect_orphans() every interval seconds on a
+    pooled connection. Enable it in one process only; other workers
+    would just race it for the same files.
+    """
+
+    def __init__(self, db_path, upload_folder, interval, **options):
+        super().__init__(name="orphan-gc", daemon=True)
+        self.db_path = db_path
+        self.upload_folder = upload_folder
+        self.interval = interval
+        self.options = options
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            pool = db.get_pool(self.db_path)
+            connection = pool.acquire()
+            try:
+                result = collect_orphans(connection, self.upload_folder, **self.options)
+                logger.info("orphan gc: %s", result)
+            except Exception:
+                logger.exception("orphan gc failed")
+            finally:
+                pool.release(connection)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def init_app(app):
+    """Start the periodic collector when ORPHAN_GC_INTERVAL (seconds) is set."""
+    interval = app.config.get("ORPHAN_GC_INTERVAL")
+    if not interval:
+        return None
+    collector = PeriodicCollector(
+        app.config["DB_PATH"], app.config["UPLOAD_FOLDER"], float(interval),
+        grace_seconds=app.config.get("ORPHAN_GRACE_SECONDS", DEFAULT_GRACE_SECONDS),
+        quarantine_seconds=app.config.get("ORPHAN_QUARANTINE_SECONDS", DEFAULT_QUARANTINE_SECONDS),
+    )
+    collector.start()
+    return collector
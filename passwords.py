@@ -0,0 +1,139 @@
+"""
+Password Module
+Hashing and verification of student and teacher passwords
+"""
+import functools
+import hmac
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Any werkzeug method string; the cost is part of it: "scrypt:<n>:<r>:<p>"
+# or "pbkdf2:<digest>:<iterations>", e.g. "scrypt:16384:8:1" halves the
+# default scrypt work. Stored hashes record their own parameters, so
+# changing this only affects new hashes and rehash-on-login.
+DEFAULT_METHOD = "scrypt"
+
+# Smaller batches are hashed in-process: starting workers would cost more
+POOL_THRESHOLD = 32
+
+_HASH_PREFIXES = ("scrypt:", "pbkdf2:")
+
+
+def hash_password(password, method=DEFAULT_METHOD):
+    return generate_password_hash(password, method)
+
+
+def is_hashed(stored):
+    """True for a werkzeug "<method>$<salt>$<hash>" string, False for a legacy plaintext password."""
+    return stored.startswith(_HASH_PREFIXES) and stored.count("$") == 2
+
+
+@functools.lru_cache(maxsize=None)
+def method_prefix(method):
+    """The parameter prefix werkzeug stores for method, defaults filled in: "scrypt" -> "scrypt:32768:8:1"."""
+    return generate_password_hash("", method).split("$", 1)[0]
+
+
+def needs_rehash(stored, method=DEFAULT_METHOD):
+    """True when stored is plaintext or was hashed with other parameters than method."""
+    return not is_hashed(stored) or stored.split("$", 1)[0] != method_prefix(method)
+
+
+@functools.lru_cache(maxsize=None)
+def dummy_hash(method=DEFAULT_METHOD):
+    """A hash of a random password, checked for unknown accounts so they take as long as known ones."""
+    return generate_password_hash(secrets.token_hex(16), method)
+
+
+def verify(stored, password):
+    """Check password against a stored hash, or against a not yet migrated plaintext value."""
+    if not stored or password is None:
+        return False
+    if is_hashed(stored):
+        return check_password_hash(stored, password)
+    return hmac.compare_digest(stored.encode(), password.encode())
+
+
+class HashPool:
+    """
+    Hashes batches of passwords across worker processes. scrypt and
+    pbkdf2 are CPU-bound and hold the GIL, so threads would not help.
+    Workers are started on the first batch large enough to need them and
+    live until the pool is closed, so a chunked import pays for them once.
+    Workers are spawned rather than forked: forking a threaded web worker
+    can copy a lock mid-use.
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, processes=None):
+        self.method = method
+        self.processes = processes or os.cpu_count() or 1
+        self._executor = None
+
+    def hash_many(self, passwords):
+        """Hashes of passwords, in order."""
+        if self.processes < 2 or len(passwords) < POOL_THRESHOLD:
+            return [hash_password(password, self.method) for password in passwords]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+        chunksize = max(1, len(passwords) // (self.processes * 4))
+        return list(self._executor.map(
+            hash_password, passwords, [self.method] * len(passwords), chunksize=chunksize
+        ))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Account tables and their primary keys
+ACCOUNT_TABLES = {"student": "student_id", "teacher": "teacher_id"}
+
+
+def migrate_plaintext(connection, method=DEFAULT_METHOD, processes=None, chunk_rows=1000, log=None):
+    """
+    Replace every plaintext password in ACCOUNT_TABLES with a hash.
+
+    Rows are read chunk_rows at a time in primary-key order. The plaintext
+    ones in each chunk are hashed across a HashPool and written back in
+    one transaction. An UPDATE only applies if the row still holds the
+    plaintext it was read with, so a concurrent password change is never
+    overwritten. Safe to re-run; already hashed rows are skipped.
+    Returns {table: rows hashed}.
+    """
+    counts = {}
+    with HashPool(method, processes) as pool:
+        for table, key in ACCOUNT_TABLES.items():
+            counts[table] = 0
+            last = ""
+            while True:
+                rows = connection.execute(
+                    f"SELECT {key}, password FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?",
+                    (last, chunk_rows),
+                ).fetchall()
+                if not rows:
+                    break
+                last = rows[-1][0]
+                plain = [(account, password) for account, password in rows if password and not is_hashed(password)]
+                if not plain:
+                    continue
+                hashes = pool.hash_many([password for _, password in plain])
+                with connection:
+                    connection.executemany(
+                        f"UPDATE {table} SET password = ? WHERE {key} = ? AND password = ?",
+                        [(hashed, account, password) for (account, password), hashed in zip(plain, hashes)],
+                    )
+                counts[table] += len(plain)
+                if log:
+                    log(f"  {table}: {counts[table]:,} passwords hashed")
+    return counts
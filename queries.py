@@ -0,0 +1,165 @@
+"""
+SQL Queries Module
+Statements used by the route handlers, kept in one place so the
+query-plan tests in tests/test_query_plans.py exercise the exact SQL
+"""
+
+# By primary key only; the password is checked in Python (see passwords.verify)
+STUDENT_LOGIN = "SELECT * FROM student WHERE student_id = ?"
+
+TEACHER_LOGIN = "SELECT * FROM teacher WHERE teacher_id = ?"
+
+# Rehash-on-login; only applies if the stored value is still the one verified
+STUDENT_REHASH = "UPDATE student SET password = ? WHERE student_id = ? AND password = ?"
+TEACHER_REHASH = "UPDATE teacher SET password = ? WHERE teacher_id = ? AND password = ?"
+
+STUDENT_BY_ID = "SELECT student_id, student_name FROM student WHERE student_id = ?"
+
+# All three dashboard counters in one primary-key lookup on teacher_stats,
+# plus a short range over teacher_daily_stats for the rolling week
+DASHBOARD_STATS = """
+    SELECT ts.total_achievements, ts.students_managed,
+           (SELECT COALESCE(SUM(d.achievement_count), 0)
+            FROM teacher_daily_stats d
+            WHERE d.teacher_id = ts.teacher_id AND d.achievement_date >= ?) AS this_week
+    FROM teacher_stats ts
+    WHERE ts.teacher_id = ?
+"""
+
+DASHBOARD_RECENT = """
+    SELECT a.id, a.student_id, s.student_name, a.achievement_type,
+           a.event_name, a.achievement_date
+    FROM achievements a
+    JOIN student s ON a.student_id = s.student_id
+    WHERE a.teacher_id = ?
+    ORDER BY a.created_at DESC
+    LIMIT 5
+"""
+
+# created_at is set here so dashboard ordering never breaks
+INSERT_ACHIEVEMENT = """
+    INSERT INTO achievements (
+        student_id, teacher_id, achievement_type, event_name, achievement_date,
+        organizer, position, achievement_description, certificate_path,
+        symposium_theme, programming_language, coding_platform, paper_title,
+        journal_name, conference_level, conference_role, team_size,
+        project_title, database_type, difficulty_level, other_description,
+        created_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+"""
+
+# Which of a JSON array of student_ids exist: one primary-key probe per id,
+# so bulk imports validate a whole chunk in a single statement
+STUDENTS_IN = "SELECT student_id FROM student WHERE student_id IN (SELECT value FROM json_each(?))"
+
+# Which of a JSON array of emails are taken, via the UNIQUE(email) index
+EMAILS_IN = "SELECT email FROM student WHERE email IN (SELECT value FROM json_each(?))"
+
+INSERT_STUDENT = """
+    INSERT INTO student (student_name, student_id, email, phone_number, password, student_gender, student_dept)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_TEACHER = """
+    INSERT INTO teacher (teacher_name, teacher_id, email, phone_number, password, teacher_gender, teacher_dept)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Owner check and file lookup for /certificates/<id> in one primary-key probe
+CERTIFICATE_FOR_ACHIEVEMENT = """
+    SELECT a.teacher_id, a.student_id, a.certificate_path, c.sha256, c.original_filename
+    FROM achievements a
+    LEFT JOIN certificates c ON c.path = a.certificate_path
+    WHERE a.id = ?
+"""
+
+TEACHER_TOTAL = "SELECT total_achievements FROM teacher_stats WHERE teacher_id = ?"
+
+ACHIEVEMENT_LIST_COLUMNS = """
+    SELECT a.id, a.student_id, s.student_name, a.achievement_type,
+           a.event_name, a.achievement_date, a.position, a.organizer,
+           a.certificate_path, c.has_thumbnail
+    FROM achievements a
+    JOIN student s ON a.student_id = s.student_id
+    LEFT JOIN certificates c ON c.path = a.certificate_path
+"""
+
+
+def _filter_clauses(teacher_id, achievement_type, date_from, date_to):
+    clauses = ["a.teacher_id = ?"]
+    params = [teacher_id]
+
+    if achievement_type:
+        clauses.append("a.achievement_type = ?")
+        params.append(achievement_type)
+    if date_from:
+        clauses.append("a.achievement_date >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append("a.achievement_date <= ?")
+        params.append(date_to)
+    return clauses, params
+
+
+def achievements_page(teacher_id, achievement_type=None, date_from=None, date_to=None,
+                      after=None, before=None, limit=50):
+    """
+    Build one keyset-paginated page of a teacher's achievements, newest first.
+
+    after/before are (achievement_date, id) cursors taken from the last/first
+    row of the current page. A "before" page is fetched in ascending order and
+    must be reversed by the caller. Only the filters actually given are added
+    to the WHERE clause, so SQLite can pick idx_achievements_teacher_type_date
+    or idx_achievements_teacher_date for the whole range instead of scanning.
+    Returns (sql, params).
+    """
+    clauses, params = _filter_clauses(teacher_id, achievement_type, date_from, date_to)
+
+    order = "DESC"
+    if after:
+        clauses.append("(a.achievement_date, a.id) < (?, ?)")
+        params.extend(after)
+    elif before:
+        clauses.append("(a.achievement_date, a.id) > (?, ?)")
+        params.extend(before)
+        order = "ASC"
+
+    sql = (
+        ACHIEVEMENT_LIST_COLUMNS
+        + "    WHERE " + " AND ".join(clauses)
+        + f"\n    ORDER BY a.achievement_date {order}, a.id {order}\n    LIMIT ?\n"
+    )
+    params.append(limit)
+    return sql, params
+
+
+# Per-teacher version of what the listing and export show, answered from
+# the (teacher_id, created_at) covering index without reading the table:
+# the count moves on deletes, max(id) on inserts, and the teacher's cache
+# version (see cache.py) on edits, student renames and new previews
+TEACHER_VERSION = """
+    SELECT count(*) AS row_count, max(id) AS newest_id, max(created_at) AS last_modified,
+           (SELECT version FROM teacher_data_version WHERE teacher_id = ?1) AS version
+    FROM achievements
+    WHERE teacher_id = ?1
+"""
+
+EXPORT_CSV = """
+    SELECT a.id, s.student_name, a.student_id, a.achievement_type,
+           a.event_name, a.achievement_date, a.organizer,
+           a.position, a.achievement_description, a.created_at
+    FROM achievements a
+    JOIN student s ON a.student_id = s.student_id
+    WHERE a.teacher_id = ?
+    ORDER BY a.achievement_date DESC
+"""
+
+
+def achievements_count(teacher_id, achievement_type=None, date_from=None, date_to=None):
+    """
+    Count a teacher's achievements matching the filters, from the same
+    indexes achievements_page() uses. Unfiltered, TEACHER_TOTAL is cheaper.
+    Returns (sql, params).
+    """
+    clauses, params = _filter_clauses(teacher_id, achievement_type, date_from, date_to)
+    return "SELECT count(*) FROM achievements a WHERE " + " AND ".join(clauses), params
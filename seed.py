@@ -0,0 +1,226 @@
+"""
+Synthetic Data Module
+Generates reproducible students, teachers and achievements for load testing
+"""
+import datetime
+import io
+import random
+
+import cache
+import passwords
+import stats
+import storage
+
+FIRST_NAMES = ["Aarav", "Diya", "Kavin", "Meera", "Rohan", "Sneha", "Arjun", "Priya",
+               "Vikram", "Ananya", "Karthik", "Divya", "Rahul", "Nila", "Surya", "Isha"]
+LAST_NAMES = ["Kumar", "Sharma", "Iyer", "Reddy", "Nair", "Patel", "Das", "Menon",
+              "Rao", "Singh", "Pillai", "Joshi"]
+DEPARTMENTS = ["CSE", "IT", "ECE", "EEE", "MECH", "CIVIL", "AIDS"]
+ORGANIZERS = ["IIT Madras", "Anna University", "NIT Trichy", "HackerRank", "IEEE",
+              "ACM Student Chapter", "Google Developer Group", "SRM University"]
+POSITIONS = ["First Place", "Second Place", "Third Place", "Finalist", "Participant"]
+EVENT_WORDS = ["Hit the Bug", "Web Wonder", "Code Sprint", "Cicada", "Byte Battle",
+               "Data Quest", "Hack the Future", "Query Quest", "Tech Symposium"]
+
+ACHIEVEMENT_COLUMNS = (
+    "teacher_id", "student_id", "achievement_type", "event_name", "achievement_date",
+    "organizer", "position", "achievement_description", "certificate_path",
+    "symposium_theme", "programming_language", "coding_platform", "paper_title",
+    "journal_name", "conference_level", "conference_role", "team_size",
+    "project_title", "database_type", "difficulty_level", "other_description",
+    "created_at",
+)
+
+
+def _type_fields(pick, achievement_type):
+    """Values for the columns only filled in for one achievement_type (see submit form)."""
+    if achievement_type == "symposium":
+        return {"symposium_theme": pick(["AI for Good", "Green Computing", "Cyber Security"])}
+    if achievement_type == "coding":
+        return {
+            "programming_language": pick(["Python", "Java", "C++", "Go"]),
+            "coding_platform": pick(["HackerRank", "CodeChef", "LeetCode", "Codeforces"]),
+        }
+    if achievement_type == "paper":
+        return {
+            "paper_title": f"A Study of {pick(['Graph', 'Neural', 'Edge', 'Quantum'])} Systems",
+            "journal_name": pick(["IJCA", "IEEE Access", "Springer LNCS"]),
+        }
+    if achievement_type == "conference":
+        return {
+            "conference_level": pick(["international", "national", "state", "university", "college"]),
+            "conference_role": pick(["presenter", "attendee", "panelist"]),
+        }
+    if achievement_type == "hackathon":
+        return {
+            "team_size": pick(TEAM_SIZES),
+            "project_title": f"{pick(['Smart', 'Open', 'Secure'])} {pick(['Campus', 'Health', 'Farm'])}",
+        }
+    if achievement_type == "sql":
+        return {
+            "database_type": pick(["MySQL", "Oracle", "PostgreSQL", "SQLite"]),
+            "difficulty_level": pick(["beginner", "intermediate", "advanced", "expert"]),
+        }
+    return {"other_description": pick(["Quiz", "Paper design", "Poster presentation"])}
+
+
+ACHIEVEMENT_TYPES = ["symposium", "coding", "paper", "conference", "hackathon", "sql", "other"]
+TEAM_SIZES = range(1, 7)
+TIMES = [f"{hour:02d}:{minute:02d}:00" for hour in range(24) for minute in range(60)]
+
+# Smallest files the upload checks accept as PNG / PDF
+PLACEHOLDER_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000b49444154789c6360000200000500017a5eab3f0000000049454e44ae426082"
+)
+# One blank A4 page, so the thumbnailer has something to render
+PLACEHOLDER_PDF = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 595 842]>>endobj\n"
+    b"trailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+
+def write_placeholder_certificates(upload_folder, count, rng, shard_depth=0, cursor=None):
+    """
+    Store count small PNG/PDF certificates and return their storage.Blob
+    records. Each file carries its number after the end marker so every one
+    hashes to a distinct blob; with a cursor, blobs an earlier run registered
+    stay where they are.
+    """
+    blobs = []
+    for n in range(count):
+        if rng.random() < 0.5:
+            name, data = f"seed_certificate_{n:05d}.png", PLACEHOLDER_PNG
+        else:
+            name, data = f"seed_certificate_{n:05d}.pdf", PLACEHOLDER_PDF
+        data += f"seed {n}\n".encode()
+        blobs.append(storage.save_upload(io.BytesIO(data), upload_folder, name, shard_depth, cursor=cursor))
+    return blobs
+
+
+def seed_database(connection, students=1000, teachers=50, achievements=100000, seed=0,
+                  end_date=None, days=3 * 365, certificate_paths=(), certificate_ratio=0.3,
+                  batch_size=10000, log=None):
+    """
+    Insert synthetic rows in a single transaction with batched executemany().
+
+    IDs are prefixed with SEED- so they never collide with real accounts, and
+    re-running with the same arguments adds a fresh set of achievements for
+    the same students and teachers. Secondary indexes and the stats triggers
+    on achievements are dropped for the duration of the load; the indexes are
+    rebuilt and the summaries and certificate refcounts recomputed once at
+    the end, which is far cheaper than maintaining them a row at a time;
+    each seeded teacher's cache.teacher_version is bumped once for the whole load.
+    certificate_paths should already be registered (see storage.register).
+    Returns a dict of inserted row counts.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or datetime.date.today()
+    # One hash shared by every synthetic account: logins still pay the
+    # full verification cost, but seeding does not pay it per row
+    password = passwords.hash_password("password")
+
+    student_ids = [f"SEED-S{n:07d}" for n in range(1, students + 1)]
+    teacher_ids = [f"SEED-T{n:05d}" for n in range(1, teachers + 1)]
+
+    def student_rows():
+        for n, student_id in enumerate(student_ids, start=1):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            yield (name, student_id, f"{student_id.lower()}@seed.example", f"9{n:09d}",
+                   password, rng.choice("MF"), rng.choice(DEPARTMENTS))
+
+    def teacher_rows():
+        for n, teacher_id in enumerate(teacher_ids, start=1):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            yield (name, teacher_id, f"{teacher_id.lower()}@seed.example", f"8{n:09d}",
+                   password, rng.choice("MF"), rng.choice(DEPARTMENTS))
+
+    dates = [(end_date - datetime.timedelta(days=n)).isoformat() for n in range(days)]
+    type_offset = ACHIEVEMENT_COLUMNS.index("symposium_theme")
+    type_slots = len(ACHIEVEMENT_COLUMNS) - type_offset - 1
+    column_slot = {column: n - type_offset for n, column in enumerate(ACHIEVEMENT_COLUMNS)}
+
+    # random() plus indexing is several times faster than rng.choice(); the
+    # shared columns are drawn a whole batch at a time with rng.choices()
+    rand = rng.random
+
+    def pick(seq):
+        return seq[int(rand() * len(seq))]
+
+    def achievement_batches():
+        remaining = achievements
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            remaining -= size
+            columns = zip(
+                rng.choices(ACHIEVEMENT_TYPES, k=size),
+                rng.choices(dates, k=size),
+                rng.choices(teacher_ids, k=size),
+                rng.choices(student_ids, k=size),
+                rng.choices(EVENT_WORDS, k=size),
+                rng.choices(ORGANIZERS, k=size),
+                rng.choices(POSITIONS, k=size),
+                rng.choices(TIMES, k=size),
+            )
+            batch = []
+            for achievement_type, when, teacher_id, student_id, event, organizer, position, time in columns:
+                type_values = [None] * type_slots
+                for column, value in _type_fields(pick, achievement_type).items():
+                    type_values[column_slot[column]] = value
+                certificate_path = None
+                if certificate_paths and rand() < certificate_ratio:
+                    certificate_path = pick(certificate_paths)
+                batch.append((
+                    teacher_id, student_id, achievement_type, f"{event} {when[:4]}", when,
+                    organizer, position, f"Synthetic {achievement_type} achievement",
+                    certificate_path, *type_values, f"{when} {time}",
+                ))
+            yield batch
+
+    insert_achievement = (
+        f"INSERT INTO achievements ({', '.join(ACHIEVEMENT_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in ACHIEVEMENT_COLUMNS)})"
+    )
+
+    cursor = connection.cursor()
+    counts = {"students": 0, "teachers": 0, "achievements": 0}
+    with connection:
+        cursor.executemany("""
+            INSERT OR IGNORE INTO student (student_name, student_id, email, phone_number,
+                                           password, student_gender, student_dept)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, student_rows())
+        counts["students"] = cursor.rowcount
+        cursor.executemany("""
+            INSERT OR IGNORE INTO teacher (teacher_name, teacher_id, email, phone_number,
+                                           password, teacher_gender, teacher_dept)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, teacher_rows())
+        counts["teachers"] = cursor.rowcount
+
+        # Per-row trigger and index maintenance dominates a bulk load, so drop
+        # them and rebuild once at the end, still inside this transaction
+        deferred = cursor.execute("""
+            SELECT type, name, sql FROM sqlite_master
+            WHERE tbl_name = 'achievements' AND sql IS NOT NULL
+              AND type IN ('index', 'trigger')
+        """).fetchall()
+        for kind, name, _ in deferred:
+            cursor.execute(f"DROP {kind.upper()} {name}")
+
+        for batch in achievement_batches():
+            cursor.executemany(insert_achievement, batch)
+            counts["achievements"] += len(batch)
+            if log:
+                log(f"  {counts['achievements']:,} / {achievements:,} achievements")
+
+        for _, _, sql in deferred:
+            cursor.execute(sql)
+        stats.rebuild_teacher_stats(cursor)
+        storage.rebuild_refcounts(cursor)
+        # The version triggers went with the rest, so bump each seeded teacher once here
+        cursor.executemany(cache.BUMP_TEACHER_VERSION, [(teacher_id,) for teacher_id in teacher_ids])
+
+    return counts
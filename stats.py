@@ -0,0 +1,189 @@
+"""
+Teacher Statistics Module
+Summary tables behind the teacher dashboard counters, kept current by
+triggers on achievements (installed by migration 4)
+"""
+
+SUMMARY_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS teacher_stats (
+        teacher_id TEXT PRIMARY KEY,
+        total_achievements INTEGER NOT NULL DEFAULT 0,
+        students_managed INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    # One row per (teacher, student) pair; students_managed counts these rows
+    """
+    CREATE TABLE IF NOT EXISTS teacher_students (
+        teacher_id TEXT NOT NULL,
+        student_id TEXT NOT NULL,
+        achievement_count INTEGER NOT NULL,
+        PRIMARY KEY (teacher_id, student_id)
+    ) WITHOUT ROWID
+    """,
+    # Per-day counts, so "this week" is a short primary-key range instead
+    # of a scan over every achievement the teacher has recorded
+    """
+    CREATE TABLE IF NOT EXISTS teacher_daily_stats (
+        teacher_id TEXT NOT NULL,
+        achievement_date TEXT NOT NULL,
+        achievement_count INTEGER NOT NULL,
+        PRIMARY KEY (teacher_id, achievement_date)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+def _count_in(row):
+    """
+    Trigger statements that add one achievement (NEW or OLD row) to the summaries.
+    Legacy rows without a teacher_id are never shown on a dashboard, so skip them.
+    """
+    return f"""
+        INSERT OR IGNORE INTO teacher_stats (teacher_id)
+        SELECT {row}.teacher_id WHERE {row}.teacher_id IS NOT NULL;
+        UPDATE teacher_stats
+        SET total_achievements = total_achievements + 1,
+            students_managed = students_managed + NOT EXISTS (
+                SELECT 1 FROM teacher_students
+                WHERE teacher_id = {row}.teacher_id AND student_id = {row}.student_id
+            )
+        WHERE teacher_id = {row}.teacher_id;
+        INSERT INTO teacher_students (teacher_id, student_id, achievement_count)
+        SELECT {row}.teacher_id, {row}.student_id, 1 WHERE {row}.teacher_id IS NOT NULL
+        ON CONFLICT (teacher_id, student_id) DO UPDATE SET achievement_count = achievement_count + 1;
+        INSERT INTO teacher_daily_stats (teacher_id, achievement_date, achievement_count)
+        SELECT {row}.teacher_id, {row}.achievement_date, 1 WHERE {row}.teacher_id IS NOT NULL
+        ON CONFLICT (teacher_id, achievement_date) DO UPDATE SET achievement_count = achievement_count + 1;
+    """
+
+
+def _count_out(row):
+    """Trigger statements that remove one achievement (NEW or OLD row) from the summaries."""
+    return f"""
+        UPDATE teacher_students SET achievement_count = achievement_count - 1
+        WHERE teacher_id = {row}.teacher_id AND student_id = {row}.student_id;
+        UPDATE teacher_stats
+        SET total_achievements = total_achievements - 1,
+            students_managed = students_managed - EXISTS (
+                SELECT 1 FROM teacher_students
+                WHERE teacher_id = {row}.teacher_id AND student_id = {row}.student_id
+                  AND achievement_count = 0
+            )
+        WHERE teacher_id = {row}.teacher_id;
+        DELETE FROM teacher_students
+        WHERE teacher_id = {row}.teacher_id AND student_id = {row}.student_id AND achievement_count = 0;
+        UPDATE teacher_daily_stats SET achievement_count = achievement_count - 1
+        WHERE teacher_id = {row}.teacher_id AND achievement_date = {row}.achievement_date;
+        DELETE FROM teacher_daily_stats
+        WHERE teacher_id = {row}.teacher_id AND achievement_date = {row}.achievement_date
+          AND achievement_count = 0;
+    """
+
+
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS achievements_stats_insert
+    AFTER INSERT ON achievements
+    BEGIN
+        {_count_in("NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS achievements_stats_delete
+    AFTER DELETE ON achievements
+    BEGIN
+        {_count_out("OLD")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS achievements_stats_update
+    AFTER UPDATE OF teacher_id, student_id, achievement_date ON achievements
+    WHEN OLD.teacher_id IS NOT NEW.teacher_id
+      OR OLD.student_id IS NOT NEW.student_id
+      OR OLD.achievement_date IS NOT NEW.achievement_date
+    BEGIN
+        {_count_out("OLD")}
+        {_count_in("NEW")}
+    END
+    """,
+]
+
+
+def rebuild_teacher_stats(cursor):
+    """Recompute every summary table from the achievements table."""
+    cursor.execute("DELETE FROM teacher_stats")
+    cursor.execute("DELETE FROM teacher_students")
+    cursor.execute("DELETE FROM teacher_daily_stats")
+    cursor.execute("""
+        INSERT INTO teacher_students (teacher_id, student_id, achievement_count)
+        SELECT teacher_id, student_id, COUNT(*) FROM achievements
+        WHERE teacher_id IS NOT NULL
+        GROUP BY teacher_id, student_id
+    """)
+    cursor.execute("""
+        INSERT INTO teacher_daily_stats (teacher_id, achievement_date, achievement_count)
+        SELECT teacher_id, achievement_date, COUNT(*) FROM achievements
+        WHERE teacher_id IS NOT NULL
+        GROUP BY teacher_id, achievement_date
+    """)
+    cursor.execute("""
+        INSERT INTO teacher_stats (teacher_id, total_achievements, students_managed)
+        SELECT teacher_id, SUM(achievement_count), COUNT(*) FROM teacher_students
+        GROUP BY teacher_id
+    """)
+
+
+def check_teacher_stats(connection):
+    """
+    Compare the summary tables with live aggregates over achievements.
+    Returns a list of human-readable mismatches (empty when consistent).
+    """
+    problems = []
+
+    live = {
+        row[0]: (row[1], row[2])
+        for row in connection.execute("""
+            SELECT teacher_id, COUNT(*), COUNT(DISTINCT student_id)
+            FROM achievements WHERE teacher_id IS NOT NULL GROUP BY teacher_id
+        """)
+    }
+    stored = {
+        row[0]: (row[1], row[2])
+        for row in connection.execute("""
+            SELECT teacher_id, total_achievements, students_managed
+            FROM teacher_stats WHERE total_achievements != 0 OR students_managed != 0
+        """)
+    }
+    for teacher_id in sorted(live.keys() | stored.keys()):
+        expected = live.get(teacher_id, (0, 0))
+        actual = stored.get(teacher_id, (0, 0))
+        if expected != actual:
+            problems.append(
+                f"teacher {teacher_id}: stored total/students {actual}, live {expected}"
+            )
+
+    daily_mismatches = connection.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT teacher_id, achievement_date, COUNT(*) AS n FROM achievements
+            WHERE teacher_id IS NOT NULL
+            GROUP BY teacher_id, achievement_date
+            EXCEPT
+            SELECT teacher_id, achievement_date, achievement_count FROM teacher_daily_stats
+        )
+    """).fetchone()[0]
+    daily_extra = connection.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT teacher_id, achievement_date, achievement_count FROM teacher_daily_stats
+            EXCEPT
+            SELECT teacher_id, achievement_date, COUNT(*) FROM achievements
+            WHERE teacher_id IS NOT NULL
+            GROUP BY teacher_id, achievement_date
+        )
+    """).fetchone()[0]
+    if daily_mismatches or daily_extra:
+        problems.append(
+            f"teacher_daily_stats: {daily_mismatches} missing/wrong and {daily_extra} stale day rows"
+        )
+
+    return problems
@@ -0,0 +1,404 @@
+"""
+Certificate Storage Module
+Content-addressed certificate files, deduplicated by SHA-256
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from collections import namedtuple
+
+from werkzeug.exceptions import UnsupportedMediaType
+from werkzeug.utils import secure_filename
+
+# certificate_path values are relative to the static folder
+PATH_PREFIX = "uploads"
+
+# Bytes read per chunk while hashing and copying uploads
+CHUNK_SIZE = 64 * 1024
+
+# Directory levels of two hex characters each, e.g. 2 -> uploads/ab/cd/<name>
+DEFAULT_SHARD_DEPTH = 2
+
+# sha256 is also the file name, so identical uploads share one file
+Blob = namedtuple("Blob", "sha256 path size original_filename")
+
+# Leading bytes of each accepted certificate format, by file extension
+SIGNATURES = {
+    "pdf": (b"%PDF-",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+}
+SNIFF_BYTES = max(len(signature) for signatures in SIGNATURES.values() for signature in signatures)
+
+# <sha256>.<ext>, plus derived files such as <sha256>.thumb.webp
+_BLOB_NAME = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]+)*$")
+# Legacy uploads were saved as <YYYYmmddHHMMSS>_<secure name>
+_LEGACY_PREFIX = re.compile(r"^\d{14}_")
+
+CERTIFICATES_TABLE = """
+CREATE TABLE IF NOT EXISTS certificates (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    original_filename TEXT,
+    size INTEGER NOT NULL,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# Refcount triggers and ownership checks look achievements up by path
+CERTIFICATE_PATH_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_achievements_certificate_path
+ON achievements(certificate_path) WHERE certificate_path IS NOT NULL
+"""
+
+# certificates.refcount = achievements rows pointing at the blob. Paths with
+# no certificates row (legacy flat uploads) are simply not counted.
+TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS achievements_certificate_insert
+    AFTER INSERT ON achievements WHEN NEW.certificate_path IS NOT NULL
+    BEGIN
+        UPDATE certificates SET refcount = refcount + 1 WHERE path = NEW.certificate_path;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS achievements_certificate_delete
+    AFTER DELETE ON achievements WHEN OLD.certificate_path IS NOT NULL
+    BEGIN
+        UPDATE certificates SET refcount = refcount - 1 WHERE path = OLD.certificate_path;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS achievements_certificate_update
+    AFTER UPDATE OF certificate_path ON achievements
+    WHEN OLD.certificate_path IS NOT NEW.certificate_path
+    BEGIN
+        UPDATE certificates SET refcount = refcount - 1 WHERE path = OLD.certificate_path;
+        UPDATE certificates SET refcount = refcount + 1 WHERE path = NEW.certificate_path;
+    END
+    """,
+]
+
+INSERT_CERTIFICATE = """
+    INSERT INTO certificates (sha256, path, size, original_filename)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(sha256) DO NOTHING
+"""
+
+CERTIFICATE_PATH = "SELECT path FROM certificates WHERE sha256 = ?"
+
+
+def blob_name(sha256, filename):
+    """<sha256><.ext>, keeping the lower-cased extension of the uploaded name."""
+    extension = os.path.splitext(secure_filename(filename or ""))[1].lower()
+    return sha256 + extension
+
+
+def shard_path(name, depth):
+    """
+    Path of name relative to the upload folder for a fan-out of depth levels.
+    Blobs are sharded on their own hash; any other name on the hash of the name.
+    """
+    key = name if _BLOB_NAME.match(name) else hashlib.sha256(name.encode()).hexdigest()
+    return "/".join([key[2 * level:2 * level + 2] for level in range(depth)] + [name])
+
+
+def local_path(upload_folder, certificate_path):
+    """Filesystem path of a certificate_path value ("uploads/...")."""
+    relative = certificate_path.split("/", 1)[1]
+    return os.path.join(upload_folder, *relative.split("/"))
+
+
+class HashingSpool:
+    """
+    Writable temp file in the upload folder that hashes what it is given.
+
+    Werkzeug's form parser writes each uploaded file into one of these (see
+    app.UploadRequest), so an upload is read from the socket exactly once:
+    the SHA-256 is updated as the chunks are written to disk, and commit()
+    only has to rename the file into place. With check_type the extension
+    is checked before any byte is stored and the first SNIFF_BYTES against
+    SIGNATURES, raising UnsupportedMediaType so parsing stops right there.
+    A spool that is closed without being committed deletes its temp file.
+    """
+
+    def __init__(self, upload_folder, filename=None, check_type=False):
+        self.filename = filename
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._signatures = None
+        self._head = b""
+        if check_type:
+            extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+            if extension not in SIGNATURES:
+                raise UnsupportedMediaType("Invalid file type. Please upload PDF, PNG, JPG, or JPEG files.")
+            self._signatures = SIGNATURES[extension]
+        os.makedirs(upload_folder, exist_ok=True)
+        fd, self.name = tempfile.mkstemp(dir=upload_folder, prefix=".upload-")
+        self._file = os.fdopen(fd, "w+b")
+
+    def _sniff(self, data, final=False):
+        self._head += data[:SNIFF_BYTES - len(self._head)]
+        if len(self._head) >= SNIFF_BYTES or final:
+            if not self._head.startswith(self._signatures):
+                self.close()
+                raise UnsupportedMediaType("The file contents do not match its PDF, PNG or JPEG extension.")
+            self._signatures = None
+
+    def write(self, data):
+        if self._signatures is not None:
+            self._sniff(data)
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    def commit(self, upload_folder, shard_depth=0, path=None):
+        """
+        Move the spooled file to its content-addressed path and return its Blob.
+        path is where this content is already registered (see known_path()),
+        which wins over the name the upload's own extension would give it.
+        """
+        if self._signatures is not None:
+            self._sniff(b"", final=True)
+        self._file.close()
+        if path is None:
+            path = f"{PATH_PREFIX}/{shard_path(blob_name(self.sha256, self.filename), shard_depth)}"
+        target = local_path(upload_folder, path)
+        if os.path.exists(target):
+            os.unlink(self.name)
+        else:
+            # mkstemp files are owner-only; the proxy may serve certificates directly
+            os.chmod(self.name, 0o644)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(self.name, target)
+        self.name = None
+        return Blob(self.sha256, path, self.size, self.filename)
+
+    def close(self):
+        self._file.close()
+        if self.name and os.path.exists(self.name):
+            os.unlink(self.name)
+        self.name = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def save_upload(stream, upload_folder, filename, shard_depth=0, check_type=False, cursor=None):
+    """
+    Copy stream into upload_folder under its content hash and return a Blob.
+
+    If that content is already stored the new copy is discarded; with a
+    cursor, content already registered keeps its registered path. Nothing
+    is written to the database here, see register().
+    """
+    with HashingSpool(upload_folder, filename, check_type=check_type) as spool:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            spool.write(chunk)
+        path = known_path(cursor, spool.sha256) if cursor is not None else None
+        return spool.commit(upload_folder, shard_depth, path)
+
+
+def known_path(cursor, sha256):
+    """The path content with this hash is registered under, or None."""
+    row = cursor.execute(CERTIFICATE_PATH, (sha256,)).fetchone()
+    return row[0] if row else None
+
+
+def register(cursor, blob):
+    """
+    Record blob in the certificates table and return it with the path its
+    hash is registered under: a no-op if the hash is known, in which case
+    that earlier path is the one achievements must point at.
+    """
+    cursor.execute(INSERT_CERTIFICATE, blob)
+    return blob._replace(path=known_path(cursor, blob.sha256))
+
+
+def rebuild_refcounts(cursor):
+    """Recompute certificates.refcount from achievements.certificate_path."""
+    cursor.execute("""
+        UPDATE certificates SET refcount = (
+            SELECT COUNT(*) FROM achievements WHERE certificate_path = certificates.path
+        )
+    """)
+
+
+def hash_file(path):
+    """(sha256 hex digest, size) of the file at path, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def dedupe_uploads(connection, upload_folder, shard_depth=0, dry_run=False, log=None):
+    """
+    Collapse legacy uploads in upload_folder into content-addressed blobs.
+
+    1. Every legacy file is hashed and hard-linked (or copied) to its blob
+       name, or to the path its content is already registered under.
+    2. In one transaction the blobs are registered and every
+       achievements.certificate_path is repointed at its blob.
+    3. Only after that commit are the legacy files deleted.
+
+    A failure before step 3 leaves every old path in place, so the database
+    and the folder always agree. Returns a dict of counts.
+    """
+    result = {"files": 0, "blobs": 0, "duplicates": 0, "bytes_reclaimed": 0, "rows_updated": 0}
+    blobs = {}
+    sources = {}
+    legacy = []
+
+    for entry in sorted(os.scandir(upload_folder), key=lambda e: e.name):
+        if not entry.is_file() or entry.name.startswith(".") or _BLOB_NAME.match(entry.name):
+            continue
+        sha256, size = hash_file(entry.path)
+        if sha256 in blobs:
+            result["duplicates"] += 1
+            result["bytes_reclaimed"] += size
+        else:
+            original = _LEGACY_PREFIX.sub("", entry.name)
+            # Content already registered keeps its path, whatever this file's extension
+            path = known_path(connection, sha256)
+            if path is None:
+                path = f"{PATH_PREFIX}/{shard_path(blob_name(sha256, original), shard_depth)}"
+            blobs[sha256] = Blob(sha256, path, size, original)
+            sources[sha256] = entry.path
+        legacy.append((entry.path, f"{PATH_PREFIX}/{entry.name}", blobs[sha256].path))
+        if log:
+            log(f"  {entry.name} -> {os.path.basename(blobs[sha256].path)}")
+
+    result["files"] = len(legacy)
+    result["blobs"] = len(blobs)
+    if dry_run or not legacy:
+        return result
+
+    for sha256, blob in blobs.items():
+        target = local_path(upload_folder, blob.path)
+        if os.path.exists(target):
+            # Already stored by a new-style upload: the legacy copy is redundant too
+            result["duplicates"] += 1
+            result["bytes_reclaimed"] += blob.size
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _link_or_copy(sources[sha256], target)
+
+    with connection:
+        cursor = connection.cursor()
+        cursor.executemany(INSERT_CERTIFICATE, blobs.values())
+        cursor.executemany(
+            "UPDATE achievements SET certificate_path = ? WHERE certificate_path = ?",
+            [(blob_path, old_path) for _, old_path, blob_path in legacy],
+        )
+        result["rows_updated"] = cursor.rowcount
+
+    for file_path, _, _ in legacy:
+        os.unlink(file_path)
+    return result
+
+
+def _misplaced_files(upload_folder, shard_depth):
+    """Yield (current path, wanted path) for stored files not at their shard_depth location."""
+    for directory, subdirectories, files in os.walk(upload_folder):
+        subdirectories[:] = sorted(d for d in subdirectories if not d.startswith("."))
+        relative_dir = os.path.relpath(directory, upload_folder).replace(os.sep, "/")
+        for name in sorted(files):
+            if name.startswith("."):
+                continue
+            current = name if relative_dir == "." else f"{relative_dir}/{name}"
+            wanted = shard_path(name, shard_depth)
+            if current != wanted:
+                yield f"{PATH_PREFIX}/{current}", f"{PATH_PREFIX}/{wanted}"
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def reshard_uploads(connection, upload_folder, shard_depth, batch_size=500, dry_run=False, log=None):
+    """
+    Move every stored file to its location for shard_depth (0 = flat) and
+    rewrite achievements.certificate_path and certificates.path to match.
+
+    Files are handled batch_size at a time. Each batch is linked into place,
+    the rows are rewritten in one transaction, and only then are the old
+    names removed. An interrupted run loses nothing and can simply be
+    re-run. Returns a dict of counts.
+    """
+    result = {"files": 0, "rows_updated": 0}
+    for batch in _batches(_misplaced_files(upload_folder, shard_depth), batch_size):
+        result["files"] += len(batch)
+        if dry_run:
+            continue
+        for current, wanted in batch:
+            target = local_path(upload_folder, wanted)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if not os.path.exists(target):
+                _link_or_copy(local_path(upload_folder, current), target)
+
+        with connection:
+            cursor = connection.cursor()
+            moves = [(wanted, current) for current, wanted in batch]
+            cursor.executemany("UPDATE certificates SET path = ? WHERE path = ?", moves)
+            cursor.executemany("UPDATE achievements SET certificate_path = ? WHERE certificate_path = ?", moves)
+            result["rows_updated"] += cursor.rowcount
+            # The refcount triggers see each row move as -1/+1 on two paths;
+            # recount the moved ones rather than reason about the order
+            cursor.executemany("""
+                UPDATE certificates SET refcount = (
+                    SELECT COUNT(*) FROM achievements WHERE certificate_path = certificates.path
+                ) WHERE path = ?
+            """, [(wanted,) for _, wanted in batch])
+
+        for current, _ in batch:
+            os.unlink(local_path(upload_folder, current))
+        if log:
+            log(f"  moved {result['files']:,} files")
+
+    if not dry_run:
+        # Drop shard directories left empty by a move to a shallower layout
+        for directory, _, _ in os.walk(upload_folder, topdown=False):
+            if directory != upload_folder and not os.listdir(directory):
+                os.rmdir(directory)
+    return result
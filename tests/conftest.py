@@ -1,86 +1,87 @@
 # tests/conftest.py
+import itertools
 import os
-import tempfile
 import pytest
-from app import app, init_db
-from werkzeug.security import generate_password_hash
-import sqlite3
+
+import cache
+import db
+import migrations
+import passwords
+import thumbnails
+from app import create_app
+
+_clone_ids = itertools.count()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--db-scope", choices=("function", "session"), default="function",
+        help="Give each test its own database (function, the default) or share one "
+             "per session, i.e. per xdist worker (session).",
+    )
+
+
+def _db_scope(fixture_name, config):
+    return config.getoption("--db-scope")
+
 
 @pytest.fixture(scope='session')
-def test_app():
-    """Create and configure a new app instance for testing."""
-    # Create a temporary file to isolate the database for each test
-    db_fd, db_path = tempfile.mkstemp()
-    
-    # Configure the app for testing
+def template_db(tmp_path_factory):
+    """A migrated database holding the test accounts, built once per session (per xdist worker)."""
+    path = str(tmp_path_factory.mktemp("template") / "ams.db")
+    migrations.migrate(path, log=None)
+    password = passwords.hash_password('password')
+    conn = db.open_connection(path)
+    with conn:
+        conn.executemany("""
+            INSERT INTO student (
+                student_name, student_id, email, phone_number,
+                password, student_gender, student_dept
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [
+            ('Test Student', 'S001', 'student@test.com', '1234567890', password, 'M', 'CSE'),
+            # Submission tests record achievements for this student
+            ('Second Student', '123', 'student123@test.com', '1234567891', password, 'F', 'CSE'),
+        ])
+        conn.execute("""
+            INSERT INTO teacher (
+                teacher_name, teacher_id, email, phone_number,
+                password, teacher_gender, teacher_dept
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, ('Test Teacher', 'T001', 'teacher@test.com', '0987654321', password, 'F', 'CSE'))
+    conn.close()
+    return path
+
+
+@pytest.fixture(scope=_db_scope)
+def database(template_db):
+    """An in-memory copy of the template database, dropped again afterwards."""
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    db_path = db.clone_database(template_db, db.memory_uri(f"ams-test-{worker}-{next(_clone_ids)}"))
+    yield db_path
+    db.drop_database(db_path)
+
+
+@pytest.fixture(scope='session')
+def _app():
+    app = create_app()
     app.config.update({
         'TESTING': True,
         'WTF_CSRF_ENABLED': False,
-        'DATABASE': db_path,
-        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
         'SECRET_KEY': 'test-secret-key',
     })
     app.jinja_env.globals['csrf_token'] = lambda: 'test-token'
+    return app
 
 
-    # Create the test database and tables
-    with app.app_context():
-        # Initialize the database (this should create the tables)
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Create tables manually since we're in test mode
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS student (
-            student_name TEXT NOT NULL,
-            student_id TEXT PRIMARY KEY,
-            email TEXT UNIQUE NOT NULL,
-            phone_number TEXT,
-            password TEXT NOT NULL,
-            student_gender TEXT,
-            student_dept TEXT
-        )''')
-        
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS teacher (
-            teacher_name TEXT NOT NULL,
-            teacher_id TEXT PRIMARY KEY,
-            email TEXT UNIQUE NOT NULL,
-            phone_number TEXT,
-            password TEXT NOT NULL,
-            teacher_gender TEXT,
-            teacher_dept TEXT
-        )''')
-        
-        # Add test data
-        cursor.execute("""
-            INSERT OR REPLACE INTO student (
-                student_name, student_id, email, phone_number, 
-                password, student_gender, student_dept
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            'Test Student', 'S001', 'student@test.com', '1234567890',
-            generate_password_hash('password'), 'M', 'CSE'
-        ))
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO teacher (
-                teacher_name, teacher_id, email, phone_number,
-                password, teacher_gender, teacher_dept
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            'Test Teacher', 'T001', 'teacher@test.com', '0987654321',
-            generate_password_hash('password'), 'F', 'CSE'
-        ))
-        
-        conn.commit()
-        conn.close()
-    
-    yield app
-
-    # Clean up the test database
-    os.close(db_fd)
-    os.unlink(db_path)
+@pytest.fixture
+def test_app(_app, database, monkeypatch):
+    """The app, pointed at this test's database."""
+    monkeypatch.setitem(_app.config, 'DB_PATH', database)
+    cache.reset(_app)
+    yield _app
+    # Previews still being written would outlive this test's database
+    thumbnails.worker.shutdown(wait=True)
 
 @pytest.fixture
 def client(test_app):
@@ -110,9 +111,8 @@ def auth_teacher_client(client):
 # Add this fixture for test_db to be used in test files
 @pytest.fixture
 def test_db(test_app):
-    """Fixture to ensure the test database is set up."""
-    with test_app.app_context():
-        conn = sqlite3.connect(test_app.config['DATABASE'])
-        yield conn
-        conn.close()
+    """A connection to the test's database."""
+    conn = db.open_connection(test_app.config['DB_PATH'])
+    yield conn
+    conn.close()
         
\ No newline at end of file
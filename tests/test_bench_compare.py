@@ -0,0 +1,25 @@
+# tests/test_bench_compare.py
+from benchmarks.bench_routes import compare_reports, percentile
+
+
+def _report(p50, p90):
+    return {"routes": {"/teacher-dashboard": {"p50_ms": p50, "p90_ms": p90}}}
+
+
+def test_compare_passes_within_threshold():
+    assert compare_reports(_report(10.0, 20.0), _report(11.0, 21.0), threshold=0.2) == 0
+
+
+def test_compare_fails_on_regression():
+    assert compare_reports(_report(10.0, 20.0), _report(10.0, 30.0), threshold=0.2) == 1
+
+
+def test_compare_ignores_routes_missing_from_baseline():
+    assert compare_reports({"routes": {}}, _report(10.0, 20.0), threshold=0.2) == 0
+
+
+def test_percentile_nearest_rank():
+    samples = list(range(1, 101))
+    assert percentile(samples, 0.5) == 50
+    assert percentile(samples, 0.99) == 99
+    assert percentile([7], 0.9) == 7
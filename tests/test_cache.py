@@ -0,0 +1,165 @@
+# tests/test_cache.py
+import io
+
+import pytest
+
+import cache
+import db
+import metrics
+
+SUBMISSION = {
+    "student_id": "123",
+    "achievement_type": "hackathon",
+    "event_name": "Cache Test",
+    "achievement_date": "2025-04-13",
+    "organizer": "Test",
+    "position": "Winner",
+}
+
+
+def _version(test_app, teacher_id="T001"):
+    conn = db.open_connection(test_app.config["DB_PATH"])
+    try:
+        return cache.teacher_version(conn, teacher_id)
+    finally:
+        conn.close()
+
+
+def test_lru_cache_expires_and_evicts():
+    lru = cache.LRUCache("test", ttl=60, max_entries=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)  # evicts "b", the least recently used
+
+    assert lru.get("b") is None
+    assert lru.get("c") == 3
+    assert lru.stats() == {"hits": 2, "misses": 1, "sets": 3, "invalidations": 0, "entries": 2}
+
+    expired = cache.LRUCache("test", ttl=0)
+    expired.set("a", 1)
+    assert expired.get("a") is None
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    # Two instances on one file stand in for two worker processes
+    path = str(tmp_path / "cache.db")
+    first = cache.SQLiteCache("dashboard", 60, path)
+    second = cache.SQLiteCache("dashboard", 60, path)
+
+    first.set("T1", {"stats": {"total": 3}, "recent_entries": []})
+    assert second.get("T1") == {"stats": {"total": 3}, "recent_entries": []}
+
+    second.delete("T1")
+    assert first.get("T1") is None
+    assert cache.SQLiteCache("other", 60, path).get("T1") is None
+
+
+def test_unknown_backend_is_rejected(test_app, monkeypatch):
+    monkeypatch.setitem(test_app.config, "DASHBOARD_CACHE", "redis")
+    with test_app.app_context(), pytest.raises(ValueError):
+        cache.get_cache("dashboard")
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_dashboard_is_cached_until_the_teacher_submits(auth_teacher_client, test_app, tmp_path, monkeypatch, backend):
+    monkeypatch.setitem(test_app.config, "DASHBOARD_CACHE", backend)
+    monkeypatch.setitem(test_app.config, "CACHE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setitem(test_app.config, "UPLOAD_FOLDER", str(tmp_path))
+    with test_app.app_context():
+        dashboard_cache = cache.get_cache("dashboard")
+    dashboard_cache.set("T-OTHER", {"stats": {}, "recent_entries": []})
+
+    auth_teacher_client.get("/teacher-dashboard")
+    auth_teacher_client.get("/teacher-dashboard")
+    assert dashboard_cache.stats()["hits"] == 1
+
+    res = auth_teacher_client.post("/submit_achievements", data=dict(SUBMISSION))
+    assert b"successfully registered" in res.data
+    assert dashboard_cache.get("T001") is None
+    assert dashboard_cache.get("T-OTHER") is not None
+
+    res = auth_teacher_client.get("/teacher-dashboard")
+    assert b"2025-04-13" in res.data
+
+
+def test_import_invalidates_the_dashboard(auth_teacher_client, test_app):
+    with test_app.app_context():
+        dashboard_cache = cache.get_cache("dashboard")
+    auth_teacher_client.get("/teacher-dashboard")
+    assert dashboard_cache.get("T001", _version(test_app)) is not None
+
+    csv_file = (io.BytesIO(b"student_id,achievement_type,event_name,achievement_date,organizer,position\n"
+                           b"123,coding,Imported Contest,2025-05-01,Test,Winner\n"), "rows.csv")
+    auth_teacher_client.post("/import-achievements", data={"csv_file": csv_file},
+                             content_type="multipart/form-data")
+    assert dashboard_cache.get("T001") is None
+    assert b"2025-05-01" in auth_teacher_client.get("/teacher-dashboard").data
+
+
+def test_cache_counters_are_exported(auth_teacher_client):
+    metrics.registry.reset()
+    auth_teacher_client.get("/teacher-dashboard")
+    auth_teacher_client.get("/teacher-dashboard")
+
+    text = auth_teacher_client.get("/metrics").get_data(as_text=True)
+    assert 'ams_cache_requests_total{cache="dashboard",result="hit"} 1' in text
+    assert 'ams_cache_requests_total{cache="dashboard",result="miss"} 1' in text
+
+
+def test_entries_from_an_older_version_are_ignored():
+    lru = cache.LRUCache("test", ttl=60)
+    lru.set("T1", "payload", version=4)
+    assert lru.get("T1", version=4) == "payload"
+    assert lru.get("T1", version=5) is None
+    assert lru.get("T1", version=4) is None  # the stale entry was dropped
+
+
+def test_teacher_version_moves_only_for_that_teachers_data(test_app, test_db):
+    with test_db:
+        test_db.execute("INSERT INTO teacher (teacher_name, teacher_id, email, password) "
+                        "VALUES ('V', 'T-V', 'v@test.com', 'p')")
+        # A student only T-V has recorded, whatever other tests left behind
+        test_db.execute("INSERT INTO student (student_name, student_id, email, password) "
+                        "VALUES ('V', 'S-V', 'sv@test.com', 'p')")
+
+    def versions():
+        return cache.teacher_version(test_db, "T001"), cache.teacher_version(test_db, "T-V")
+
+    def after(statement):
+        with test_db:
+            test_db.execute(statement)
+        return versions()
+
+    start = versions()
+    insert = after("INSERT INTO achievements (student_id, teacher_id, achievement_type, event_name, "
+                   "achievement_date, organizer, position) VALUES ('S-V', 'T-V', 'coding', 'V', '2025-01-01', 'X', '1')")
+    assert insert == (start[0], start[1] + 1)
+
+    # Columns no cached page shows, and derived tables, do not count
+    for statement in (
+        "UPDATE teacher SET password = 'rehashed' WHERE teacher_id = 'T001'",
+        "UPDATE student SET password = 'rehashed', student_dept = 'ECE' WHERE student_id = 'S-V'",
+        "UPDATE achievements SET organizer = 'Y', certificate_path = 'uploads/x.pdf' WHERE teacher_id = 'T-V'",
+        "UPDATE teacher_stats SET total_achievements = total_achievements",
+    ):
+        assert after(statement) == insert
+
+    # A student's name is shown to every teacher who recorded them
+    renamed = after("UPDATE student SET student_name = 'Renamed' WHERE student_id = 'S-V'")
+    assert renamed == (insert[0], insert[1] + 1)
+    moved = after("UPDATE achievements SET teacher_id = 'T001' WHERE teacher_id = 'T-V'")
+    assert moved == (renamed[0] + 1, renamed[1] + 1)
+    assert after("DELETE FROM achievements WHERE student_id = 'S-V'") == (moved[0] + 1, moved[1])
+
+
+def test_write_from_another_process_reaches_a_cached_dashboard(auth_teacher_client, test_db):
+    assert b"2025-06-30" not in auth_teacher_client.get("/teacher-dashboard").data
+
+    # Stands in for another worker: a plain connection, no invalidate() call
+    with test_db:
+        test_db.execute(
+            "INSERT INTO achievements (student_id, teacher_id, achievement_type, event_name, achievement_date, "
+            "organizer, position) VALUES ('123', 'T001', 'coding', 'Elsewhere', '2025-06-30', 'X', '1')"
+        )
+    assert b"2025-06-30" in auth_teacher_client.get("/teacher-dashboard").data
@@ -0,0 +1,121 @@
+# tests/test_certificates.py
+import hashlib
+import io
+
+import pytest
+
+import db
+import thumbnails
+
+PDF = b"%PDF-1.4\n" + b"certificate body " * 4000
+
+
+@pytest.fixture
+def uploaded(auth_teacher_client, test_app, tmp_path, monkeypatch):
+    """Submit one certificate as T001 for student 123; return (achievement id, bytes)."""
+    monkeypatch.setitem(test_app.config, "UPLOAD_FOLDER", str(tmp_path))
+    # Unique per test, in case --db-scope session shares one database between tests
+    data = PDF + str(tmp_path).encode()
+    res = auth_teacher_client.post("/submit_achievements", content_type="multipart/form-data", data={
+        "student_id": "123",
+        "achievement_type": "paper",
+        "event_name": "Certificate Test",
+        "achievement_date": "2025-04-13",
+        "organizer": "Test",
+        "position": "Finalist",
+        "certificate": (io.BytesIO(data), "Paper Award.pdf"),
+    })
+    assert b"successfully registered" in res.data
+    # Let the preview finish: a shared-cache test database reports a locked
+    # table at once instead of waiting for the worker's write
+    thumbnails.worker.shutdown(wait=True)
+    conn = db.open_connection(test_app.config["DB_PATH"])
+    try:
+        achievement_id = conn.execute(
+            "SELECT id FROM achievements WHERE event_name = 'Certificate Test' ORDER BY id DESC LIMIT 1"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    return achievement_id, data
+
+
+def test_owner_gets_file_with_strong_etag_and_private_caching(auth_teacher_client, uploaded):
+    achievement_id, data = uploaded
+    res = auth_teacher_client.get(f"/certificates/{achievement_id}")
+
+    assert res.status_code == 200
+    assert res.data == data
+    assert res.headers["ETag"] == f'"{hashlib.sha256(data).hexdigest()}"'
+    assert res.headers["Accept-Ranges"] == "bytes"
+    cache_control = res.headers["Cache-Control"]
+    assert "private" in cache_control and "immutable" in cache_control
+    assert "public" not in cache_control
+    assert "Paper_Award.pdf" in res.headers["Content-Disposition"]
+
+
+def test_if_none_match_returns_304(auth_teacher_client, uploaded):
+    achievement_id, _ = uploaded
+    etag = auth_teacher_client.get(f"/certificates/{achievement_id}").headers["ETag"]
+
+    res = auth_teacher_client.get(f"/certificates/{achievement_id}", headers={"If-None-Match": etag})
+
+    assert res.status_code == 304
+    assert res.data == b""
+
+
+def test_range_request(auth_teacher_client, uploaded):
+    achievement_id, data = uploaded
+    res = auth_teacher_client.get(f"/certificates/{achievement_id}", headers={"Range": "bytes=100-199"})
+
+    assert res.status_code == 206
+    assert res.data == data[100:200]
+    assert res.headers["Content-Range"] == f"bytes 100-199/{len(data)}"
+
+
+def test_student_owner_allowed_others_not(client, uploaded):
+    achievement_id, _ = uploaded
+    with client.session_transaction() as sess:
+        sess.clear()
+        sess["logged_in"] = True
+        sess["student_id"] = "123"
+    assert client.get(f"/certificates/{achievement_id}").status_code == 200
+
+    with client.session_transaction() as sess:
+        sess["student_id"] = "S001"
+    assert client.get(f"/certificates/{achievement_id}").status_code == 404
+
+    with client.session_transaction() as sess:
+        sess.clear()
+        sess["logged_in"] = True
+        sess["teacher_id"] = "T999"
+    assert client.get(f"/certificates/{achievement_id}").status_code == 404
+
+    with client.session_transaction() as sess:
+        sess.clear()
+    assert client.get(f"/certificates/{achievement_id}").status_code == 302
+
+
+def test_x_accel_redirect_mode(auth_teacher_client, test_app, uploaded, monkeypatch):
+    achievement_id, data = uploaded
+    monkeypatch.setitem(test_app.config, "CERTIFICATE_SENDFILE", "x-accel-redirect")
+
+    res = auth_teacher_client.get(f"/certificates/{achievement_id}")
+
+    sha256 = hashlib.sha256(data).hexdigest()
+    assert res.status_code == 200
+    assert res.data == b""
+    assert res.headers["X-Accel-Redirect"].startswith("/protected-uploads/")
+    assert res.headers["X-Accel-Redirect"].endswith(f"/{sha256}.pdf")
+    assert "X-Sendfile" not in res.headers
+
+    res = auth_teacher_client.get(f"/certificates/{achievement_id}",
+                                  headers={"If-None-Match": f'"{sha256}"'})
+    assert res.status_code == 304
+    assert "X-Accel-Redirect" not in res.headers
+
+
+def test_uploads_not_served_as_static_files(client):
+    assert client.get("/static/uploads/20250412211251_Hit_the_Bug_-_M.Kirithika.jpeg").status_code == 404
+    # Path segments that resolve into the upload folder
+    assert client.get("/static/./uploads/20250412211251_Hit_the_Bug_-_M.Kirithika.jpeg").status_code == 404
+    assert client.get("/static/css/../uploads/20250412211251_Hit_the_Bug_-_M.Kirithika.jpeg").status_code == 404
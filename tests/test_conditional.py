@@ -0,0 +1,113 @@
+# tests/test_conditional.py
+import gzip
+
+import pytest
+
+import db
+import queries
+import thumbnails
+
+
+def _add_achievement(conn, event_name, certificate_path=None):
+    with conn:
+        conn.execute(
+            "INSERT INTO achievements (student_id, teacher_id, achievement_type, event_name, achievement_date, "
+            "organizer, position, certificate_path, created_at) "
+            "VALUES ('123', 'T001', 'coding', ?, '2025-04-13', 'X', '1', ?, CURRENT_TIMESTAMP)",
+            (event_name, certificate_path),
+        )
+
+
+@pytest.fixture
+def statements():
+    """SQL executed while the test runs."""
+    seen = []
+
+    def hook(cursor, sql, seconds, executed):
+        if executed:
+            seen.append(sql)
+
+    db.statement_hooks.append(hook)
+    yield seen
+    db.statement_hooks.remove(hook)
+
+
+def test_unchanged_listing_is_answered_with_304(auth_teacher_client, test_db, statements):
+    _add_achievement(test_db, "Listed")
+    first = auth_teacher_client.get("/all-achievements")
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+    assert first.last_modified is not None
+    assert "private" in first.headers["Cache-Control"] and "no-cache" in first.headers["Cache-Control"]
+
+    statements.clear()
+    res = auth_teacher_client.get("/all-achievements", headers={"If-None-Match": first.headers["ETag"]})
+    assert res.status_code == 304
+    assert res.data == b""
+    assert res.headers["ETag"] == first.headers["ETag"]
+    # Only the version lookup ran: no listing query, no total
+    assert statements == [queries.TEACHER_VERSION]
+
+    res = auth_teacher_client.get("/all-achievements", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert res.status_code == 304
+
+
+def test_listing_etag_follows_data_and_query(auth_teacher_client, test_db):
+    etag = auth_teacher_client.get("/all-achievements").headers["ETag"]
+    assert auth_teacher_client.get("/all-achievements?type=coding").headers["ETag"] != etag
+
+    _add_achievement(test_db, "New Row")
+    res = auth_teacher_client.get("/all-achievements", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert b"New Row" in res.data
+    assert res.headers["ETag"] != etag
+
+    with test_db:
+        test_db.execute("DELETE FROM achievements WHERE event_name = 'New Row'")
+    assert auth_teacher_client.get("/all-achievements", headers={"If-None-Match": res.headers["ETag"]}).status_code == 200
+
+
+def test_listing_with_certificate_without_preview_is_validated(auth_teacher_client, test_app, test_db, monkeypatch):
+    monkeypatch.setitem(test_app.config, "THUMBNAIL_WORKERS", 1)
+    monkeypatch.setattr(thumbnails, "can_render", lambda certificate_path: True)
+    path = "uploads/ab/cd/" + "ab" + "cd" + "0" * 60 + ".png"
+    # A legacy path with no certificates row, and a registered one still waiting for its preview
+    _add_achievement(test_db, "Legacy Certificate", "uploads/legacy.png")
+    with test_db:
+        test_db.execute("INSERT INTO certificates (sha256, path, size) VALUES (?, ?, 1)", ("abcd" + "0" * 60, path))
+    _add_achievement(test_db, "With Certificate", path)
+
+    first = auth_teacher_client.get("/all-achievements")
+    assert first.headers["ETag"]
+    res = auth_teacher_client.get("/all-achievements", headers={"If-None-Match": first.headers["ETag"]})
+    assert res.status_code == 304
+
+    # The preview landing changes the page, and so the ETag
+    with test_db:
+        test_db.execute("UPDATE certificates SET has_thumbnail = 1 WHERE path = ?", (path,))
+    res = auth_teacher_client.get("/all-achievements", headers={"If-None-Match": first.headers["ETag"]})
+    assert res.status_code == 200
+    assert b"certificate-thumb" in res.data
+    assert res.headers["ETag"] != first.headers["ETag"]
+
+
+def test_export_is_answered_with_304_per_encoding(auth_teacher_client, test_db, statements):
+    _add_achievement(test_db, "Exported")
+    plain = auth_teacher_client.get("/export-csv")
+    assert b"Exported" in plain.data
+    zipped = auth_teacher_client.get("/export-csv", headers={"Accept-Encoding": "gzip"})
+    assert b"Exported" in gzip.decompress(zipped.data)
+    assert plain.headers["ETag"] != zipped.headers["ETag"]
+
+    statements.clear()
+    res = auth_teacher_client.get("/export-csv", headers={"Accept-Encoding": "gzip",
+                                                          "If-None-Match": zipped.headers["ETag"]})
+    assert res.status_code == 304
+    assert "Accept-Encoding" in res.headers["Vary"]
+    assert statements == [queries.TEACHER_VERSION]
+
+    # The identity copy does not validate the gzip representation
+    res = auth_teacher_client.get("/export-csv", headers={"Accept-Encoding": "gzip",
+                                                          "If-None-Match": plain.headers["ETag"]})
+    assert res.status_code == 200
+    res.close()
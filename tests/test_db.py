@@ -1,12 +1,10 @@
-import sqlite3
-from app import app
+import db
+from app import init_db
 
-def test_tables_exist():
-    from app import init_db
+def test_tables_exist(test_app):
+    init_db(test_app)
 
-    init_db()
-
-    conn = sqlite3.connect(app.config["DB_PATH"])
+    conn = db.open_connection(test_app.config["DB_PATH"])
     cur = conn.cursor()
 
     for table in ("student", "teacher", "achievements"):
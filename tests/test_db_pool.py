@@ -0,0 +1,115 @@
+import sqlite3
+import threading
+
+import db
+import migrations
+from db import ConnectionPool
+
+
+def test_pool_reuses_connections(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=2)
+
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+    pool.release(second)
+
+    assert first is second
+    stats = pool.stats()
+    assert stats["opens"] == 1
+    assert stats["hits"] == 1
+    pool.close_all()
+
+
+def test_pool_applies_pragma_profile(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    conn = pool.acquire()
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+    pool.release(conn)
+    pool.close_all()
+
+
+def test_pool_rolls_back_on_release(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=1)
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release(conn)
+
+    conn = pool.acquire()
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.release(conn)
+    pool.close_all()
+
+
+def test_pool_waits_when_exhausted(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=1, timeout=5)
+    conn = pool.acquire()
+
+    timer = threading.Timer(0.05, pool.release, args=(conn,))
+    timer.start()
+    again = pool.acquire()
+    timer.join()
+
+    assert again is conn
+    stats = pool.stats()
+    assert stats["opens"] == 1
+    assert stats["waits"] == 1
+    assert stats["wait_time"] > 0
+    pool.release(again)
+    pool.close_all()
+
+
+def test_pool_times_out(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=1, timeout=0.01)
+    conn = pool.acquire()
+    try:
+        pool.acquire()
+    except sqlite3.OperationalError:
+        pass
+    else:
+        raise AssertionError("expected pool timeout")
+    pool.release(conn)
+    pool.close_all()
+
+
+def test_memory_database_outlives_its_connections():
+    uri = db.memory_uri("pool-test-anchor")
+    conn = db.connect(uri)
+    conn.execute("CREATE TABLE t (x)")
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.commit()
+    conn.close()
+
+    conn = db.connect(uri)
+    assert conn.execute("SELECT x FROM t").fetchone()[0] == 1
+    conn.close()
+
+    db.drop_database(uri)
+    conn = db.connect(uri)
+    assert conn.execute("SELECT count(*) FROM sqlite_master").fetchone()[0] == 0
+    conn.close()
+    db.drop_database(uri)
+
+
+def test_clones_of_a_template_are_independent(tmp_path):
+    template = str(tmp_path / "template.db")
+    migrations.migrate(template, log=None)
+    first = db.clone_database(template, db.memory_uri("pool-test-first"))
+    second = db.clone_database(template, db.memory_uri("pool-test-second"))
+
+    with db.connect(first) as conn:
+        conn.execute("INSERT INTO teacher (teacher_name, teacher_id, email, password) VALUES ('A', 'T1', 'a@x', 'p')")
+
+    assert db.connect(first).execute("SELECT count(*) FROM teacher").fetchone()[0] == 1
+    assert db.connect(second).execute("SELECT count(*) FROM teacher").fetchone()[0] == 0
+    assert db.connect(second).execute("PRAGMA user_version").fetchone()[0] == migrations.LATEST_VERSION
+    db.drop_database(first)
+    db.drop_database(second)
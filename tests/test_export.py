@@ -0,0 +1,89 @@
+# tests/test_export.py
+import gzip
+import sqlite3
+import tracemalloc
+
+import pytest
+
+import export
+import migrations
+import queries
+
+EXPORT_ROWS = 1_000_000
+
+
+@pytest.fixture(scope="module")
+def big_db(tmp_path_factory):
+    """A teacher with a million synthetic achievements (no stats triggers, for speed)."""
+    db_path = str(tmp_path_factory.mktemp("export") / "export.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(migrations.STUDENT_TABLE)
+    conn.execute(migrations.ACHIEVEMENTS_TABLE)
+    conn.execute("""
+        INSERT INTO student (student_name, student_id, email, password)
+        VALUES ('Test Student', 'S001', 'student@test.com', 'x')
+    """)
+    conn.execute("""
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                  achievement_date, organizer, position, achievement_description)
+        SELECT 'T001', 'S001', 'coding', 'Event ' || i,
+               date('2020-01-01', '+' || (i % 1500) || ' days'), 'CSE', '1', 'Synthetic row ' || i
+        FROM n
+    """, (EXPORT_ROWS,))
+    conn.execute("CREATE INDEX idx_achievements_teacher_date ON achievements(teacher_id, achievement_date)")
+    conn.commit()
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+def test_export_memory_stays_flat(big_db):
+    """Stream a million rows through CSV and gzip, tracking the Python heap peak."""
+    cursor = big_db.execute(queries.EXPORT_CSV, ("T001",))
+    csv_bytes = 0
+    gzip_bytes = 0
+
+    def counted(chunks):
+        nonlocal csv_bytes
+        for chunk in chunks:
+            csv_bytes += len(chunk)
+            yield chunk
+
+    tracemalloc.start()
+    try:
+        for chunk in export.gzip_chunks(counted(export.iter_achievement_csv(cursor))):
+            gzip_bytes += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # ~70 MB of CSV must stream through well under 2 MB of Python heap
+    assert csv_bytes > 50 * 1024 * 1024
+    assert 0 < gzip_bytes < csv_bytes
+    assert peak < 2 * 1024 * 1024, f"peak {peak} bytes while exporting {csv_bytes} bytes"
+
+
+def test_export_rows_are_numbered_in_order(big_db):
+    cursor = big_db.execute(queries.EXPORT_CSV + " LIMIT 3", ("T001",))
+    text = b"".join(export.iter_achievement_csv(cursor, chunk_rows=2)).decode()
+    lines = text.splitlines()
+
+    assert lines[0].startswith("#,Student Name")
+    assert [line.split(",")[0] for line in lines[1:]] == ["1", "2", "3"]
+
+
+def test_export_route_gzip(auth_teacher_client):
+    res = auth_teacher_client.get("/export-csv", headers={"Accept-Encoding": "gzip"})
+
+    assert res.status_code == 200
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(res.data).startswith(b"#,Student Name")
+
+
+def test_export_route_plain(auth_teacher_client):
+    res = auth_teacher_client.get("/export-csv")
+
+    assert res.status_code == 200
+    assert "Content-Encoding" not in res.headers
+    assert res.data.startswith(b"#,Student Name")
@@ -0,0 +1,187 @@
+# tests/test_import.py
+import io
+import sqlite3
+import uuid
+
+import pytest
+
+import importer
+import migrations
+import passwords
+import stats
+
+HEADER = "student_id,achievement_type,event_name,achievement_date,organizer,position,team_size,programming_language\n"
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = str(tmp_path / "import.db")
+    migrations.migrate(db_path, log=None)
+    connection = sqlite3.connect(db_path)
+    connection.executemany(
+        "INSERT INTO student (student_name, student_id, email, password) VALUES (?, ?, ?, 'x')",
+        [(f"Student {n}", f"S{n:03d}", f"s{n}@test.com") for n in range(1, 6)],
+    )
+    connection.commit()
+    yield connection
+    connection.close()
+
+
+def _import(conn, text, **kwargs):
+    return importer.import_achievements(conn, io.StringIO(text), "T001", **kwargs)
+
+
+def test_valid_rows_are_imported_and_bad_rows_reported(conn):
+    result = _import(conn, HEADER + "\n".join([
+        "S001,coding,Code Sprint,2025-04-12,IEEE,First Place,3,Python",
+        "S999,coding,Code Sprint,2025-04-12,IEEE,First Place,,",
+        "S002,juggling,Code Sprint,2025-04-12,IEEE,First Place,,",
+        "S003,hackathon,Hack,12/04/2025,IEEE,Finalist,,",
+        "S004,hackathon,,2025-04-12,IEEE,Finalist,,",
+        "S005,hackathon,Hack,2025-04-12,IEEE,Finalist,zero,",
+        '" S002 ",hackathon,"Hack, the Future",2025-04-13,IEEE,Finalist,,',
+    ]) + "\n")
+
+    assert result["rows"] == 7
+    assert result["imported"] == 2
+    assert result["rejected"] == 5
+    lines = dict(result["errors"])
+    assert "S999" in lines[3]
+    assert "achievement_type" in lines[4]
+    assert "achievement_date" in lines[5]
+    assert "event_name" in lines[6]
+    assert "team_size" in lines[7]
+
+    rows = conn.execute(
+        "SELECT student_id, teacher_id, event_name, team_size, programming_language FROM achievements ORDER BY id"
+    ).fetchall()
+    assert rows == [("S001", "T001", "Code Sprint", 3, "Python"), ("S002", "T001", "Hack, the Future", None, None)]
+    assert stats.check_teacher_stats(conn) == []
+
+
+def test_header_must_name_known_columns(conn):
+    result = _import(conn, "student_id,event_name,colour\nS001,Hack,red\n")
+
+    assert result["imported"] == 0
+    (line, message), = result["errors"]
+    assert line == 1
+    assert "missing columns: achievement_type" in message
+    assert "unknown columns: colour" in message
+
+
+def test_students_checked_once_per_chunk(conn):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    rows = [f"S00{n % 5 + 1},sql,Query Quest,2025-01-0{n % 9 + 1},ACM,Participant,," for n in range(10)]
+
+    result = _import(conn, HEADER + "\n".join(rows) + "\n", chunk_rows=4)
+
+    assert result["imported"] == 10
+    assert sum("FROM student" in s for s in statements) == 3
+    # One transaction per chunk
+    assert statements.count("COMMIT") == 3
+
+
+def test_error_report_is_capped(conn, monkeypatch):
+    monkeypatch.setattr(importer, "MAX_REPORTED_ERRORS", 3)
+    result = _import(conn, HEADER + "S999,sql,Q,2025-01-01,ACM,P,,\n" * 10)
+
+    assert result["rejected"] == 10
+    assert len(result["errors"]) == 3
+
+
+def test_import_route(auth_teacher_client, test_app, monkeypatch):
+    # Import files have their own size limit, well above the certificate one
+    monkeypatch.setitem(test_app.config, "MAX_CONTENT_LENGTH", 100)
+    body = HEADER + "123,paper,Bulk Import Test,2025-04-14,IEEE,Finalist,,\n" * 20
+    body += "nobody,paper,Bulk Import Test,2025-04-14,IEEE,Finalist,,\n"
+
+    res = auth_teacher_client.post("/import-achievements", content_type="multipart/form-data", data={
+        "csv_file": (io.BytesIO(b"\xef\xbb\xbf" + body.encode()), "results.csv"),
+    })
+
+    assert res.status_code == 200
+    assert b"Imported 20 of 21 rows" in res.data
+    assert b"nobody" in res.data
+
+    monkeypatch.setitem(test_app.config, "IMPORT_MAX_CONTENT_LENGTH", 100)
+    res = auth_teacher_client.post("/import-achievements", content_type="multipart/form-data", data={
+        "csv_file": (io.BytesIO(body.encode()), "results.csv"),
+    })
+    assert res.status_code == 413
+
+
+def test_import_route_requires_teacher(client):
+    with client.session_transaction() as sess:
+        sess.clear()
+    assert client.get("/import-achievements").status_code == 302
+
+
+ROSTER_HEADER = "student_id,student_name,email,password,student_dept\n"
+
+
+def _import_students(conn, text, **kwargs):
+    return importer.import_students(conn, io.StringIO(text), method="pbkdf2:sha256:1000", processes=1, **kwargs)
+
+
+def test_roster_rejects_duplicates_before_hashing(conn, monkeypatch):
+    hashed = []
+    real_hash = passwords.hash_password
+    monkeypatch.setattr(passwords, "hash_password", lambda p, m: hashed.append(p) or real_hash(p, m))
+
+    result = _import_students(conn, ROSTER_HEADER + "\n".join([
+        "S100,New One,new1@test.com,pw1,CSE",
+        "S100,Same Id,other@test.com,pw2,CSE",
+        "S101,Same Email,new1@test.com,pw3,CSE",
+        "S001,Existing Id,fresh@test.com,pw4,CSE",
+        "S102,Existing Email,s2@test.com,pw5,CSE",
+        "S103,Bad Email,not-an-email,pw6,CSE",
+        "S104,No Password,new4@test.com,,CSE",
+        "S105,New Two,new5@test.com,pw8,",
+    ]) + "\n")
+
+    assert (result["rows"], result["imported"], result["rejected"]) == (8, 2, 6)
+    lines = dict(result["errors"])
+    assert "earlier in the file" in lines[3] and "earlier in the file" in lines[4]
+    assert "already registered" in lines[5] and "already registered" in lines[6]
+    assert "email" in lines[7]
+    assert "password" in lines[8]
+    assert hashed == ["pw1", "pw8"]
+
+    rows = dict(conn.execute(
+        "SELECT student_id, password FROM student WHERE student_id IN ('S100', 'S105')"
+    ).fetchall())
+    assert passwords.verify(rows["S100"], "pw1")
+    assert passwords.verify(rows["S105"], "pw8")
+    assert rows["S100"] != "pw1"
+
+
+def test_roster_checks_ids_and_emails_once_per_chunk(conn):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    rows = [f"N{n:03d},Student {n},n{n}@test.com,pw{n}," for n in range(10)]
+
+    result = _import_students(conn, ROSTER_HEADER + "\n".join(rows) + "\n", chunk_rows=4)
+
+    assert result["imported"] == 10
+    assert sum("json_each" in s for s in statements) == 6
+    assert statements.count("COMMIT") == 3
+
+
+def test_import_students_route_then_login(auth_teacher_client, client, test_app, monkeypatch):
+    monkeypatch.setitem(test_app.config, "PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+    student_id = f"R{uuid.uuid4().hex[:8]}"
+    body = ROSTER_HEADER + f"{student_id},Roster Student,{student_id}@test.com,hunter2,CSE\n"
+
+    res = auth_teacher_client.post("/import-students", content_type="multipart/form-data", data={
+        "csv_file": (io.BytesIO(body.encode()), "roster.csv"),
+    })
+    assert b"Imported 1 of 1 rows" in res.data
+
+    with client.session_transaction() as sess:
+        sess.clear()
+    res = client.post("/student", data={"sname": student_id, "password": "hunter2"})
+    assert res.status_code == 302
+    assert "/student-dashboard" in res.headers["Location"]
+    res = client.post("/student", data={"sname": student_id, "password": "wrong"})
+    assert b"Invalid credentials" in res.data
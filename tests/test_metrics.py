@@ -0,0 +1,103 @@
+# tests/test_metrics.py
+import re
+import threading
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    metrics.registry.reset()
+    yield
+    metrics.registry.reset()
+
+
+def _sample(text, pattern):
+    match = re.search(rf"^{pattern} (\S+)$", text, re.MULTILINE)
+    assert match, f"{pattern} not found in:\n{text}"
+    return float(match.group(1))
+
+
+def test_metrics_endpoint_reports_requests_and_sql(auth_teacher_client, test_app, monkeypatch):
+    monkeypatch.setitem(test_app.config, "DASHBOARD_CACHE", "")
+    # Open the test database's pooled connection first: its PRAGMAs would count too
+    auth_teacher_client.get("/teacher-dashboard").close()
+    metrics.registry.reset()
+
+    auth_teacher_client.get("/teacher-dashboard").close()
+    auth_teacher_client.get("/teacher-dashboard").close()
+
+    res = auth_teacher_client.get("/metrics")
+    text = res.get_data(as_text=True)
+
+    assert res.status_code == 200
+    assert res.headers["Content-Type"].startswith("text/plain")
+    labels = r'\{endpoint="/teacher-dashboard",method="GET"'
+    assert _sample(text, r"ams_requests_total" + labels + r',status="200"\}') == 2
+    assert _sample(text, r"ams_request_duration_seconds_count" + labels + r"\}") == 2
+    # Stats lookup + recent entries per request
+    assert _sample(text, r'ams_sql_statements_total\{endpoint="/teacher-dashboard"\}') == 4
+    assert "ams_db_pool_opens_total" in text
+
+
+def test_streamed_response_recorded_after_body(auth_teacher_client):
+    res = auth_teacher_client.get("/export-csv")
+    res.get_data()
+    res.close()
+
+    text = metrics.render()
+    assert _sample(text, r'ams_requests_total\{endpoint="/export-csv",method="GET",status="200"\}') == 1
+
+
+def test_unmatched_routes_share_one_label(client):
+    client.get("/no-such-page-1").close()
+    client.get("/no-such-page-2").close()
+
+    text = metrics.render()
+    assert _sample(text, r'ams_requests_total\{endpoint="unmatched",method="GET",status="404"\}') == 2
+
+
+def test_shards_merge_across_threads():
+    def work():
+        for _ in range(1000):
+            metrics.registry.inc("ams_upload_bytes_total", (("endpoint", "/x"),), 2)
+            metrics.registry.observe("ams_request_sql_seconds", (("endpoint", "/x"),), 0.003)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    text = metrics.render()
+    assert _sample(text, r'ams_upload_bytes_total\{endpoint="/x"\}') == 8000
+    assert _sample(text, r'ams_request_sql_seconds_bucket\{endpoint="/x",le="0.0025"\}') == 0
+    assert _sample(text, r'ams_request_sql_seconds_bucket\{endpoint="/x",le="0.005"\}') == 4000
+    assert _sample(text, r'ams_request_sql_seconds_count\{endpoint="/x"\}') == 4000
+
+
+def test_exited_threads_leave_no_shards():
+    registry = metrics.ShardedMetrics()
+
+    def work():
+        registry.inc("ams_upload_bytes_total", (("endpoint", "/x"),), 1)
+        registry.observe("ams_request_sql_seconds", (("endpoint", "/x"),), 0.003)
+
+    for _ in range(50):
+        threads = [threading.Thread(target=work) for _ in range(100)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert registry.shard_count() == 0
+    counters, histograms = registry.snapshot()
+    assert counters[("ams_upload_bytes_total", (("endpoint", "/x"),))] == 5000
+    assert histograms[("ams_request_sql_seconds", (("endpoint", "/x"),))][-1] == pytest.approx(15.0)
+
+    # The recording thread's own shard is still live and counted
+    registry.inc("ams_upload_bytes_total", (("endpoint", "/x"),), 1)
+    assert registry.shard_count() == 1
+    assert registry.snapshot()[0][("ams_upload_bytes_total", (("endpoint", "/x"),))] == 5001
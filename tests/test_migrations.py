@@ -0,0 +1,58 @@
+import sqlite3
+
+import migrations
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_migrate_fresh_database(tmp_path):
+    db_path = str(tmp_path / "fresh.db")
+
+    applied = migrations.migrate(db_path, log=None)
+
+    assert applied == [version for version, _, _ in migrations.MIGRATIONS]
+    conn = sqlite3.connect(db_path)
+    assert migrations.get_version(conn) == migrations.LATEST_VERSION
+    assert {"teacher_id", "created_at"} <= _columns(conn, "achievements")
+    conn.close()
+
+
+def test_migrate_is_idempotent(tmp_path):
+    db_path = str(tmp_path / "twice.db")
+    migrations.migrate(db_path, log=None)
+
+    assert migrations.migrate(db_path, log=None) == []
+
+
+def test_migrate_upgrades_legacy_achievements(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE achievements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id TEXT NOT NULL,
+            achievement_type TEXT NOT NULL,
+            event_name TEXT NOT NULL,
+            achievement_date DATE NOT NULL,
+            organizer TEXT NOT NULL,
+            position TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO achievements (student_id, achievement_type, event_name,
+                                  achievement_date, organizer, position)
+        VALUES ('S001', 'hackathon', 'Hit the Bug', '2025-04-12', 'CSE', '1')
+    """)
+    conn.commit()
+    conn.close()
+
+    migrations.migrate(db_path, log=None)
+
+    conn = sqlite3.connect(db_path)
+    teacher_id, created_at = conn.execute("SELECT teacher_id, created_at FROM achievements").fetchone()
+    assert teacher_id == "unknown"
+    assert created_at is not None
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'student'").fetchone()
+    conn.close()
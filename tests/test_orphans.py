@@ -0,0 +1,134 @@
+# tests/test_orphans.py
+import io
+import os
+import sqlite3
+import time
+
+import pytest
+
+import migrations
+import orphans
+import storage
+
+DAY = 24 * 3600
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = str(tmp_path / "gc.db")
+    migrations.migrate(db_path, log=None)
+    connection = sqlite3.connect(db_path)
+    connection.execute("INSERT INTO student VALUES ('S', 'S1', 's@x', NULL, 'p', 'M', 'CSE')")
+    connection.execute("INSERT INTO teacher VALUES ('T', 'T1', 't@x', NULL, 'p', 'F', 'CSE')")
+    connection.commit()
+    yield connection
+    connection.close()
+
+
+def _add_achievement(conn, certificate_path):
+    with conn:
+        conn.execute("""
+            INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                      achievement_date, organizer, position, certificate_path)
+            VALUES ('T1', 'S1', 'coding', 'E', '2025-04-13', 'O', 'P', ?)
+        """, (certificate_path,))
+
+
+def _store(conn, folder, content, name="c.pdf"):
+    blob = storage.save_upload(io.BytesIO(content), str(folder), name, shard_depth=2)
+    with conn:
+        storage.register(conn.cursor(), blob)
+    return blob
+
+
+def _age(path, seconds):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def test_iter_store_matches_sqlite_order(tmp_path, conn):
+    for name in ("ab.png", "ab/x.png", "ab-c.png", "ab/cd/y.png", "B.png", ".upload-tmp"):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+    (tmp_path / orphans.QUARANTINE_DIR).mkdir()
+    (tmp_path / orphans.QUARANTINE_DIR / "old.png").write_bytes(b"x")
+
+    paths = [path for path, _ in orphans.iter_store(str(tmp_path))]
+
+    conn.execute("CREATE TEMP TABLE p (path TEXT)")
+    conn.executemany("INSERT INTO p VALUES (?)", [(path,) for path in paths])
+    assert paths == [row[0] for row in conn.execute("SELECT path FROM p ORDER BY path")]
+    assert "uploads/.quarantine/old.png" not in paths
+
+
+def test_referenced_paths_stream_from_index(conn):
+    plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {orphans.REFERENCED_PATHS}"))
+    assert "idx_achievements_certificate_path" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_collect_quarantines_then_deletes_orphans(conn, tmp_path):
+    folder = tmp_path / "uploads"
+    kept = _store(conn, folder, b"%PDF- kept")
+    _add_achievement(conn, kept.path)
+    orphan = _store(conn, folder, b"%PDF- orphan" * 100)
+    young = _store(conn, folder, b"%PDF- just uploaded")
+    legacy = folder / "20250413181012_old.pdf"
+    legacy.write_bytes(b"%PDF- legacy")
+    orphan_file = storage.local_path(str(folder), orphan.path)
+    thumb = orphan_file[:-len(".pdf")] + ".thumb.webp"
+    with open(thumb, "wb") as f:
+        f.write(b"webp")
+    for path in (orphan_file, thumb, str(legacy), storage.local_path(str(folder), kept.path)):
+        _age(path, 2 * DAY)
+
+    preview = orphans.collect_orphans(conn, str(folder), dry_run=True)
+    assert preview["quarantined"] == 2 and preview["scanned_orphans"] == 3
+    assert os.path.exists(orphan_file)
+
+    first = orphans.collect_orphans(conn, str(folder))
+    assert first["quarantined"] == 2
+    assert first["quarantined_bytes"] == orphan.size + len(b"%PDF- legacy")
+    assert first["deleted"] == 0
+    assert not os.path.exists(orphan_file) and not os.path.exists(thumb) and not legacy.exists()
+    assert os.path.exists(storage.local_path(str(folder), kept.path))
+    assert os.path.exists(storage.local_path(str(folder), young.path))
+
+    second = orphans.collect_orphans(conn, str(folder), now=time.time() + 8 * DAY)
+    assert second["deleted"] == 2
+    assert second["reclaimed_bytes"] == orphan.size + len(b"%PDF- legacy") + len(b"webp")
+    assert conn.execute("SELECT COUNT(*) FROM certificates WHERE path = ?", (orphan.path,)).fetchone()[0] == 0
+    # A week on, the once-young orphan is past its grace period too
+    assert second["quarantined"] == 1
+    remaining = [path for path, _ in orphans.iter_store(str(folder / orphans.QUARANTINE_DIR))]
+    assert remaining == [young.path]
+
+
+def test_referenced_again_is_restored(conn, tmp_path):
+    folder = tmp_path / "uploads"
+    blob = _store(conn, folder, b"%PDF- comes back")
+    _age(storage.local_path(str(folder), blob.path), 2 * DAY)
+    assert orphans.collect_orphans(conn, str(folder))["quarantined"] == 1
+
+    _add_achievement(conn, blob.path)
+    result = orphans.collect_orphans(conn, str(folder), now=time.time() + 30 * DAY)
+
+    assert result["restored"] == 1 and result["deleted"] == 0
+    assert os.path.exists(storage.local_path(str(folder), blob.path))
+
+
+def test_rejected_submission_leaves_no_file(auth_teacher_client, test_app, tmp_path, monkeypatch):
+    monkeypatch.setitem(test_app.config, "UPLOAD_FOLDER", str(tmp_path))
+    res = auth_teacher_client.post("/submit_achievements", content_type="multipart/form-data", data={
+        "student_id": "NO-SUCH-STUDENT",
+        "achievement_type": "coding",
+        "event_name": "E",
+        "achievement_date": "2025-04-13",
+        "organizer": "O",
+        "position": "P",
+        "certificate": (io.BytesIO(b"%PDF- never stored"), "c.pdf"),
+    })
+
+    assert b"Student ID does not exist" in res.data
+    assert list(tmp_path.iterdir()) == []
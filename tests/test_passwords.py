@@ -0,0 +1,131 @@
+# tests/test_passwords.py
+import sqlite3
+import uuid
+
+import db
+import migrations
+import passwords
+
+FAST = "pbkdf2:sha256:1000"
+
+
+def test_verify_hashes_and_legacy_plaintext():
+    stored = passwords.hash_password("s3cret", FAST)
+
+    assert passwords.is_hashed(stored)
+    assert passwords.verify(stored, "s3cret")
+    assert not passwords.verify(stored, "wrong")
+    # Rows written before hashing still log in until they are migrated
+    assert not passwords.is_hashed("s3cret")
+    assert passwords.verify("s3cret", "s3cret")
+    assert not passwords.verify("s3cret", "S3cret")
+    assert not passwords.verify(None, "s3cret")
+    assert not passwords.verify("", "")
+
+
+def test_hash_pool_matches_in_process_hashing(monkeypatch):
+    monkeypatch.setattr(passwords, "POOL_THRESHOLD", 4)
+    plain = [f"password-{n}" for n in range(10)]
+
+    with passwords.HashPool(FAST, processes=2) as pool:
+        hashes = pool.hash_many(plain)
+        assert pool._executor is not None
+        small = pool.hash_many(plain[:2])
+
+    assert len(hashes) == 10
+    assert len(set(hashes)) == 10  # salted
+    assert all(passwords.verify(h, p) for h, p in zip(hashes, plain))
+    assert all(passwords.verify(h, p) for h, p in zip(small, plain))
+    assert pool._executor is None
+
+
+def test_needs_rehash_when_parameters_change():
+    stored = passwords.hash_password("pw", FAST)
+
+    assert not passwords.needs_rehash(stored, FAST)
+    assert passwords.needs_rehash(stored, "pbkdf2:sha256:2000")
+    assert passwords.needs_rehash("pw", FAST)
+    assert passwords.method_prefix("pbkdf2:sha256:1000") == FAST
+
+
+def test_migrate_plaintext(tmp_path):
+    db_path = str(tmp_path / "accounts.db")
+    migrations.migrate(db_path, log=None)
+    conn = sqlite3.connect(db_path)
+    already = passwords.hash_password("kept", FAST)
+    conn.executemany(
+        "INSERT INTO student (student_name, student_id, email, password) VALUES ('n', ?, ?, ?)",
+        [(f"S{n}", f"s{n}@test.com", f"plain-{n}") for n in range(5)] + [("S9", "s9@test.com", already)],
+    )
+    conn.execute("INSERT INTO teacher (teacher_name, teacher_id, email, password) VALUES ('t', 'T1', 't@x', 'tp')")
+    conn.commit()
+
+    assert passwords.migrate_plaintext(conn, FAST, processes=1, chunk_rows=2) == {"student": 5, "teacher": 1}
+
+    stored = dict(conn.execute("SELECT student_id, password FROM student"))
+    assert all(passwords.verify(stored[f"S{n}"], f"plain-{n}") for n in range(5))
+    assert stored["S9"] == already
+    assert passwords.verify(conn.execute("SELECT password FROM teacher").fetchone()[0], "tp")
+    assert passwords.migrate_plaintext(conn, FAST, processes=1) == {"student": 0, "teacher": 0}
+    conn.close()
+
+
+def _add_student(db_path, password):
+    student_id = f"P{uuid.uuid4().hex[:8]}"
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO student (student_name, student_id, email, password) VALUES ('Legacy', ?, ?, ?)",
+        (student_id, f"{student_id}@test.com", password),
+    )
+    conn.commit()
+    conn.close()
+    return student_id
+
+
+def _stored_password(db_path, student_id):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT password FROM student WHERE student_id = ?", (student_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_login_rehashes_plaintext_and_outdated_hashes(client, test_app, monkeypatch):
+    monkeypatch.setitem(test_app.config, "PASSWORD_HASH_METHOD", FAST)
+    db_path = test_app.config["DB_PATH"]
+
+    legacy = _add_student(db_path, "letmein")
+    assert client.post("/student", data={"sname": legacy, "password": "letmein"}).status_code == 302
+    stored = _stored_password(db_path, legacy)
+    assert stored.startswith(FAST + "$") and passwords.verify(stored, "letmein")
+
+    outdated = _add_student(db_path, passwords.hash_password("letmein", "pbkdf2:sha256:2000"))
+    client.post("/student", data={"sname": outdated, "password": "letmein"})
+    assert _stored_password(db_path, outdated).startswith(FAST + "$")
+
+    # A failed login leaves the stored value alone
+    before = _stored_password(db_path, legacy)
+    res = client.post("/student", data={"sname": legacy, "password": "wrong"})
+    assert b"Invalid credentials" in res.data
+    assert _stored_password(db_path, legacy) == before
+
+
+def test_unknown_account_is_rejected(client):
+    res = client.post("/teacher", data={"tname": "T-NOBODY", "password": "password"})
+    assert b"Invalid credentials" in res.data
+
+
+def test_teacher_login_verifies_hash(client, test_app, monkeypatch):
+    monkeypatch.setitem(test_app.config, "PASSWORD_HASH_METHOD", FAST)
+    teacher_id = f"T{uuid.uuid4().hex[:8]}"
+    conn = db.open_connection(test_app.config["DB_PATH"])
+    conn.execute(
+        "INSERT INTO teacher (teacher_name, teacher_id, email, password) VALUES ('Hashed', ?, ?, ?)",
+        (teacher_id, f"{teacher_id}@test.com", passwords.hash_password("password", FAST)),
+    )
+    conn.commit()
+    conn.close()
+
+    assert client.post("/teacher", data={"tname": teacher_id, "password": "password"}).status_code == 302
+    res = client.post("/teacher", data={"tname": teacher_id, "password": "wrong"})
+    assert b"Invalid credentials" in res.data
@@ -0,0 +1,82 @@
+# tests/test_query_plans.py
+import re
+import sqlite3
+
+import pytest
+
+import migrations
+import queries
+
+# Statements each route runs against achievements, with sample parameters
+ROUTE_QUERIES = {
+    "teacher-dashboard stats": (queries.DASHBOARD_STATS, ("2025-01-01", "T001")),
+    "teacher-dashboard recent": (queries.DASHBOARD_RECENT, ("T001",)),
+    "all-achievements": queries.achievements_page("T001"),
+    "all-achievements older page": queries.achievements_page("T001", after=("2025-04-12", 42)),
+    "all-achievements newer page": queries.achievements_page("T001", before=("2025-04-12", 42)),
+    "all-achievements by type": queries.achievements_page(
+        "T001", achievement_type="coding", after=("2025-04-12", 42)
+    ),
+    "all-achievements by date range": queries.achievements_page(
+        "T001", date_from="2025-01-01", date_to="2025-06-30", after=("2025-04-12", 42)
+    ),
+    "all-achievements by type and date": queries.achievements_page(
+        "T001", achievement_type="coding", date_from="2025-01-01", date_to="2025-06-30"
+    ),
+    "all-achievements filtered count": queries.achievements_count(
+        "T001", achievement_type="coding", date_from="2025-01-01", date_to="2025-06-30"
+    ),
+    "export-csv": (queries.EXPORT_CSV, ("T001",)),
+    "listing version": (queries.TEACHER_VERSION, ("T001",)),
+    "certificate": (queries.CERTIFICATE_FOR_ACHIEVEMENT, (42,)),
+    "import-achievements students": (queries.STUDENTS_IN, ('["S001", "S002"]',)),
+    "import-students emails": (queries.EMAILS_IN, ('["a@test.com", "b@test.com"]',)),
+    "student login": (queries.STUDENT_LOGIN, ("S001",)),
+}
+
+# Queries whose ORDER BY must be satisfied by an index, not a sort
+ORDERED = {name for name in ROUTE_QUERIES if name.startswith("all-achievements")}
+ORDERED |= {"teacher-dashboard recent", "export-csv"}
+
+# "SCAN achievements" or "SCAN a" when the table is aliased; the
+# dashboard summary tables and student must be searched by primary key as well
+ACHIEVEMENTS_SCAN = re.compile(
+    r"^SCAN (achievements|a|teacher_stats|ts|teacher_daily_stats|d|certificates|c|student|s)\b"
+)
+
+
+@pytest.fixture(scope="module")
+def plan_db(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp("plans") / "plans.db")
+    migrations.migrate(db_path, log=None)
+    conn = sqlite3.connect(db_path)
+    yield conn
+    conn.close()
+
+
+def _plan(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+@pytest.mark.parametrize("name", sorted(ROUTE_QUERIES))
+def test_route_query_uses_index(plan_db, name):
+    sql, params = ROUTE_QUERIES[name]
+    plan = _plan(plan_db, sql, params)
+
+    scans = [step for step in plan if ACHIEVEMENTS_SCAN.match(step)]
+    assert not scans, f"{name} falls back to a full scan: {plan}"
+
+
+@pytest.mark.parametrize("name", sorted(ORDERED))
+def test_route_query_order_comes_from_index(plan_db, name):
+    sql, params = ROUTE_QUERIES[name]
+    plan = _plan(plan_db, sql, params)
+
+    assert not any("TEMP B-TREE" in step for step in plan), f"{name} sorts in memory: {plan}"
+
+
+def test_listing_version_never_reads_the_table(plan_db):
+    sql, params = ROUTE_QUERIES["listing version"]
+    # achievements from its covering index; the cache version is one primary-key lookup
+    assert all("COVERING INDEX" in step or step.startswith("SEARCH teacher_data_version USING PRIMARY KEY")
+               or step.startswith("SCALAR SUBQUERY") for step in _plan(plan_db, sql, params))
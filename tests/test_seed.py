@@ -0,0 +1,107 @@
+# tests/test_seed.py
+import datetime
+import os
+import random
+import sqlite3
+
+import pytest
+
+import cache
+import migrations
+import seed
+import stats
+import storage
+import thumbnails
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = str(tmp_path / "seed.db")
+    migrations.migrate(db_path, log=None)
+    connection = sqlite3.connect(db_path)
+    yield connection
+    connection.close()
+
+
+def _dump(conn):
+    return conn.execute("SELECT * FROM achievements ORDER BY id").fetchall()
+
+
+def test_seed_counts_and_types(conn):
+    counts = seed.seed_database(conn, students=20, teachers=3, achievements=700,
+                                end_date=datetime.date(2025, 4, 13), batch_size=64)
+
+    assert counts == {"students": 20, "teachers": 3, "achievements": 700}
+    types = {row[0] for row in conn.execute("SELECT DISTINCT achievement_type FROM achievements")}
+    assert types == set(seed.ACHIEVEMENT_TYPES)
+    assert conn.execute(
+        "SELECT COUNT(*) FROM achievements WHERE achievement_type = 'hackathon' AND team_size IS NULL"
+    ).fetchone()[0] == 0
+    assert conn.execute(
+        "SELECT COUNT(*) FROM achievements WHERE achievement_type = 'coding' AND paper_title IS NOT NULL"
+    ).fetchone()[0] == 0
+
+
+def test_seed_is_reproducible(tmp_path):
+    dumps = []
+    for name in ("a.db", "b.db"):
+        db_path = str(tmp_path / name)
+        migrations.migrate(db_path, log=None)
+        connection = sqlite3.connect(db_path)
+        seed.seed_database(connection, students=10, teachers=2, achievements=200, seed=7,
+                           end_date=datetime.date(2025, 4, 13))
+        dumps.append(_dump(connection))
+        connection.close()
+
+    assert dumps[0] == dumps[1]
+
+
+def test_seed_restores_indexes_triggers_and_stats(conn):
+    schema = "SELECT type, name FROM sqlite_master WHERE tbl_name = 'achievements' ORDER BY name"
+    before = conn.execute(schema).fetchall()
+
+    seed.seed_database(conn, students=10, teachers=2, achievements=300)
+
+    assert conn.execute(schema).fetchall() == before
+    assert stats.check_teacher_stats(conn) == []
+
+
+def test_seed_moves_teacher_versions(conn):
+    seed.seed_database(conn, students=5, teachers=1, achievements=50)
+    before = cache.teacher_version(conn, "SEED-T00001")
+
+    # Same accounts again, so only achievements are added, with their triggers dropped
+    seed.seed_database(conn, students=5, teachers=1, achievements=50)
+    assert cache.teacher_version(conn, "SEED-T00001") > before
+
+
+def test_seed_certificates(conn, tmp_path):
+    upload_folder = tmp_path / "uploads"
+    blobs = seed.write_placeholder_certificates(str(upload_folder), 4, random.Random(0))
+    with conn:
+        for blob in blobs:
+            storage.register(conn.cursor(), blob)
+    paths = [blob.path for blob in blobs]
+    seed.seed_database(conn, students=5, teachers=1, achievements=100, certificate_paths=paths)
+
+    assert len(list(upload_folder.iterdir())) == 4
+    used = {row[0] for row in conn.execute(
+        "SELECT DISTINCT certificate_path FROM achievements WHERE certificate_path IS NOT NULL"
+    )}
+    assert used and used <= set(paths)
+    refcounts = conn.execute("SELECT SUM(refcount) FROM certificates").fetchone()[0]
+    assert refcounts == conn.execute(
+        "SELECT COUNT(*) FROM achievements WHERE certificate_path IS NOT NULL"
+    ).fetchone()[0]
+
+
+def test_placeholder_certificates_render(tmp_path):
+    pytest.importorskip("fitz")
+    if not thumbnails.load_imaging():
+        pytest.skip("thumbnails imported without Pillow")
+    blobs = seed.write_placeholder_certificates(str(tmp_path), 6, random.Random(0))
+    assert {blob.path.rsplit(".", 1)[1] for blob in blobs} == {"png", "pdf"}
+
+    for blob in blobs:
+        thumbnails.render_variants(str(tmp_path), blob.path)
+        assert os.path.exists(storage.local_path(str(tmp_path), thumbnails.variant_path(blob.path, "thumb")))
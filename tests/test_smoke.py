@@ -1,3 +1,21 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
 def test_home_page_loads(client):
     res = client.get("/")
     assert res.status_code == 200
+
+
+def test_create_app_leaves_cli_only_modules_unloaded():
+    # A fresh interpreter: this one has imported everything already
+    probe = (
+        "import sys, app; app.create_app(); "
+        "print(' '.join(m for m in ('multiprocessing', 'concurrent.futures.process', 'seed', "
+        "'importer', 'orphans', 'passwords') if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, check=True, capture_output=True, text=True)
+    assert output.stdout.split() == []
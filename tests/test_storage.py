@@ -0,0 +1,298 @@
+# tests/test_storage.py
+import hashlib
+import io
+import sqlite3
+
+import pytest
+from werkzeug.exceptions import UnsupportedMediaType
+
+import db
+import migrations
+import storage
+import thumbnails
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = str(tmp_path / "storage.db")
+    migrations.migrate(db_path, log=None)
+    connection = sqlite3.connect(db_path)
+    connection.execute("INSERT INTO student VALUES ('S', 'S1', 's@x', NULL, 'p', 'M', 'CSE')")
+    connection.execute("INSERT INTO teacher VALUES ('T', 'T1', 't@x', NULL, 'p', 'F', 'CSE')")
+    connection.commit()
+    yield connection
+    connection.close()
+
+
+def _add_achievement(conn, certificate_path):
+    conn.execute("""
+        INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                                  achievement_date, organizer, position, certificate_path)
+        VALUES ('T1', 'S1', 'coding', 'E', '2025-04-13', 'O', 'P', ?)
+    """, (certificate_path,))
+
+
+def _refcount(conn, path):
+    return conn.execute("SELECT refcount FROM certificates WHERE path = ?", (path,)).fetchone()[0]
+
+
+def test_save_upload_names_file_by_hash_and_dedupes(tmp_path):
+    data = b"%PDF-1.4 certificate" * 10000
+    first = storage.save_upload(io.BytesIO(data), str(tmp_path), "Hit the Bug.PDF")
+    second = storage.save_upload(io.BytesIO(data), str(tmp_path), "copy.pdf")
+
+    sha256 = hashlib.sha256(data).hexdigest()
+    assert first.sha256 == second.sha256 == sha256
+    assert first.path == second.path == f"uploads/{sha256}.pdf"
+    assert first.size == len(data)
+    assert [p.name for p in tmp_path.iterdir()] == [f"{sha256}.pdf"]
+
+
+def test_refcount_follows_achievements(conn, tmp_path):
+    blob = storage.save_upload(io.BytesIO(b"png bytes"), str(tmp_path), "a.png")
+    with conn:
+        storage.register(conn.cursor(), blob)
+        storage.register(conn.cursor(), blob)
+        _add_achievement(conn, blob.path)
+        _add_achievement(conn, blob.path)
+        _add_achievement(conn, "uploads/legacy.png")
+    assert _refcount(conn, blob.path) == 2
+
+    with conn:
+        conn.execute("UPDATE achievements SET certificate_path = NULL WHERE id = 1")
+        conn.execute("DELETE FROM achievements WHERE id = 3")
+    assert _refcount(conn, blob.path) == 1
+
+    conn.execute("UPDATE certificates SET refcount = 99")
+    storage.rebuild_refcounts(conn.cursor())
+    assert _refcount(conn, blob.path) == 1
+
+
+def test_dedupe_uploads_collapses_legacy_files(conn, tmp_path):
+    folder = tmp_path / "uploads"
+    folder.mkdir()
+    same = b"\xff\xd8\xff same certificate"
+    (folder / "20250413092129_Hit_the_Bug.jpeg").write_bytes(same)
+    (folder / "20250413092710_Hit_the_Bug.jpeg").write_bytes(same)
+    (folder / "20250413181012_Cicada.pdf").write_bytes(b"%PDF-1.4 other")
+    with conn:
+        _add_achievement(conn, "uploads/20250413092129_Hit_the_Bug.jpeg")
+        _add_achievement(conn, "uploads/20250413092710_Hit_the_Bug.jpeg")
+        _add_achievement(conn, "uploads/20250413181012_Cicada.pdf")
+
+    preview = storage.dedupe_uploads(conn, str(folder), dry_run=True)
+    assert len(list(folder.iterdir())) == 3
+    assert preview["duplicates"] == 1
+
+    result = storage.dedupe_uploads(conn, str(folder))
+
+    assert result == {"files": 3, "blobs": 2, "duplicates": 1,
+                      "bytes_reclaimed": len(same), "rows_updated": 3}
+    sha256 = hashlib.sha256(same).hexdigest()
+    assert sorted(p.name for p in folder.iterdir()) == sorted(
+        [f"{sha256}.jpeg", f"{hashlib.sha256(b'%PDF-1.4 other').hexdigest()}.pdf"]
+    )
+    assert _refcount(conn, f"uploads/{sha256}.jpeg") == 2
+    assert conn.execute(
+        "SELECT original_filename FROM certificates WHERE sha256 = ?", (sha256,)
+    ).fetchone()[0] == "Hit_the_Bug.jpeg"
+    for (path,) in conn.execute("SELECT certificate_path FROM achievements"):
+        assert (tmp_path / path).exists()
+
+    # Already migrated: a second run is a no-op
+    assert storage.dedupe_uploads(conn, str(folder))["files"] == 0
+
+
+def test_dedupe_uploads_reuses_registered_blob(conn, tmp_path):
+    folder = tmp_path / "uploads"
+    same = b"\xff\xd8\xff already registered"
+    blob = storage.save_upload(io.BytesIO(same), str(folder), "new.jpg")
+    (folder / "20250413092129_Old.jpeg").write_bytes(same)
+    with conn:
+        storage.register(conn.cursor(), blob)
+        _add_achievement(conn, blob.path)
+        _add_achievement(conn, "uploads/20250413092129_Old.jpeg")
+
+    result = storage.dedupe_uploads(conn, str(folder))
+
+    assert result["duplicates"] == 1
+    assert [p.name for p in folder.iterdir()] == [f"{blob.sha256}.jpg"]
+    assert conn.execute("SELECT DISTINCT certificate_path FROM achievements").fetchall() == [(blob.path,)]
+    assert _refcount(conn, blob.path) == 2
+
+
+FORM = {
+    "student_id": "123",
+    "achievement_type": "coding",
+    "event_name": "Storage Test",
+    "achievement_date": "2025-04-13",
+    "organizer": "Test",
+    "position": "First Place",
+}
+
+
+def test_submit_stores_certificate_once(auth_teacher_client, test_app, tmp_path, monkeypatch):
+    monkeypatch.setitem(test_app.config, "UPLOAD_FOLDER", str(tmp_path))
+    form = FORM
+    # Unique per test, in case --db-scope session shares one database between tests
+    content = b"\x89PNG\r\n\x1a\n" + str(tmp_path).encode()
+    for _ in range(2):
+        data = dict(form, certificate=(io.BytesIO(content), "cert.png"))
+        res = auth_teacher_client.post("/submit_achievements", data=data,
+                                       content_type="multipart/form-data")
+        assert b"successfully registered" in res.data
+    thumbnails.worker.shutdown(wait=True)
+
+    files = [p for p in tmp_path.rglob("*") if p.is_file()]
+    assert len(files) == 1
+    path = "uploads/" + files[0].relative_to(tmp_path).as_posix()
+    assert path.count("/") == 1 + test_app.config["UPLOAD_SHARD_DEPTH"]
+    conn = db.open_connection(test_app.config["DB_PATH"])
+    try:
+        assert _refcount(conn, path) == 2
+    finally:
+        conn.close()
+
+
+def test_submit_reuses_certificate_uploaded_under_another_extension(auth_teacher_client, test_app, tmp_path, monkeypatch):
+    monkeypatch.setitem(test_app.config, "UPLOAD_FOLDER", str(tmp_path))
+    content = b"\xff\xd8\xff\xe0" + str(tmp_path).encode()
+    for name in ("cert.jpg", "cert.jpeg"):
+        data = dict(FORM, certificate=(io.BytesIO(content), name))
+        res = auth_teacher_client.post("/submit_achievements", data=data,
+                                       content_type="multipart/form-data")
+        assert b"successfully registered" in res.data
+    thumbnails.worker.shutdown(wait=True)
+
+    files = [p for p in tmp_path.rglob("*") if p.is_file()]
+    assert [p.suffix for p in files] == [".jpg"]
+    conn = db.open_connection(test_app.config["DB_PATH"])
+    try:
+        path = "uploads/" + files[0].relative_to(tmp_path).as_posix()
+        assert conn.execute("SELECT path FROM certificates WHERE sha256 = ?",
+                            (hashlib.sha256(content).hexdigest(),)).fetchone() == (path,)
+        assert _refcount(conn, path) == 2
+    finally:
+        conn.close()
+
+
+def test_submit_after_shard_depth_change_reuses_certificate(auth_teacher_client, test_app, tmp_path, monkeypatch):
+    monkeypatch.setitem(test_app.config, "UPLOAD_FOLDER", str(tmp_path))
+    content = b"\x89PNG\r\n\x1a\n" + str(tmp_path).encode()
+    for depth in (0, 2):
+        monkeypatch.setitem(test_app.config, "UPLOAD_SHARD_DEPTH", depth)
+        data = dict(FORM, certificate=(io.BytesIO(content), "cert.png"))
+        res = auth_teacher_client.post("/submit_achievements", data=data,
+                                       content_type="multipart/form-data")
+        assert b"successfully registered" in res.data
+    thumbnails.worker.shutdown(wait=True)
+
+    sha256 = hashlib.sha256(content).hexdigest()
+    assert [p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*") if p.is_file()] == [f"{sha256}.png"]
+    conn = db.open_connection(test_app.config["DB_PATH"])
+    try:
+        assert _refcount(conn, f"uploads/{sha256}.png") == 2
+    finally:
+        conn.close()
+
+
+def test_save_upload_keeps_registered_path(conn, tmp_path):
+    folder = tmp_path / "uploads"
+    blob = storage.save_upload(io.BytesIO(b"pdf bytes"), str(folder), "a.pdf")
+    with conn:
+        storage.register(conn.cursor(), blob)
+    again = storage.save_upload(io.BytesIO(b"pdf bytes"), str(folder), "a.pdf", shard_depth=2, cursor=conn.cursor())
+    assert again.path == blob.path
+    assert [p.name for p in folder.rglob("*") if p.is_file()] == [f"{blob.sha256}.pdf"]
+
+
+def test_register_returns_the_registered_path(conn, tmp_path):
+    first = storage.save_upload(io.BytesIO(b"same bytes"), str(tmp_path), "a.jpg")
+    second = storage.save_upload(io.BytesIO(b"same bytes"), str(tmp_path), "a.jpeg")
+    with conn:
+        assert storage.register(conn.cursor(), first) == first
+        assert storage.register(conn.cursor(), second) == second._replace(path=first.path)
+
+
+def test_shard_path():
+    blob = "ab" + "cd" + "e" * 60 + ".png"
+    assert storage.shard_path(blob, 0) == blob
+    assert storage.shard_path(blob, 2) == f"ab/cd/{blob}"
+    # Non-blob names fan out on the hash of the name, still deterministically
+    assert storage.shard_path("legacy.png", 1) == storage.shard_path("legacy.png", 1)
+    assert storage.shard_path("legacy.png", 1).endswith("/legacy.png")
+
+
+def test_reshard_uploads_moves_files_and_rows(conn, tmp_path):
+    folder = tmp_path / "uploads"
+    blobs = [storage.save_upload(io.BytesIO(b"cert %d" % n), str(folder), f"c{n}.pdf") for n in range(5)]
+    with conn:
+        for blob in blobs:
+            storage.register(conn.cursor(), blob)
+            _add_achievement(conn, blob.path)
+
+    assert storage.reshard_uploads(conn, str(folder), 2, dry_run=True)["files"] == 5
+    result = storage.reshard_uploads(conn, str(folder), 2, batch_size=2)
+
+    assert result == {"files": 5, "rows_updated": 5}
+    paths = [row[0] for row in conn.execute("SELECT certificate_path FROM achievements")]
+    for blob, path in zip(blobs, paths):
+        assert path == f"uploads/{blob.sha256[:2]}/{blob.sha256[2:4]}/{blob.sha256}.pdf"
+        assert storage.local_path(str(folder), path).endswith(blob.sha256 + ".pdf")
+        assert (tmp_path / path).exists()
+    assert {row[0] for row in conn.execute("SELECT path FROM certificates")} == set(paths)
+    assert _refcount(conn, paths[0]) == 1
+
+    # And back to flat: shard directories are removed once empty
+    assert storage.reshard_uploads(conn, str(folder), 0)["files"] == 5
+    assert sorted(p.name for p in folder.iterdir()) == sorted(f"{b.sha256}.pdf" for b in blobs)
+    assert storage.reshard_uploads(conn, str(folder), 0)["files"] == 0
+
+
+def test_spool_rejects_unknown_extension_before_writing(tmp_path):
+    with pytest.raises(UnsupportedMediaType):
+        storage.HashingSpool(str(tmp_path), "notes.txt", check_type=True)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spool_sniffs_first_bytes(tmp_path):
+    spool = storage.HashingSpool(str(tmp_path), "cert.png", check_type=True)
+    with pytest.raises(UnsupportedMediaType):
+        spool.write(b"%PDF-1.4 pretending to be a png")
+    assert list(tmp_path.iterdir()) == []
+
+    # Signature split across writes, and a file shorter than SNIFF_BYTES
+    spool = storage.HashingSpool(str(tmp_path), "cert.png", check_type=True)
+    spool.write(b"\x89PN")
+    spool.write(b"G\r\n\x1a\n rest")
+    blob = spool.commit(str(tmp_path))
+    assert blob.sha256 == hashlib.sha256(b"\x89PNG\r\n\x1a\n rest").hexdigest()
+
+    spool = storage.HashingSpool(str(tmp_path), "tiny.pdf", check_type=True)
+    spool.write(b"%PD")
+    with pytest.raises(UnsupportedMediaType):
+        spool.commit(str(tmp_path))
+    assert [p.name for p in tmp_path.iterdir()] == [f"{blob.sha256}.png"]
+
+
+def test_submit_rejects_mismatched_content(auth_teacher_client, test_app, tmp_path, monkeypatch):
+    monkeypatch.setitem(test_app.config, "UPLOAD_FOLDER", str(tmp_path))
+    data = dict(FORM, certificate=(io.BytesIO(b"MZ\x90\x00 not an image"), "cert.jpg"))
+
+    res = auth_teacher_client.post("/submit_achievements", data=data, content_type="multipart/form-data")
+
+    assert res.status_code == 415
+    assert b"do not match" in res.data
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_submit_rejects_oversized_upload_before_reading(auth_teacher_client, test_app, tmp_path, monkeypatch):
+    monkeypatch.setitem(test_app.config, "UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setitem(test_app.config, "MAX_CONTENT_LENGTH", 1024)
+    data = dict(FORM, certificate=(io.BytesIO(b"%PDF-" + b"x" * 4096), "big.pdf"))
+
+    res = auth_teacher_client.post("/submit_achievements", data=data, content_type="multipart/form-data")
+
+    assert res.status_code == 413
+    assert b"too large" in res.data
+    assert list(tmp_path.iterdir()) == []
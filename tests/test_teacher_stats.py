@@ -0,0 +1,113 @@
+# tests/test_teacher_stats.py
+import sqlite3
+
+import pytest
+
+import migrations
+import queries
+import stats
+
+INSERT = """
+    INSERT INTO achievements (teacher_id, student_id, achievement_type, event_name,
+                              achievement_date, organizer, position)
+    VALUES (?, ?, 'hackathon', 'Hit the Bug', ?, 'CSE', '1')
+"""
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = str(tmp_path / "stats.db")
+    migrations.migrate(db_path, log=None)
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+    yield connection
+    connection.close()
+
+
+def _dashboard(conn, teacher_id, since="2025-01-01"):
+    row = conn.execute(queries.DASHBOARD_STATS, (since, teacher_id)).fetchone()
+    return tuple(row) if row else (0, 0, 0)
+
+
+def test_insert_updates_counters(conn):
+    conn.execute(INSERT, ("T001", "S001", "2025-04-12"))
+    conn.execute(INSERT, ("T001", "S001", "2025-04-13"))
+    conn.execute(INSERT, ("T001", "S002", "2024-12-01"))
+    conn.execute(INSERT, ("T002", "S001", "2025-04-12"))
+
+    assert _dashboard(conn, "T001") == (3, 2, 2)
+    assert _dashboard(conn, "T002") == (1, 1, 1)
+    assert stats.check_teacher_stats(conn) == []
+
+
+def test_delete_updates_counters(conn):
+    conn.execute(INSERT, ("T001", "S001", "2025-04-12"))
+    conn.execute(INSERT, ("T001", "S002", "2025-04-12"))
+    conn.execute("DELETE FROM achievements WHERE student_id = 'S002'")
+
+    assert _dashboard(conn, "T001") == (1, 1, 1)
+    assert conn.execute("SELECT COUNT(*) FROM teacher_students").fetchone()[0] == 1
+    assert stats.check_teacher_stats(conn) == []
+
+
+def test_update_moves_counters(conn):
+    conn.execute(INSERT, ("T001", "S001", "2025-04-12"))
+    conn.execute(INSERT, ("T001", "S002", "2025-04-12"))
+    conn.execute("""
+        UPDATE achievements SET teacher_id = 'T002', achievement_date = '2024-01-01'
+        WHERE student_id = 'S002'
+    """)
+    conn.execute("UPDATE achievements SET event_name = 'Renamed'")
+
+    assert _dashboard(conn, "T001") == (1, 1, 1)
+    assert _dashboard(conn, "T002") == (1, 1, 0)
+    assert stats.check_teacher_stats(conn) == []
+
+
+def test_rebuild_repairs_drift(conn):
+    conn.execute(INSERT, ("T001", "S001", "2025-04-12"))
+    conn.execute("UPDATE teacher_stats SET total_achievements = 99")
+    conn.execute("DELETE FROM teacher_daily_stats")
+
+    assert len(stats.check_teacher_stats(conn)) == 2
+
+    stats.rebuild_teacher_stats(conn.cursor())
+
+    assert stats.check_teacher_stats(conn) == []
+    assert _dashboard(conn, "T001") == (1, 1, 1)
+
+
+def test_migration_backfills_existing_rows(tmp_path):
+    db_path = str(tmp_path / "backfill.db")
+    connection = sqlite3.connect(db_path)
+    connection.execute(migrations.STUDENT_TABLE)
+    connection.execute(migrations.TEACHER_TABLE)
+    connection.execute(migrations.ACHIEVEMENTS_TABLE)
+    connection.execute(INSERT, ("T001", "S001", "2025-04-12"))
+    connection.commit()
+    connection.close()
+
+    migrations.migrate(db_path, log=None)
+
+    connection = sqlite3.connect(db_path)
+    assert _dashboard(connection, "T001") == (1, 1, 1)
+    connection.close()
+
+
+def test_rows_without_teacher_are_ignored(tmp_path):
+    # Old databases gained a nullable teacher_id column after the fact
+    db_path = str(tmp_path / "legacy.db")
+    connection = sqlite3.connect(db_path)
+    connection.execute(migrations.ACHIEVEMENTS_TABLE.replace("teacher_id TEXT NOT NULL", "teacher_id TEXT"))
+    connection.execute(INSERT, (None, "S006", "2024-09-30"))
+    connection.commit()
+    connection.close()
+
+    migrations.migrate(db_path, log=None)
+
+    connection = sqlite3.connect(db_path)
+    connection.execute(INSERT, (None, "S006", "2024-09-30"))
+    connection.execute("DELETE FROM achievements WHERE id = 1")
+    assert connection.execute("SELECT COUNT(*) FROM teacher_stats").fetchone()[0] == 0
+    assert stats.check_teacher_stats(connection) == []
+    connection.close()
@@ -0,0 +1,115 @@
+# tests/test_thumbnails.py
+import io
+
+import pytest
+
+import db
+import storage
+import thumbnails
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def test_variant_path_keeps_blob_shard():
+    path = "uploads/ab/cd/" + "ab" + "cd" + "0" * 60 + ".jpeg"
+    thumb = thumbnails.variant_path(path, "thumb")
+
+    assert thumb == path[:-len(".jpeg")] + ".thumb.webp"
+    name = thumb.rsplit("/", 1)[1]
+    assert "uploads/" + storage.shard_path(name, 2) == thumb
+
+
+def test_nothing_queued_without_pillow(monkeypatch):
+    monkeypatch.setattr(thumbnails, "Image", None)
+    worker = thumbnails.ThumbnailWorker()
+
+    assert not thumbnails.can_render("uploads/x.png")
+    assert worker.submit("unused.db", "unused", "uploads/x.png") is None
+
+
+def test_pdf_needs_pymupdf(monkeypatch):
+    monkeypatch.setattr(thumbnails, "Image", object())
+    monkeypatch.setattr(thumbnails, "fitz", None)
+
+    assert thumbnails.can_render("uploads/x.jpg")
+    assert not thumbnails.can_render("uploads/x.pdf")
+
+
+def test_submit_queues_previews_used_by_listing(auth_teacher_client, test_app, tmp_path, monkeypatch):
+    monkeypatch.setitem(test_app.config, "UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setattr(thumbnails, "can_render", lambda path: True)
+
+    def fake_render(upload_folder, certificate_path):
+        for variant in thumbnails.VARIANTS:
+            with open(storage.local_path(upload_folder, thumbnails.variant_path(certificate_path, variant)), "wb") as f:
+                f.write(b"RIFF webp " + variant.encode())
+
+    monkeypatch.setattr(thumbnails, "render_variants", fake_render)
+
+    content = PNG + str(tmp_path).encode()
+    res = auth_teacher_client.post("/submit_achievements", content_type="multipart/form-data", data={
+        "student_id": "123",
+        "achievement_type": "coding",
+        "event_name": "Thumbnail Test",
+        "achievement_date": "2099-01-01",
+        "organizer": "Test",
+        "position": "First Place",
+        "certificate": (io.BytesIO(content), "award.png"),
+    })
+    assert b"successfully registered" in res.data
+    thumbnails.worker.shutdown(wait=True)
+
+    conn = db.open_connection(test_app.config["DB_PATH"])
+    try:
+        achievement_id, has_thumbnail = conn.execute("""
+            SELECT a.id, c.has_thumbnail FROM achievements a
+            JOIN certificates c ON c.path = a.certificate_path
+            WHERE a.event_name = 'Thumbnail Test' ORDER BY a.id DESC LIMIT 1
+        """).fetchone()
+    finally:
+        conn.close()
+    assert has_thumbnail == 1
+
+    page = auth_teacher_client.get("/all-achievements").get_data(as_text=True)
+    assert f'src="/certificates/{achievement_id}/thumb"' in page
+    assert 'loading="lazy"' in page
+
+    res = auth_teacher_client.get(f"/certificates/{achievement_id}/thumb")
+    assert res.status_code == 200
+    assert res.data == b"RIFF webp thumb"
+    assert res.headers["ETag"].endswith('.thumb"')
+
+
+def test_render_variants_with_pillow(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    if not thumbnails.load_imaging():
+        pytest.skip("thumbnails imported without Pillow")
+    source = io.BytesIO()
+    Image.new("RGB", (2400, 1600), "white").save(source, "PNG")
+    blob = storage.save_upload(io.BytesIO(source.getvalue()), str(tmp_path), "big.png", shard_depth=2)
+
+    thumbnails.render_variants(str(tmp_path), blob.path)
+
+    for variant, size in thumbnails.VARIANTS.items():
+        with Image.open(storage.local_path(str(tmp_path), thumbnails.variant_path(blob.path, variant))) as image:
+            assert image.format == "WEBP"
+            assert image.width <= size[0] and image.height <= size[1]
+
+
+@pytest.mark.parametrize("name, content", [
+    ("empty.pdf", b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+                  b"2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\ntrailer<</Root 1 0 R>>\n%%EOF\n"),
+    ("corrupt.png", PNG + b" truncated"),
+])
+def test_unrenderable_certificate_is_marked_failed(test_app, test_db, tmp_path, name, content):
+    pytest.importorskip("fitz")
+    if not thumbnails.load_imaging():
+        pytest.skip("thumbnails imported without Pillow")
+    blob = storage.save_upload(io.BytesIO(content), str(tmp_path), name)
+    with test_db:
+        storage.register(test_db.cursor(), blob)
+
+    assert not thumbnails.generate(test_app.config["DB_PATH"], str(tmp_path), blob.path)
+    assert test_db.execute(
+        "SELECT has_thumbnail FROM certificates WHERE path = ?", (blob.path,)
+    ).fetchone()[0] == thumbnails.FAILED
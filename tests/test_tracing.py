@@ -0,0 +1,87 @@
+# tests/test_tracing.py
+import logging
+
+import pytest
+
+import db
+import tracing
+
+
+@pytest.fixture
+def tracer(test_app):
+    """Turn the global tracer on for one test, logging every statement."""
+    tracing.tracer.reset()
+    tracing.tracer.threshold_ms = 0
+    yield tracing.tracer
+    tracing.tracer.threshold_ms = None
+    tracing.tracer.reset()
+    test_app.config["ADMIN_TEACHER_IDS"] = []
+
+
+def test_normalize_sql_redacts_literals_and_collapses_lists():
+    sql = "SELECT *  FROM student\n WHERE email = 'a@b.c' AND id IN (?, ?, ?) AND age > 21"
+    assert tracing.normalize_sql(sql) == (
+        "SELECT * FROM student WHERE email = ? AND id IN (?, ...) AND age > ?"
+    )
+    assert tracing.normalize_sql("SELECT 'it''s'") == "SELECT ?"
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = tracing.SlowQueryTracer()
+    tracer.record(None, "SELECT 1", 5.0, True)
+    assert tracer.top() == []
+
+
+def test_slow_query_logged_with_plan_and_no_values(tracer, auth_teacher_client, caplog):
+    with caplog.at_level(logging.WARNING, logger="ams.slow_query"):
+        auth_teacher_client.get("/teacher-dashboard").close()
+
+    messages = [r.getMessage() for r in caplog.records if r.name == "ams.slow_query"]
+    assert any("/teacher-dashboard" in m and "plan:" in m for m in messages)
+    # Bound parameters (the teacher id) never reach the log
+    assert not any("T001" in m for m in messages)
+
+    statements = tracer.top()
+    assert statements
+    assert all(s["slow_calls"] >= 1 for s in statements)
+    assert any(s["plan"] and "achievements" in " ".join(s["plan"]) for s in statements)
+
+
+def test_top_orders_by_total_time_and_evicts_coldest():
+    tracer = tracing.SlowQueryTracer(threshold_ms=1000, top_n=2, max_statements=3)
+    tracer.record(None, "SELECT 1", 0.001, True)
+    tracer.record(None, "SELECT a FROM t", 0.003, True)
+    tracer.record(None, "SELECT b FROM t", 0.002, True)
+    tracer.record(None, "SELECT b FROM t", 0.002, True)
+    tracer.record(None, "SELECT c FROM t", 0.0015, True)
+
+    assert [s["sql"] for s in tracer.top()] == ["SELECT b FROM t", "SELECT a FROM t"]
+    assert "SELECT ?" not in [s["sql"] for s in tracer.top(10)]
+    assert tracer.top(10)[0]["calls"] == 2
+
+
+def test_explain_runs_untraced(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / "t.db"))
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (a INTEGER PRIMARY KEY, b TEXT)")
+    calls = []
+    db.statement_hooks.append(lambda *args: calls.append(args))
+    try:
+        plan = tracing.explain(conn.cursor(), "SELECT b FROM t WHERE a = ?")
+    finally:
+        db.statement_hooks.pop()
+        pool.close_all()
+    assert any("t" in step for step in plan)
+    assert calls == []
+
+
+def test_slow_queries_endpoint_admin_only(tracer, test_app, auth_teacher_client):
+    assert auth_teacher_client.get("/admin/slow-queries").status_code == 403
+
+    test_app.config["ADMIN_TEACHER_IDS"] = ["T001"]
+    auth_teacher_client.get("/teacher-dashboard").close()
+    res = auth_teacher_client.get("/admin/slow-queries?n=1")
+    assert res.status_code == 200
+    body = res.get_json()
+    assert body["enabled"] is True
+    assert len(body["statements"]) == 1
@@ -0,0 +1,175 @@
+# tests/test_writer.py
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import db
+import metrics
+import writer
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "writer.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value TEXT)")
+    conn.close()
+    return path
+
+
+def _insert(row_id, value="x"):
+    def job(cursor):
+        cursor.execute("INSERT INTO t (id, value) VALUES (?, ?)", (row_id, value))
+        return cursor.lastrowid
+    return job
+
+
+def _count(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_jobs_are_group_committed(db_path):
+    metrics.registry.reset()
+    w = writer.GroupCommitWriter(db_path, max_batch=32, max_wait=0.05)
+    futures = [w.submit(_insert(n)) for n in range(1, 101)]
+
+    assert [f.result(timeout=10) for f in futures] == list(range(1, 101))
+    w.close()
+    stats = w.stats()
+    assert stats["jobs"] == 100 and stats["failed"] == 0
+    assert stats["batches"] < 100
+    assert stats["max_batch"] == 32
+    assert _count(db_path) == 100
+    text = metrics.render()
+    assert "ams_write_batch_size_count" in text
+    assert 'ams_write_jobs_total{status="ok"} 100' in text
+
+
+def test_failing_job_only_fails_itself(db_path):
+    w = writer.GroupCommitWriter(db_path, max_wait=0.05)
+    first = w.submit(_insert(1))
+    duplicate = w.submit(_insert(1, "again"))
+    third = w.submit(_insert(3))
+
+    assert first.result(timeout=10) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(timeout=10)
+    assert third.result(timeout=10) == 3
+    w.close()
+    assert w.stats()["batches"] == 1
+    assert _count(db_path) == 2
+
+
+def test_result_means_committed(db_path):
+    w = writer.GroupCommitWriter(db_path)
+    w.submit(_insert(7)).result(timeout=10)
+    # Visible to an unrelated connection as soon as the future resolves
+    assert _count(db_path) == 1
+    w.close()
+
+
+def test_cancelled_job_is_dropped(db_path):
+    w = writer.GroupCommitWriter(db_path, max_batch=1)
+    release = threading.Event()
+
+    def blocking(cursor):
+        release.wait(10)
+        return _insert(1)(cursor)
+
+    first = w.submit(blocking)
+    second = w.submit(_insert(2))
+    assert second.cancel()
+    release.set()
+
+    assert first.result(timeout=10) == 1
+    w.close()
+    assert w.stats()["jobs"] == 1
+    assert _count(db_path) == 1
+
+
+def test_concurrent_submitters_never_see_locked_errors(db_path):
+    w = writer.GroupCommitWriter(db_path)
+    errors = []
+
+    def teacher(offset):
+        for n in range(50):
+            try:
+                w.submit(_insert(offset + n)).result(timeout=10)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=teacher, args=(k * 1000,)) for k in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    w.close()
+
+    assert errors == []
+    assert _count(db_path) == 400
+
+
+def test_submit_route_through_writer(auth_teacher_client, test_app, monkeypatch):
+    monkeypatch.setitem(test_app.config, "WRITE_BEHIND", True)
+    res = auth_teacher_client.post("/submit_achievements", data={
+        "student_id": "123",
+        "achievement_type": "coding",
+        "event_name": "Write Behind Test",
+        "achievement_date": "2025-04-13",
+        "organizer": "Test",
+        "position": "First Place",
+    })
+    assert b"successfully registered" in res.data
+
+    conn = db.open_connection(test_app.config["DB_PATH"])
+    try:
+        assert conn.execute(
+            "SELECT COUNT(*) FROM achievements WHERE event_name = 'Write Behind Test'"
+        ).fetchone()[0] >= 1
+    finally:
+        conn.close()
+    writer.close_all()
+
+
+class _StalledWriter:
+    """Stands in for a writer whose queue is too long to reach the job in time."""
+
+    def __init__(self, started):
+        self.started = started
+        self.jobs = []
+
+    def submit(self, job):
+        future = Future()
+        if self.started:
+            future.set_running_or_notify_cancel()
+        self.jobs.append(job)
+        return future
+
+
+@pytest.mark.parametrize("started", [False, True])
+def test_submit_timeout_never_invites_a_duplicate(auth_teacher_client, test_app, monkeypatch, started):
+    stalled = _StalledWriter(started)
+    monkeypatch.setitem(test_app.config, "WRITE_BEHIND", True)
+    monkeypatch.setitem(test_app.config, "WRITE_BEHIND_TIMEOUT", 0.01)
+    monkeypatch.setattr(writer, "get_writer", lambda *args: stalled)
+    res = auth_teacher_client.post("/submit_achievements", data={
+        "student_id": "123",
+        "achievement_type": "coding",
+        "event_name": "Stalled Write",
+        "achievement_date": "2025-04-13",
+        "organizer": "Test",
+        "position": "First Place",
+    })
+
+    assert len(stalled.jobs) == 1
+    if started:
+        # Cannot be called off any more: it will commit, so no retry is asked for
+        assert b"still being saved" in res.data
+    else:
+        assert b"was not saved" in res.data
@@ -0,0 +1,170 @@
+"""
+Thumbnail Module
+Background generation of small WebP previews for certificate files
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+import storage
+
+# Optional imaging libraries, imported on first use because they take longer
+# to load than the rest of the app: without Pillow no previews are generated
+# and listings show a link; PyMuPDF renders the first page of PDF certificates.
+# _UNLOADED until first use, None when not installed.
+_UNLOADED = object()
+Image = _UNLOADED
+fitz = _UNLOADED
+
+logger = logging.getLogger("ams.thumbnails")
+
+# variant -> bounding box; both are written next to the original as
+# <sha256>.<variant>.webp, so they shard and dedupe together with it
+VARIANTS = {
+    "thumb": (160, 160),
+    "preview": (1024, 1024),
+}
+WEBP_QUALITY = 80
+# PDF pages are rendered at this zoom before downscaling (1.0 = 72 dpi)
+PDF_ZOOM = 2.0
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+
+# certificates.has_thumbnail of a file that cannot be rendered
+FAILED = -1
+
+
+def load_imaging():
+    """Import Pillow and PyMuPDF if that has not been tried yet; True when Pillow is available."""
+    global Image, fitz
+    if Image is _UNLOADED:
+        try:
+            from PIL import Image
+        except ImportError:
+            Image = None
+    if fitz is _UNLOADED:
+        try:
+            import fitz
+        except ImportError:
+            fitz = None
+    return Image is not None
+
+
+def variant_path(certificate_path, variant):
+    """certificate_path of a derived file: uploads/ab/cd/<sha>.jpeg -> uploads/ab/cd/<sha>.thumb.webp"""
+    return f"{os.path.splitext(certificate_path)[0]}.{variant}.webp"
+
+
+def can_render(certificate_path):
+    """True when the installed libraries can build previews for this file type."""
+    if not load_imaging():
+        return False
+    extension = os.path.splitext(certificate_path)[1].lower()
+    return extension in IMAGE_EXTENSIONS or (extension == ".pdf" and fitz is not None)
+
+
+class UnrenderableCertificate(Exception):
+    """The file is stored but cannot be decoded (corrupt image, PDF without pages); retrying will not help."""
+
+
+def _open(source):
+    load_imaging()
+    try:
+        if source.lower().endswith(".pdf"):
+            with fitz.open(source) as document:
+                if document.page_count == 0:
+                    raise UnrenderableCertificate(f"{source} has no pages")
+                pixmap = document[0].get_pixmap(matrix=fitz.Matrix(PDF_ZOOM, PDF_ZOOM))
+                return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+        image = Image.open(source)
+        # Large JPEGs can decode straight at a fraction of full resolution
+        image.draft("RGB", VARIANTS["preview"])
+        return image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    except (FileNotFoundError, UnrenderableCertificate):
+        raise
+    except Exception as e:
+        raise UnrenderableCertificate(f"{source}: {e}") from e
+
+
+def render_variants(upload_folder, certificate_path):
+    """Write every VARIANTS file for certificate_path, each via a temp file and rename."""
+    image = _open(storage.local_path(upload_folder, certificate_path))
+    try:
+        for variant, size in VARIANTS.items():
+            target = storage.local_path(upload_folder, variant_path(certificate_path, variant))
+            temp = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.tmp")
+            scaled = image.copy()
+            scaled.thumbnail(size)
+            scaled.save(temp, "WEBP", quality=WEBP_QUALITY)
+            os.replace(temp, target)
+    finally:
+        image.close()
+
+
+def generate(db_path, upload_folder, certificate_path):
+    """
+    Build the previews for one certificate and flag its certificates row:
+    has_thumbnail is 0 until then, 1 once they exist and FAILED when the
+    file cannot be rendered at all, so it is neither retried nor waited for.
+    Returns True when the previews exist.
+    """
+    wanted = [storage.local_path(upload_folder, variant_path(certificate_path, v)) for v in VARIANTS]
+    state = 1
+    if not all(os.path.exists(path) for path in wanted):
+        try:
+            render_variants(upload_folder, certificate_path)
+        except UnrenderableCertificate as e:
+            logger.warning("no preview possible: %s", e)
+            state = FAILED
+
+    pool = db.get_pool(db_path)
+    connection = pool.acquire()
+    try:
+        with connection:
+            connection.execute(
+                "UPDATE certificates SET has_thumbnail = ? WHERE path = ?", (state, certificate_path)
+            )
+    finally:
+        pool.release(connection)
+    return state == 1
+
+
+class ThumbnailWorker:
+    """
+    Thread pool fed by submit_achievements. Pillow and PyMuPDF release the
+    GIL while decoding and resampling, so a couple of threads keep previews
+    off the request path without a separate process. The pool is created on
+    first use; max_workers=0 disables preview generation.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._executor = None
+
+    def submit(self, db_path, upload_folder, certificate_path):
+        """Queue previews for certificate_path; returns a Future, or None if skipped."""
+        if not self.max_workers or not can_render(certificate_path):
+            return None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="thumbnails")
+        future = self._executor.submit(generate, db_path, upload_folder, certificate_path)
+        future.add_done_callback(_log_failure)
+        return future
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error("thumbnail generation failed", exc_info=future.exception())
+
+
+worker = ThumbnailWorker()
+
+
+def init_app(app):
+    worker.max_workers = app.config.get("THUMBNAIL_WORKERS", worker.max_workers)
@@ -0,0 +1,147 @@
+"""
+Slow Query Tracing Module
+Opt-in timing of every SQL statement, with a slow-query log and a
+top-N table for admins
+"""
+import logging
+import re
+import sqlite3
+import threading
+
+from flask import abort, current_app, has_request_context, jsonify, request, session
+
+import db
+
+logger = logging.getLogger("ams.slow_query")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """
+    Collapse a statement to a stable, value-free shape: literals become ?,
+    runs of placeholders become (?, ...) and whitespace is squashed. Bound
+    parameter values never reach the tracer, so nothing user-supplied is logged.
+    """
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(?, ...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class SlowQueryTracer:
+    """
+    Aggregates time per normalized statement and logs the slow ones.
+
+    threshold_ms=None disables tracing entirely; the statement hook then
+    returns immediately. At most max_statements distinct statements are
+    tracked; when full, the one with the least total time is dropped.
+    """
+
+    def __init__(self, threshold_ms=None, top_n=20, max_statements=500):
+        self.threshold_ms = threshold_ms
+        self.top_n = top_n
+        self.max_statements = max_statements
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.threshold_ms is not None
+
+    def record(self, cursor, sql, seconds, executed):
+        if self.threshold_ms is None or sql is None:
+            return
+        normalized = normalize_sql(sql)
+        route = request.url_rule.rule if has_request_context() and request.url_rule else None
+        slow = seconds * 1000 >= self.threshold_ms
+
+        with self._lock:
+            entry = self._stats.get(normalized)
+            if entry is None:
+                if len(self._stats) >= self.max_statements:
+                    coldest = min(self._stats, key=lambda key: self._stats[key]["total_ms"])
+                    del self._stats[coldest]
+                entry = self._stats[normalized] = {
+                    "sql": normalized, "calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "slow_calls": 0, "last_route": None, "plan": None,
+                }
+            if executed:
+                entry["calls"] += 1
+            entry["total_ms"] += seconds * 1000
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+            if route:
+                entry["last_route"] = route
+            first_slow = slow and entry["slow_calls"] == 0
+            if slow:
+                entry["slow_calls"] += 1
+
+        if not slow:
+            return
+        if first_slow:
+            entry["plan"] = explain(cursor, sql)
+            logger.warning(
+                "slow query %.1f ms on %s (%s): %s\n  plan: %s",
+                seconds * 1000, route or "-", "execute" if executed else "fetch",
+                normalized, " | ".join(entry["plan"]),
+            )
+        else:
+            logger.warning(
+                "slow query %.1f ms on %s (%s): %s",
+                seconds * 1000, route or "-", "execute" if executed else "fetch", normalized,
+            )
+
+    def top(self, n=None):
+        """The n statements with the most total time, slowest first."""
+        with self._lock:
+            entries = [dict(entry) for entry in self._stats.values()]
+        entries.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return entries[: n or self.top_n]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def explain(cursor, sql):
+    """
+    EXPLAIN QUERY PLAN for sql, with every placeholder bound to NULL.
+    Runs on a plain (uninstrumented) cursor so it is not traced itself.
+    """
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")):
+        return ["(no plan for this statement type)"]
+    try:
+        plain = cursor.connection.cursor(sqlite3.Cursor)
+        placeholders = _STRING_LITERAL.sub("", sql).count("?")
+        rows = plain.execute(f"EXPLAIN QUERY PLAN {sql}", [None] * placeholders).fetchall()
+        return [row[3] for row in rows]
+    except sqlite3.Error as e:
+        return [f"(plan unavailable: {e})"]
+
+
+tracer = SlowQueryTracer()
+
+
+def slow_queries_view():
+    """Top-N statements by total time; teachers listed in ADMIN_TEACHER_IDS only."""
+    if session.get("teacher_id") not in current_app.config.get("ADMIN_TEACHER_IDS", ()):
+        abort(403)
+    if not tracer.enabled:
+        return jsonify(enabled=False, statements=[])
+    return jsonify(
+        enabled=True,
+        threshold_ms=tracer.threshold_ms,
+        statements=tracer.top(request.args.get("n", type=int)),
+    )
+
+
+def init_app(app):
+    threshold = app.config.get("SLOW_QUERY_MS")
+    tracer.threshold_ms = float(threshold) if threshold not in (None, "") else None
+    tracer.top_n = app.config.get("SLOW_QUERY_TOP_N", tracer.top_n)
+    if tracer.record not in db.statement_hooks:
+        db.statement_hooks.append(tracer.record)
+    app.add_url_rule("/admin/slow-queries", "slow-queries", slow_queries_view)
@@ -0,0 +1,173 @@
+"""
+Write-Behind Module
+A single writer thread that group-commits jobs queued by request handlers
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import db
+import metrics
+
+logger = logging.getLogger("ams.writer")
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT = 0.005  # seconds a batch stays open for more jobs
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Owns the only write connection to db_path and applies queued jobs in
+    group commits.
+
+    A job is a callable job(cursor) -> result. The thread takes the first
+    waiting job, keeps the batch open for up to max_wait seconds or
+    max_batch jobs, and runs them all in one BEGIN IMMEDIATE ... COMMIT.
+    Each job gets its own SAVEPOINT, so a failing job is rolled back and
+    reported on its own Future without affecting the rest of the batch.
+    Futures resolve only after the COMMIT, so a result means the row is
+    durable. A job whose Future is cancelled before its batch starts is
+    dropped; once running it can no longer be cancelled. Because every
+    write goes through one connection, handlers never contend for SQLite's
+    write lock.
+    """
+
+    def __init__(self, db_path, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT, max_queue=10000):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue(max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"jobs": 0, "failed": 0, "batches": 0, "max_batch": 0}
+
+    def submit(self, job):
+        """Queue job(cursor) for the next group commit; returns a Future of its result."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((job, future))
+        return future
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                    self._thread.start()
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Finish this batch, then stop
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        connection = db.connect(self.db_path)
+        connection.isolation_level = None  # explicit BEGIN/COMMIT below
+        try:
+            while True:
+                depth = self._queue.qsize()
+                batch = self._next_batch()
+                if batch is None:
+                    break
+                metrics.registry.observe("ams_write_queue_depth", (), depth)
+                metrics.registry.observe("ams_write_batch_size", (), len(batch))
+                self._apply(connection, batch)
+        finally:
+            connection.close()
+
+    def _apply(self, connection, batch):
+        batch = [(job, future) for job, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results = []
+        started = time.perf_counter()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            for job, future in batch:
+                cursor.execute("SAVEPOINT job")
+                try:
+                    results.append((future, job(cursor), None))
+                    cursor.execute("RELEASE job")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO job")
+                    cursor.execute("RELEASE job")
+                    results.append((future, None, e))
+            cursor.execute("COMMIT")
+        except Exception as e:
+            # The whole group failed to commit: every job in it failed
+            logger.exception("group commit of %d jobs failed", len(batch))
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            results = [(future, None, e) for _, future in batch]
+        metrics.registry.observe("ams_write_commit_seconds", (), time.perf_counter() - started)
+
+        failed = 0
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                failed += 1
+                future.set_exception(error)
+        metrics.registry.inc("ams_write_jobs_total", (("status", "ok"),), len(results) - failed)
+        metrics.registry.inc("ams_write_jobs_total", (("status", "error"),), failed)
+        with self._lock:
+            self._stats["jobs"] += len(results)
+            self._stats["failed"] += failed
+            self._stats["batches"] += 1
+            self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+
+    def stats(self):
+        """Snapshot of jobs, failed, batches, max_batch and the current queue depth."""
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot["queued"] = self._queue.qsize()
+        return snapshot
+
+    def close(self, timeout=10.0):
+        """Apply everything already queued, then stop the thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT):
+    """The process-wide writer for db_path, created on first use."""
+    with _writers_lock:
+        writer = _writers.get(db_path)
+        if writer is None:
+            writer = _writers[db_path] = GroupCommitWriter(db_path, max_batch, max_wait)
+        return writer
+
+
+@atexit.register
+def close_all():
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()